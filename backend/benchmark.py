@@ -0,0 +1,243 @@
+"""
+Performance benchmarks for search, tree build, Chapter 99 linking and duties.
+
+    python benchmark.py                          # 1k/10k/100k rows, compare to baseline
+    python benchmark.py --sizes 1000,10000 --save-baseline
+    python benchmark.py --threshold 0.5          # allow 50% slowdown
+
+Synthetic catalogs and Ch99 rule sets are generated per size and loaded through
+the real catalog. Each benchmark reports latency percentiles, throughput and peak
+traced memory. With a stored baseline, the run fails (exit 1) when a p95 latency
+or a peak memory grows by more than the threshold.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from catalog import load_catalog, get_catalog
+from duty_engine import calculate_duty
+from hts_tree import HTSTree
+from services import fetch_hts_codes, get_applicable_ch99, calculate_duty_batch, query_cache
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'bench_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# Latencies below this are timer noise and never count as regressions
+MIN_REGRESSION_SECONDS = 0.0005
+
+WORDS = [
+    "steel", "aluminum", "copper", "plastic", "rubber", "cotton", "wool", "silk", "leather", "glass",
+    "machines", "vehicles", "parts", "accessories", "tubes", "pipes", "bars", "sheets", "wire", "fabric",
+    "portable", "automatic", "electric", "hydraulic", "frozen", "roasted", "knitted", "woven", "coated",
+    "computers", "laptops", "tires", "bicycles", "coffee", "tea", "footwear", "furniture", "toys", "lamps",
+]
+GENERAL_RATES = ["Free", "2.5%", "3.7%", "6.5%", "1.9¢/kg", "15.4¢/kg + 40.5%", "$1.50/kg"]
+SPECIAL_RATES = ["Free", "Free (A,AU,BH,CA,CL,CO,IL,JO,KR,MA,MX,OM,P,PA,PE,S,SG)", "Free (CA,MX)", None]
+COUNTRIES = ["CN", "VN", "MX", "CA", "DE", "JP", "IN", "KR", "BR", "TW"]
+QUERIES = ["steel tubes", "laptop", "frozen coffee", "rubber tires", "electric lamps", "knitted cotton fabric",
+           "8471", "7304.19", "automatic machines parts"]
+
+
+def generate_catalog(size: int, ch99_headings: int = 50, seed: int = 7) -> tuple[list, list]:
+    """
+    Synthetic HTS rows (heading > subheading > statistical line) and Ch99 rules.
+    """
+    rng = random.Random(seed)
+    headings = [f"9903.{88 + i // 100:02d}.{i % 100:02d}" for i in range(ch99_headings)]
+    rules = [
+        {"hts_code": heading, "description": f"Additional duty {heading}", "rate": rng.choice([0.075, 0.1, 0.25]),
+         "type": "percent", "country": country, "effective_from": "2018-07-06"}
+        for heading in headings for country in rng.sample(COUNTRIES, 3)
+    ]
+
+    rows = []
+    chapter = 1
+    while len(rows) < size:
+        heading = f"{chapter // 10 + 1:02d}{chapter % 10 + 1:02d}"
+        rows.append(_row(rng, heading, 0, None, headings))
+        for sub in range(1, 10):
+            if len(rows) >= size:
+                break
+            subheading = f"{heading}.{sub * 10:02d}"
+            rows.append(_row(rng, subheading, 1, heading, headings))
+            for stat in range(1, 5):
+                if len(rows) >= size:
+                    break
+                rows.append(_row(rng, f"{subheading}.{stat:02d}.00", 2, subheading, headings))
+        chapter += 1
+    return rows, rules
+
+
+def _row(rng, code: str, indent: int, parent: str, headings: list) -> dict:
+    refs = rng.sample(headings, rng.choice([0, 0, 0, 1, 2]))
+    description = " ".join(rng.sample(WORDS, rng.randint(4, 10))).capitalize()
+    return {
+        "hts_code": code,
+        "indent": indent,
+        "description": description,
+        "description_clean": description.lower(),
+        "level": ("heading", "subheading", "statistical")[indent],
+        "parent_hts": parent,
+        "duties": {"general": rng.choice(GENERAL_RATES), "special": rng.choice(SPECIAL_RATES), "other": "25%"},
+        "chapter99_refs": refs,
+        "requires_ch99": bool(refs),
+    }
+
+
+def _measure(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(size: int, repeat: int = 20) -> dict:
+    """
+    Runs every benchmark against a synthetic catalog of `size` rows.
+    Returns {benchmark: {p50, p95, p99, mean, ops_per_sec, peak_bytes}}.
+    """
+    rows, rules = generate_catalog(size)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        hts_path = os.path.join(tmp, "hts.json")
+        ch99_path = os.path.join(tmp, "ch99.json")
+        with open(hts_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        with open(ch99_path, "w", encoding="utf-8") as f:
+            json.dump(rules, f)
+
+        load_repeat = max(1, repeat // 10)
+        results["catalog_load"] = _measure(lambda: load_catalog(hts_path, ch99_path), load_repeat)
+        results["catalog_load"]["peak_bytes"] = _peak_memory(lambda: load_catalog(hts_path, ch99_path))
+        catalog = get_catalog()
+
+        try:
+            queries = iter(QUERIES * repeat)
+            results["search"] = _measure(lambda: (query_cache.clear(), fetch_hts_codes(next(queries))), repeat)
+            results["search"]["peak_bytes"] = _peak_memory(
+                lambda: (query_cache.clear(), fetch_hts_codes("steel tubes")))
+            for query in QUERIES:
+                fetch_hts_codes(query)
+            results["search_cached"] = _measure(lambda: fetch_hts_codes(next(queries)), repeat)
+            catalog.semantic_index
+            results["search_semantic"] = _measure(
+                lambda: (query_cache.clear(), fetch_hts_codes(next(queries), mode="semantic")), repeat)
+
+            items = [item for _, item in catalog.live_items()]
+            results["tree_build"] = _measure(lambda: HTSTree(items, etag='"bench"'), load_repeat)
+            results["tree_build"]["peak_bytes"] = _peak_memory(lambda: HTSTree(items, etag='"bench"'))
+
+            docs = [item for item in items if item.get("chapter99_refs")][:1000]
+            results["ch99_linking"] = _measure(lambda: [get_applicable_ch99(doc, "CN") for doc in docs], repeat)
+            results["ch99_linking"]["ops"] = len(docs)
+
+            lines = [
+                {"hts_code": items[i % len(items)]["hts_code"], "value": 1000.0 + i, "quantity": 10 + i % 50,
+                 "country": COUNTRIES[i % len(COUNTRIES)]}
+                for i in range(min(size, 10_000))
+            ]
+            single_docs = [(catalog.get(line["hts_code"]), line) for line in lines[:1000]]
+            results["duty_single"] = _measure(
+                lambda: [calculate_duty(doc, line["value"], line["quantity"], line["country"], [])
+                         for doc, line in single_docs], repeat)
+            results["duty_single"]["ops"] = len(single_docs)
+            results["duty_batch"] = _measure(lambda: calculate_duty_batch(lines), repeat)
+            results["duty_batch"]["ops"] = len(lines)
+            results["duty_batch"]["peak_bytes"] = _peak_memory(lambda: calculate_duty_batch(lines))
+        finally:
+            load_catalog()
+
+    for result in results.values():
+        result["ops_per_sec"] = result.pop("ops", 1) / result["mean"] if result["mean"] else 0.0
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Regressions of `results` against `baseline`: p95 latency or peak memory more
+    than `threshold` (a fraction) above the stored value.
+    """
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, current in benchmarks.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous:
+                continue
+            limit = previous["p95"] * (1 + threshold)
+            if current["p95"] > limit and current["p95"] - previous["p95"] > MIN_REGRESSION_SECONDS:
+                regressions.append(
+                    f"{size}/{name}: p95 {current['p95'] * 1000:.2f}ms > {limit * 1000:.2f}ms")
+            if "peak_bytes" in current and "peak_bytes" in previous:
+                mem_limit = previous["peak_bytes"] * (1 + threshold)
+                if current["peak_bytes"] > mem_limit:
+                    regressions.append(
+                        f"{size}/{name}: peak memory {current['peak_bytes']:,}B > {mem_limit:,.0f}B")
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'rows':>8} {'benchmark':<14} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>12} {'peak KiB':>10}"]
+    for size, benchmarks in results.items():
+        for name, r in benchmarks.items():
+            peak = f"{r['peak_bytes'] / 1024:,.0f}" if "peak_bytes" in r else "-"
+            lines.append(f"{size:>8} {name:<14} {r['p50'] * 1000:>10.3f} {r['p95'] * 1000:>10.3f} "
+                         f"{r['p99'] * 1000:>10.3f} {r['ops_per_sec']:>12,.0f} {peak:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark search, tree, Ch99 linking and duty engine.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="iterations per benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown / memory growth as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[str(size)] = run_benchmarks(size, repeat=args.repeat)
+    print(format_results(results))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
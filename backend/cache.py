@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after `ttl` seconds.
+    Thread-safe; keeps hit/miss counters for metrics.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SharedCache:
+    """
+    TTLCache counterpart stored in a SQLite file, shared by every process that
+    opens the same path (e.g. forked API workers). Values must be JSON
+    serializable; tuples come back as lists.
+
+    Each process opens its own connection on first use. Eviction is by age
+    rather than strict LRU so reads never write.
+    """
+
+    # Expired and excess entries are purged every this many writes
+    PURGE_EVERY = 64
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must not cross a fork
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, expires REAL, value TEXT, PRIMARY KEY (namespace, key))")
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+                (self.namespace, repr(key), time.time())).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, expires, value) VALUES (?, ?, ?, ?)",
+                (self.namespace, repr(key), time.time() + self.ttl, json.dumps(value, separators=(",", ":"))))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge(db)
+
+    def _purge(self, db):
+        db.execute("DELETE FROM cache WHERE namespace = ? AND expires <= ?", (self.namespace, time.time()))
+        db.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache WHERE namespace = ? ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.maxsize))
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def make_cache(namespace: str, maxsize: int = 1024, ttl: float = 300.0):
+    """
+    A SharedCache when SHARED_CACHE_PATH is set (multi-process deployments),
+    otherwise an in-process TTLCache.
+    """
+    path = os.environ.get("SHARED_CACHE_PATH")
+    if path:
+        return SharedCache(path, namespace, maxsize=maxsize, ttl=ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,366 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from search_index import SearchIndex, CodeIndex
+from hts_tree import HTSTree
+from ch99_index import Ch99Index, reverse_index
+from catalog_store import MappedCatalogFile, MappedSearchIndex, MappedTree
+from catalog_db import (CatalogDatabase, FTSIndex, DatabaseCodeIndex, DatabaseCodes, DatabaseTree,
+                        is_database_path)
+from semantic import SemanticIndex, vectors_path
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+# Artifacts written by ingest.py; the hand-written subset is the fallback
+DATABASE_CATALOG_PATH = os.path.join(DATA_DIR, 'catalog.sqlite')
+BINARY_CATALOG_PATH = os.path.join(DATA_DIR, 'catalog.htsc')
+INGESTED_CATALOG_PATH = os.path.join(DATA_DIR, 'catalog.json')
+SUBSET_DATA_PATH = os.path.join(DATA_DIR, 'hts_subset.json')
+
+
+def _default_hts_path() -> str:
+    if os.environ.get("HTS_CATALOG_PATH"):
+        return os.environ["HTS_CATALOG_PATH"]
+    for path in (DATABASE_CATALOG_PATH, BINARY_CATALOG_PATH, INGESTED_CATALOG_PATH):
+        if os.path.exists(path):
+            return path
+    return SUBSET_DATA_PATH
+
+
+HTS_DATA_PATH = _default_hts_path()
+CH99_DATA_PATH = os.path.join(DATA_DIR, 'chapter99.json')
+
+# Minimum number of seconds between two on-disk change checks.
+RELOAD_CHECK_INTERVAL = float(os.environ.get("CATALOG_RELOAD_INTERVAL", "2.0"))
+
+
+def _read_json_list(path: str) -> list:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def row_key(row: dict) -> tuple:
+    """
+    Identity of an HTS row across revisions.
+    """
+    return (row.get("hts_code"), row.get("stat_suffix") or None)
+
+
+def _prepare_row(row: dict) -> dict:
+    if 'description_clean' in row:
+        return row
+    return {**row, 'description_clean': (row.get('description') or '').lower()}
+
+
+def read_hts_rows(path: str) -> tuple[list, dict]:
+    """
+    Reads either a plain list of rows, an ingest.py JSON artifact
+    ({"format": "hts-catalog", "release": ..., "rows": [...]}), a memory-mapped
+    .htsc file or a .sqlite catalog database. Returns (rows, metadata).
+    """
+    if is_database_path(path):
+        if not os.path.exists(path):
+            return [], {}
+        database = CatalogDatabase(path)
+        return database, dict(database.metadata)
+    if path.endswith(".htsc"):
+        if not os.path.exists(path):
+            return [], {}
+        mapped = MappedCatalogFile(path)
+        return mapped, dict(mapped.metadata)
+    data = _read_json_list(path)
+    if isinstance(data, dict):
+        rows = data.pop("rows", [])
+        return rows, data
+    return data, {}
+
+
+def file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class HTSCatalog:
+    """
+    In-memory snapshot of the HTS dataset and Chapter 99 rules.
+    Built once and shared by every request until the files change on disk;
+    revision deltas are applied in place through apply_delta.
+    Removed rows leave a None in `items` so row ids stay valid.
+    """
+
+    def __init__(self, hts_path: str = HTS_DATA_PATH, ch99_path: str = CH99_DATA_PATH, version: int = 1):
+        started = time.perf_counter()
+        self.hts_path = hts_path
+        self.ch99_path = ch99_path
+        self.version = version
+        self.signature = (file_signature(hts_path), file_signature(ch99_path))
+        # Stable across worker processes, unlike the version counter
+        self.fingerprint = hashlib.sha1(repr((hts_path, self.signature)).encode()).hexdigest()[:16]
+
+        self.items, self.metadata = read_hts_rows(hts_path)
+        self.release = self.metadata.get("release")
+        if isinstance(self.items, CatalogDatabase):
+            # Lookups, search prefiltering and the tree are queries on the
+            # database's indexes; nothing is indexed in memory
+            self.by_code = DatabaseCodes(self.items)
+            self.search_index = FTSIndex(self.items)
+            self.code_index = DatabaseCodeIndex(self.items)
+            # Databases carry their own rules; chapter99.json is the fallback
+            self.ch99_rules = self.items.ch99_rules() or _read_json_list(ch99_path)
+        elif isinstance(self.items, MappedCatalogFile):
+            # Postings and child lists are stored; only the code column is
+            # decoded, and lookups keep row ids rather than rows
+            self.by_code = dict(self.items.first_ids())
+            self.search_index = MappedSearchIndex(self.items)
+            self.code_index = CodeIndex({'hts_code': code} for code in self.items.codes())
+            self.ch99_rules = _read_json_list(ch99_path)
+        else:
+            for item in self.items:
+                # Local data is hand-written and may miss the parser's derived field
+                if 'description_clean' not in item:
+                    item['description_clean'] = (item.get('description') or '').lower()
+            self.by_code = {}
+            for item_id, item in enumerate(self.items):
+                self.by_code.setdefault(item.get('hts_code'), item_id)
+            self.search_index = SearchIndex(self.items)
+            self.code_index = CodeIndex(self.items)
+            self.ch99_rules = _read_json_list(ch99_path)
+        self.ch99_index = Ch99Index(self.ch99_rules)
+
+        self._tree = None
+        self._semantic = None
+        self._ch99_referrers = None
+        # Vectors stored next to the artifact describe the rows as loaded, not after deltas
+        self._stored_vectors = True
+        self._update_lock = threading.Lock()
+        self._keys = None
+
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+
+    @property
+    def tree(self) -> HTSTree:
+        """
+        HTS hierarchy, built on first use and kept for the life of this snapshot.
+        """
+        if self._tree is None:
+            with self._update_lock:
+                if self._tree is None and isinstance(self.items, CatalogDatabase):
+                    self._tree = DatabaseTree(self.items, etag=self._tree_etag())
+                elif self._tree is None and isinstance(self.items, MappedCatalogFile):
+                    self._tree = MappedTree(self.items, etag=self._tree_etag())
+                elif self._tree is None:
+                    self._tree = HTSTree([item for _, item in self.live_items()], etag=self._tree_etag())
+        return self._tree
+
+    @property
+    def has_stored_vectors(self) -> bool:
+        """
+        Whether semantic vectors can be mapped from disk instead of computed.
+        """
+        return self._stored_vectors and os.path.exists(vectors_path(self.hts_path))
+
+    @property
+    def semantic_index(self) -> SemanticIndex:
+        """
+        TF-IDF vectors of the rows: the matrix written by ingest.py when it
+        matches this catalog, otherwise built on first use.
+        """
+        if self._semantic is None:
+            with self._update_lock:
+                if self._semantic is None:
+                    semantic = SemanticIndex.load(self.hts_path, len(self.items)) if self._stored_vectors else None
+                    if semantic is None:
+                        rows = self.items.index_rows() if isinstance(self.items, MappedCatalogFile) else self.items
+                        semantic = SemanticIndex.from_rows(rows)
+                    self._semantic = semantic
+        return self._semantic
+
+    @property
+    def ch99_referrers(self) -> dict[str, list[int]]:
+        """
+        Reverse Chapter 99 index: heading -> ids of the rows referencing it,
+        built on first use.
+        """
+        if self._ch99_referrers is None:
+            with self._update_lock:
+                if self._ch99_referrers is None and isinstance(self.items, CatalogDatabase):
+                    self._ch99_referrers = self.items.referrers()
+                elif self._ch99_referrers is None:
+                    rows = self.items.index_rows() if isinstance(self.items, MappedCatalogFile) else self.items
+                    self._ch99_referrers = reverse_index(rows)
+        return self._ch99_referrers
+
+    def _tree_etag(self) -> str:
+        return f'"tree-{self.fingerprint}"'
+
+    @property
+    def row_count(self) -> int:
+        """
+        Number of live rows; the search index tracks every add and removal.
+        """
+        return self.search_index.size
+
+    def live_items(self):
+        """
+        Yields (item_id, item) for rows not removed by a revision delta.
+        """
+        for item_id, item in enumerate(self.items):
+            if item is not None:
+                yield item_id, item
+
+    def apply_delta(self, delta: dict, release: str = None):
+        """
+        Applies a revisions.diff_rows delta in place: rows are added, removed or
+        replaced and the search index, code index, tree and semantic vectors are
+        patched rather than rebuilt; the reverse Chapter 99 index is dropped.
+        Chapter 99 rules are not part of HTS revisions, so the Ch99 index is
+        left as is.
+        """
+        with self._update_lock:
+            if not isinstance(self.items, list):
+                # Databases and mapped files are read-only: move to in-memory
+                # rows and indexes, then patch those
+                stored, self.items = self.items, list(self.items)
+                self.by_code = dict(stored.first_ids())
+                self.search_index = SearchIndex(self.items)
+                self.code_index = CodeIndex(self.items)
+                self._tree = None
+            if self._keys is None:
+                self._keys = {row_key(item): item_id for item_id, item in self.live_items()}
+            self.version += 1
+            self.release = release or self.release
+            self.fingerprint = hashlib.sha1(
+                repr((self.fingerprint, self.release, self.version)).encode()).hexdigest()[:16]
+            etag = self._tree_etag()
+            # Stored vectors no longer match the rows; loaded ones are patched below
+            self._stored_vectors = False
+            vectors = {}
+
+            # Readers never see a half-patched tree under the new ETag
+            tree = self._tree
+            with tree.lock if tree is not None else nullcontext():
+                for row in delta["removed"]:
+                    item_id = self._keys.pop(row_key(row), None)
+                    if item_id is None:
+                        continue
+                    old = self.items[item_id]
+                    self.items[item_id] = None
+                    vectors[item_id] = None
+                    self.search_index.remove(item_id, old)
+                    self.code_index.remove(item_id, old)
+                    if self.by_code.get(old.get('hts_code')) == item_id:
+                        del self.by_code[old.get('hts_code')]
+                        for other_id, other in self.live_items():
+                            if other.get('hts_code') == old.get('hts_code'):
+                                self.by_code[old.get('hts_code')] = other_id
+                                break
+                    if tree is not None:
+                        tree.remove(old.get('hts_code'), etag)
+
+                added = list(delta["added"])
+                for change in delta["changed"]:
+                    item_id = self._keys.get(row_key(change["row"]))
+                    if item_id is None:
+                        added.append(change["row"])
+                        continue
+                    old, new = self.items[item_id], _prepare_row(change["row"])
+                    self.items[item_id] = new
+                    vectors[item_id] = new
+                    self.search_index.remove(item_id, old)
+                    self.search_index.add(item_id, new)
+                    if tree is not None:
+                        tree.update(new, etag)
+
+                for row in added:
+                    new = _prepare_row(row)
+                    item_id = len(self.items)
+                    self.items.append(new)
+                    vectors[item_id] = new
+                    self._keys[row_key(new)] = item_id
+                    self.by_code.setdefault(new.get('hts_code'), item_id)
+                    self.search_index.add(item_id, new)
+                    self.code_index.add(item_id, new)
+                    if tree is not None:
+                        tree.add(new, etag)
+
+            if self._semantic is not None:
+                self._semantic = self._semantic.patched(vectors)
+            # Rows may have gained or lost references; rebuilt on next use
+            self._ch99_referrers = None
+
+    def is_stale(self) -> bool:
+        return self.signature != (file_signature(self.hts_path), file_signature(self.ch99_path))
+
+    def get(self, hts_code: str):
+        item_id = self.by_code.get(hts_code)
+        return self.items[item_id] if item_id is not None else None
+
+
+_catalog = None
+_last_check = 0.0
+_lock = threading.Lock()
+# Turned off when a background watcher calls reload_if_stale instead
+_auto_reload = True
+
+
+def set_auto_reload(enabled: bool):
+    """
+    Enables or disables the on-request stale check in get_catalog.
+    """
+    global _auto_reload
+    _auto_reload = enabled
+
+
+def reload_if_stale() -> HTSCatalog:
+    """
+    Reloads the catalog if its files changed on disk; returns the current one.
+    """
+    catalog = _catalog
+    if catalog is None:
+        return load_catalog()
+    if catalog.is_stale():
+        return load_catalog(catalog.hts_path, catalog.ch99_path)
+    return catalog
+
+
+def load_catalog(hts_path: str = HTS_DATA_PATH, ch99_path: str = CH99_DATA_PATH) -> HTSCatalog:
+    """
+    (Re)builds the process-wide catalog. Called at startup and on hot reload.
+    """
+    global _catalog, _last_check
+    with _lock:
+        version = _catalog.version + 1 if _catalog else 1
+        _catalog = HTSCatalog(hts_path, ch99_path, version=version)
+        _last_check = time.monotonic()
+        return _catalog
+
+
+def get_catalog() -> HTSCatalog:
+    """
+    Returns the shared catalog, reloading it if the data files changed on disk.
+    The stat check is throttled to RELOAD_CHECK_INTERVAL.
+    """
+    global _last_check
+    catalog = _catalog
+    if catalog is None:
+        return load_catalog()
+    if not _auto_reload:
+        return catalog
+
+    now = time.monotonic()
+    if now - _last_check < RELOAD_CHECK_INTERVAL:
+        return catalog
+    _last_check = now
+
+    if catalog.is_stale():
+        return load_catalog(catalog.hts_path, catalog.ch99_path)
+    return catalog
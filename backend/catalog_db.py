@@ -0,0 +1,434 @@
+"""
+SQLite catalog storage (.sqlite), an alternative to the JSON and .htsc artifacts.
+
+    python ingest.py hts_2025_revision_1.json --output data/catalog.sqlite
+    python catalog_db.py data/catalog.sqlite data/chapter99.json   # refresh Ch99 rules
+
+Tables:
+    rows        one row per HTS line: the full row as JSON plus the columns the
+                API filters on, with B-tree indexes on hts_code, parent_hts and
+                the normalized code digits
+    ch99_refs   (heading, row id) pairs, i.e. the reverse Chapter 99 index
+    ch99_rules  the Chapter 99 rules, in file order
+    rows_fts    FTS5 trigram index over the normalized description, code and keywords
+    metadata    artifact metadata (release, format...)
+
+The API opens the file read-only. Row lookups, search prefiltering, code
+prefix lookups and subtree queries (recursive CTEs) run inside SQLite, so a
+process keeps no copy of the rows and starts without building any index.
+"""
+import json
+import orjson
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections.abc import Sequence
+from hts_tree import tree_node
+from responses import compress
+from search_index import (MAX_CANDIDATES, MAX_GRAM_FREQUENCY, NGRAM_SIZE, normalize, normalize_code, ngrams,
+                          search_text)
+
+DATABASE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+# Rows per executemany batch while writing
+WRITE_BATCH = 5000
+# Deep enough for every HTS hierarchy
+MAX_TREE_DEPTH = 64
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE rows (
+    id INTEGER PRIMARY KEY,
+    hts_code TEXT,
+    stat_suffix TEXT,
+    parent_hts TEXT,
+    indent INTEGER,
+    description TEXT,
+    code_digits TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE ch99_refs (heading TEXT NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (heading, row_id)) WITHOUT ROWID;
+-- Loaded whole into ch99_index.Ch99Index, which does the lookups
+CREATE TABLE ch99_rules (doc TEXT NOT NULL);
+CREATE VIRTUAL TABLE rows_fts USING fts5(text, tokenize='trigram', detail='none');
+"""
+INDEXES = """
+CREATE INDEX rows_hts_code ON rows (hts_code);
+CREATE INDEX rows_parent_hts ON rows (parent_hts);
+CREATE INDEX rows_code_digits ON rows (code_digits);
+"""
+
+
+def is_database_path(path: str) -> bool:
+    return path.endswith(DATABASE_EXTENSIONS)
+
+
+def _row_record(item_id: int, row: dict) -> tuple:
+    return (
+        item_id, row.get("hts_code"), row.get("stat_suffix"), row.get("parent_hts"), row.get("indent"),
+        row.get("description"), normalize_code(row.get("hts_code")) or None,
+        json.dumps(row, separators=(",", ":"), ensure_ascii=False, default=str),
+    )
+
+
+def _insert_ch99_rules(conn, rules: list[dict]):
+    conn.execute("DELETE FROM ch99_rules")
+    conn.executemany("INSERT INTO ch99_rules VALUES (?)", [(json.dumps(rule, default=str),) for rule in rules])
+
+
+def write_catalog_db(path: str, rows, ch99_rules: list[dict] = (), metadata: dict = None) -> int:
+    """
+    Writes rows (any iterable, consumed once) and Chapter 99 rules to a new
+    database, atomically replacing `path`. Returns the number of rows.
+    """
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    os.close(fd)
+    count = 0
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            batch = []
+
+            def flush():
+                conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [_row_record(item_id, row) for item_id, row in batch])
+                conn.executemany("INSERT OR IGNORE INTO ch99_refs VALUES (?, ?)",
+                                 [(heading, item_id) for item_id, row in batch
+                                  for heading in row.get("chapter99_refs") or ()])
+                conn.executemany("INSERT INTO rows_fts (rowid, text) VALUES (?, ?)",
+                                 [(item_id, search_text(row)) for item_id, row in batch])
+                batch.clear()
+
+            for row in rows:
+                batch.append((count, row))
+                count += 1
+                if len(batch) >= WRITE_BATCH:
+                    flush()
+            flush()
+            _insert_ch99_rules(conn, list(ch99_rules))
+            conn.executemany("INSERT INTO metadata VALUES (?, ?)",
+                             [(key, json.dumps(value, default=str)) for key, value in (metadata or {}).items()])
+            # Indexes are cheaper to build once the tables are filled
+            conn.executescript(INDEXES)
+            conn.execute("INSERT INTO rows_fts (rows_fts) VALUES ('optimize')")
+            conn.commit()
+        finally:
+            conn.close()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+def replace_ch99_rules(path: str, rules: list[dict]):
+    """
+    Replaces the Chapter 99 rules of an existing database in one transaction.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            _insert_ch99_rules(conn, rules)
+    finally:
+        conn.close()
+
+
+def _node(row: dict, child_count: int) -> dict:
+    # Same shape as hts_tree nodes passed through _shallow
+    node = tree_node(row)
+    node["child_count"] = child_count
+    return node
+
+
+class CatalogDatabase(Sequence):
+    """
+    Read-only view of a .sqlite catalog. Rows are decoded into dicts on
+    access; each thread of each process gets its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        try:
+            conn.execute("SELECT 1 FROM rows LIMIT 1").fetchall()
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"{path} is not an HTS catalog database: {e}")
+        self.metadata = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM metadata")}
+        self.row_count = conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            # Document frequency of every indexed n-gram
+            conn.execute("CREATE VIRTUAL TABLE temp.rows_vocab USING fts5vocab(main, rows_fts, 'row')")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _decode(doc: str) -> dict:
+        row = json.loads(doc)
+        row.setdefault("description_clean", (row.get("description") or "").lower())
+        return row
+
+    def __len__(self):
+        return self.row_count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.row_count))]
+        if i < 0:
+            i += self.row_count
+        found = self._conn().execute("SELECT doc FROM rows WHERE id = ?", (i,)).fetchone()
+        if found is None:
+            raise IndexError(i)
+        return self._decode(found[0])
+
+    def __iter__(self):
+        for (doc,) in self._conn().execute("SELECT doc FROM rows ORDER BY id"):
+            yield self._decode(doc)
+
+    def index_rows(self) -> list[dict]:
+        return list(self)
+
+    def first_ids(self):
+        """
+        (hts_code, id of its first row) pairs.
+        """
+        return self._conn().execute("SELECT hts_code, MIN(id) FROM rows GROUP BY hts_code").fetchall()
+
+    def first_id(self, hts_code: str):
+        found = self._conn().execute("SELECT MIN(id) FROM rows WHERE hts_code = ?", (hts_code,)).fetchone()
+        return found[0]
+
+    def ch99_rules(self) -> list[dict]:
+        return [json.loads(doc) for (doc,) in self._conn().execute("SELECT doc FROM ch99_rules ORDER BY rowid")]
+
+    def referrers(self) -> dict[str, list[int]]:
+        """
+        Chapter 99 heading -> ids of the rows referencing it, in row order.
+        """
+        referrers = {}
+        for heading, row_id in self._conn().execute("SELECT heading, row_id FROM ch99_refs ORDER BY heading, row_id"):
+            referrers.setdefault(heading, []).append(row_id)
+        return referrers
+
+    def search_candidates(self, query: str, limit: int = MAX_CANDIDATES) -> list[int]:
+        """
+        Up to `limit` row ids ranked by n-gram overlap with the query, skipping
+        n-grams found in most rows; queries shorter than an n-gram match token
+        prefixes.
+        """
+        norm = normalize(query)
+        if not norm:
+            return []
+        conn = self._conn()
+        if len(norm) < NGRAM_SIZE:
+            found = conn.execute(
+                "SELECT rowid FROM rows_fts WHERE text LIKE ? OR text LIKE ? ORDER BY rowid LIMIT ?",
+                (norm + "%", "% " + norm + "%", limit))
+            return [row_id for (row_id,) in found]
+
+        # Rank by n-gram overlap like SearchIndex; FTS5's bm25 ranking of
+        # every match is far slower than counting postings
+        selective = self._selective_grams(conn, norm, limit)
+        if not selective:
+            return []
+        postings = " UNION ALL ".join(["SELECT rowid FROM rows_fts WHERE rows_fts MATCH ?"] * len(selective))
+        # Equal overlaps rank shortest text first, as in SearchIndex
+        found = conn.execute(
+            f"SELECT hits.rowid FROM (SELECT rowid, COUNT(*) AS overlap FROM ({postings}) GROUP BY rowid) hits "
+            f"JOIN rows_fts f ON f.rowid = hits.rowid ORDER BY hits.overlap DESC, length(f.text), hits.rowid LIMIT ?",
+            [f'"{gram}"' for gram in selective] + [limit])
+        return [row_id for (row_id,) in found]
+
+    def count_matches(self, query: str) -> int:
+        """
+        About how many rows contain the query, as SearchIndex.match_count.
+        """
+        norm = normalize(query)
+        if not norm:
+            return 0
+        conn = self._conn()
+        if len(norm) < NGRAM_SIZE:
+            return conn.execute("SELECT COUNT(*) FROM rows_fts WHERE text LIKE ? OR text LIKE ?",
+                                (norm + "%", "% " + norm + "%")).fetchone()[0]
+        selective = self._selective_grams(conn, norm, MAX_CANDIDATES)
+        if not selective:
+            return 0
+        match = " AND ".join(f'"{gram}"' for gram in selective)
+        return conn.execute("SELECT COUNT(*) FROM rows_fts WHERE rows_fts MATCH ?", (match,)).fetchone()[0]
+
+    def _selective_grams(self, conn, norm: str, limit: int) -> list[str]:
+        # N-grams of the query present in the index, without those found in most rows
+        grams = sorted(ngrams(norm))
+        frequency = dict(conn.execute(
+            f"SELECT term, doc FROM temp.rows_vocab WHERE term IN ({','.join('?' * len(grams))})", grams))
+        grams = [gram for gram in grams if gram in frequency]
+        if not grams:
+            return []
+        max_df = max(limit, int(self.row_count * MAX_GRAM_FREQUENCY))
+        return [gram for gram in grams if frequency[gram] <= max_df] or [min(grams, key=frequency.get)]
+
+    def code_prefix(self, digits: str, limit: int = None) -> list[tuple[str, int]]:
+        sql = ("SELECT code_digits, id FROM rows WHERE code_digits >= ? AND code_digits < ? "
+               "ORDER BY code_digits, id")
+        # ':' sorts right after '9'
+        params = (digits, digits + ":")
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._conn().execute(sql, params).fetchall()
+
+    def subtrees(self, hts_code: str = None, depth: int = MAX_TREE_DEPTH) -> list[dict]:
+        """
+        Nodes down to `depth` levels below a code (the tree roots when None),
+        linked through parent_hts with a recursive CTE.
+        """
+        if hts_code is None:
+            seed = ("SELECT id, hts_code, 0 FROM rows r WHERE parent_hts IS NULL "
+                    "OR NOT EXISTS (SELECT 1 FROM rows p WHERE p.hts_code = r.parent_hts)")
+            params = ()
+        else:
+            # The last row of a duplicated code is its tree node, as in hts_tree
+            seed = "SELECT id, hts_code, 0 FROM rows WHERE id = (SELECT MAX(id) FROM rows WHERE hts_code = ?)"
+            params = (hts_code,)
+        found = self._conn().execute(f"""
+            WITH RECURSIVE sub(id, code, depth) AS (
+                {seed}
+                UNION ALL
+                SELECT r.id, r.hts_code, sub.depth + 1 FROM rows r JOIN sub ON r.parent_hts = sub.code
+                WHERE sub.depth < ?
+            )
+            SELECT sub.depth, r.doc, (SELECT COUNT(*) FROM rows c WHERE c.parent_hts = r.hts_code)
+            FROM sub JOIN rows r ON r.id = sub.id
+            ORDER BY sub.depth, sub.id
+        """, params + (depth,))
+
+        top, by_code = [], {}
+        for level, doc, child_count in found:
+            node = _node(self._decode(doc), child_count)
+            if level == 0:
+                top.append(node)
+            else:
+                by_code[node["parent_hts"]]["children"].append(node)
+            by_code[node["hts_code"]] = node
+        return top
+
+
+class FTSIndex:
+    """
+    Search prefilter over a CatalogDatabase's FTS5 table, with the
+    search_index.SearchIndex lookup interface. Read-only.
+    """
+
+    def __init__(self, database: CatalogDatabase):
+        self.database = database
+        self.size = len(database)
+
+    def candidates(self, query: str, limit: int = MAX_CANDIDATES) -> list[int]:
+        return self.database.search_candidates(query, limit)
+
+    def match_count(self, query: str) -> int:
+        return self.database.count_matches(query)
+
+
+class DatabaseCodeIndex:
+    """
+    HTS code lookups on the code_digits B-tree, with the search_index.CodeIndex
+    lookup interface. Read-only.
+    """
+
+    def __init__(self, database: CatalogDatabase):
+        self.database = database
+
+    def get(self, code: str):
+        digits = normalize_code(code)
+        if not digits:
+            return None
+        found = self.database.code_prefix(digits, limit=1)
+        return found[0][1] if found and found[0][0] == digits else None
+
+    def prefix(self, query: str, limit: int = None) -> list[tuple[str, int]]:
+        digits = normalize_code(query)
+        if not digits:
+            return []
+        return self.database.code_prefix(digits, limit)
+
+
+class DatabaseCodes:
+    """
+    hts_code -> first row id, answered by the hts_code index instead of a dict.
+    """
+
+    def __init__(self, database: CatalogDatabase):
+        self.database = database
+
+    def get(self, hts_code: str, default=None):
+        item_id = self.database.first_id(hts_code)
+        return default if item_id is None else item_id
+
+
+class DatabaseTree:
+    """
+    HTS hierarchy served by recursive queries, with the read interface of
+    hts_tree.HTSTree. Only the full tree is kept in memory, once requested.
+    """
+
+    def __init__(self, database: CatalogDatabase, etag: str):
+        self.database = database
+        self.etag = etag
+        self._roots = None
+        self._json = {}
+
+    @property
+    def roots(self) -> list[dict]:
+        """
+        The full tree, queried once: the database is read-only and a new
+        catalog revision gets a new tree.
+        """
+        if self._roots is None:
+            self._roots = self.database.subtrees()
+        return self._roots
+
+    def to_json(self, encoding: str = None) -> bytes:
+        body = self._json.get(encoding)
+        if body is None:
+            body = orjson.dumps(self.roots, default=str) if encoding is None else compress(self.to_json(), encoding)
+            self._json[encoding] = body
+        return body
+
+    def get_roots(self, depth: int = 0) -> list[dict]:
+        return self.database.subtrees(None, depth)
+
+    def get_children(self, hts_code: str):
+        found = self.database.subtrees(hts_code, 1)
+        return found[0]["children"] if found else None
+
+    def get_subtree(self, hts_code: str, depth: int = 1):
+        found = self.database.subtrees(hts_code, depth)
+        return found[0] if found else None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: python catalog_db.py <catalog.sqlite> <chapter99.json>")
+        return 2
+    with open(argv[1], encoding="utf-8") as f:
+        rules = json.load(f)
+    replace_ch99_rules(argv[0], rules)
+    print(f"Replaced the Chapter 99 rules of {argv[0]} with {len(rules)} rules from {argv[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+"""
+Columnar binary catalog format (.htsc), loaded through mmap.
+
+Layout: 8-byte magic, uint32 header length, JSON header, then 8-byte aligned
+column blobs. Every string (codes, descriptions, duty rates, units...) is stored
+once in a shared string table and rows refer to it by uint32 id; indents are a
+plain integer array. Worker processes mapping the same file share its pages
+through the OS page cache instead of each holding a parsed copy of the JSON
+catalog.
+
+The search postings and the tree's child lists are stored too, as offset/value
+array pairs, so loading builds no index and decodes no row: search and tree
+requests decode only the rows they return.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Sequence
+import numpy as np
+import orjson
+from hts_tree import tree_node
+from responses import compress
+from search_index import MAX_CANDIDATES, MAX_GRAM_FREQUENCY, NGRAM_SIZE, SearchIndex, normalize, ngrams
+
+MAGIC = b"HTSCAT2\0"
+NO_STRING = 0xFFFFFFFF
+ALIGNMENT = 8
+# Short strings (codes, rates, units) repeat across rows and are kept decoded
+INTERN_MAX_BYTES = 32
+
+STRING_FIELDS = ("hts_code", "stat_suffix", "level", "description", "parent_hts", "source")
+DUTY_FIELDS = ("general", "special", "other")
+LIST_FIELDS = ("units", "chapter99_refs", "keywords")
+# Fields rebuilt on load instead of stored
+DERIVED_FIELDS = ("description_clean", "requires_ch99", "created_at", "updated_at")
+KNOWN_FIELDS = set(STRING_FIELDS) | set(LIST_FIELDS) | set(DERIVED_FIELDS) | {"indent", "duties"}
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value) -> int:
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+
+def _csr(lists, n: int) -> tuple:
+    # Offsets and concatenated values of n lists of row ids
+    offsets = np.zeros(n + 1, dtype=np.uint32)
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    values = np.fromiter((value for values in lists for value in values), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _key_column(keys: list[str], width: int) -> np.ndarray:
+    # Normalized keys are ASCII; fixed width keeps them addressable without offsets
+    return np.frombuffer("".join(key.ljust(width, "\0") for key in keys).encode("ascii"), dtype=np.uint8)
+
+
+def _index_columns(columns: dict, rows: list[dict]):
+    """
+    Search postings and tree child lists of the rows.
+    """
+    index = SearchIndex(rows)
+    for name, table, width in (("grams", index.postings, NGRAM_SIZE), ("prefixes", index.prefixes, NGRAM_SIZE - 1)):
+        keys = sorted(table)
+        columns[f"search.{name}"] = _key_column(keys, width)
+        columns[f"search.{name}.offsets"], columns[f"search.{name}.values"] = _csr(
+            [sorted(table[key]) for key in keys], len(keys))
+    columns["search.lengths"] = np.fromiter(
+        (index.lengths[i] for i in range(len(rows))), dtype=np.uint32, count=len(rows))
+
+    # As in the tree builders, a duplicated code's last row is its node
+    nodes = {row.get("hts_code"): i for i, row in enumerate(rows)}
+    children = [[] for _ in rows]
+    roots = []
+    for i, row in enumerate(rows):
+        parent = nodes.get(row.get("parent_hts")) if row.get("parent_hts") else None
+        (children[parent] if parent is not None else roots).append(i)
+    columns["tree.roots"] = np.asarray(roots, dtype=np.uint32)
+    columns["tree.children.offsets"], columns["tree.children.values"] = _csr(children, len(rows))
+
+
+def write_catalog_file(path: str, rows: list[dict], metadata: dict = None):
+    """
+    Writes rows in the columnar format, atomically replacing `path`.
+    """
+    strings = _StringTable()
+    n = len(rows)
+
+    columns = {}
+    for field in STRING_FIELDS:
+        columns[field] = np.fromiter((strings.intern(row.get(field)) for row in rows), dtype=np.uint32, count=n)
+    for field in DUTY_FIELDS:
+        columns[field] = np.fromiter(
+            (strings.intern((row.get("duties") or {}).get(field)) for row in rows), dtype=np.uint32, count=n)
+    columns["indent"] = np.fromiter((int(row.get("indent") or 0) for row in rows), dtype=np.int16, count=n)
+
+    for field in LIST_FIELDS:
+        offsets = np.zeros(n + 1, dtype=np.uint32)
+        values = []
+        for i, row in enumerate(rows):
+            values.extend(strings.intern(v) for v in row.get(field) or [])
+            offsets[i + 1] = len(values)
+        columns[f"{field}.offsets"] = offsets
+        columns[f"{field}.values"] = np.asarray(values, dtype=np.uint32)
+
+    # Anything outside the fixed schema (footnotes, effective period...) as JSON
+    columns["extra"] = np.fromiter(
+        (strings.intern(json.dumps(extra, separators=(",", ":"), default=str)) if extra else NO_STRING
+         for extra in ({k: v for k, v in row.items() if k not in KNOWN_FIELDS} for row in rows)),
+        dtype=np.uint32, count=n)
+    _index_columns(columns, rows)
+
+    encoded = [value.encode("utf-8") for value in strings.values]
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+    columns["strings.offsets"] = string_offsets
+    columns["strings.data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # Lay out the blobs after the header; header size depends on the offsets
+    layout = {}
+    header = b""
+    for _ in range(3):
+        position = _align(len(MAGIC) + 4 + len(header))
+        for name, array in columns.items():
+            layout[name] = [position, int(array.size), array.dtype.str]
+            position = _align(position + array.nbytes)
+        header = json.dumps({"metadata": metadata or {}, "row_count": n, "columns": layout}).encode("utf-8")
+
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for name, array in columns.items():
+                f.write(b"\0" * (layout[name][0] - f.tell()))
+                f.write(array.tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _align(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class MappedCatalogFile(Sequence):
+    """
+    Read-only view of a .htsc file. Columns are NumPy arrays over the mapping;
+    rows are decoded into dicts on access.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            # Earlier versions lack the stored indexes; ingest.py rewrites them
+            raise ValueError(f"{path} is not an HTS catalog file of this version")
+        (header_len,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mmap[start:start + header_len])
+
+        self.metadata = header["metadata"]
+        self.row_count = header["row_count"]
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=count, offset=offset)
+            for name, (offset, count, dtype) in header["columns"].items()
+        }
+        self._string_offsets = self.columns["strings.offsets"]
+        self._string_data = self.columns["strings.data"]
+        self._cache = {}
+        self._codes = None
+
+    def string(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        value = self._cache.get(string_id)
+        if value is None:
+            start, end = int(self._string_offsets[string_id]), int(self._string_offsets[string_id + 1])
+            value = self._string_data[start:end].tobytes().decode("utf-8")
+            if end - start <= INTERN_MAX_BYTES:
+                self._cache[string_id] = value
+        return value
+
+    def _list(self, field: str, i: int) -> list:
+        offsets = self.columns[f"{field}.offsets"]
+        values = self.columns[f"{field}.values"][offsets[i]:offsets[i + 1]]
+        return [self.string(v) for v in values]
+
+    def __len__(self):
+        return self.row_count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.row_count))]
+        if i < 0:
+            i += self.row_count
+        if not 0 <= i < self.row_count:
+            raise IndexError(i)
+        c = self.columns
+        row = {field: self.string(c[field][i]) for field in STRING_FIELDS}
+        row["indent"] = int(c["indent"][i])
+        row["description_clean"] = (row["description"] or "").lower()
+        row["duties"] = {field: self.string(c[field][i]) for field in DUTY_FIELDS}
+        row["units"] = self._list("units", i)
+        row["chapter99_refs"] = self._list("chapter99_refs", i)
+        row["requires_ch99"] = bool(row["chapter99_refs"])
+        keywords = self._list("keywords", i)
+        if keywords:
+            row["keywords"] = keywords
+        extra = self.string(c["extra"][i])
+        if extra:
+            row.update(json.loads(extra))
+        return row
+
+    def index_rows(self) -> list[dict]:
+        """
+        Minimal rows (hts_code, description_clean, keywords, chapter99_refs) for
+        building the in-memory indexes without decoding every column.
+        """
+        c = self.columns
+        rows = []
+        for i in range(self.row_count):
+            row = {
+                "hts_code": self.string(int(c["hts_code"][i])),
+                "description_clean": (self.string(int(c["description"][i])) or "").lower(),
+            }
+            keywords = self._list("keywords", i)
+            if keywords:
+                row["keywords"] = keywords
+            refs = self._list("chapter99_refs", i)
+            if refs:
+                row["chapter99_refs"] = refs
+            rows.append(row)
+        return rows
+
+    def codes(self) -> list:
+        """
+        The hts_code of every row, decoded once.
+        """
+        if self._codes is None:
+            self._codes = [self.string(string_id) for string_id in self.columns["hts_code"].tolist()]
+        return self._codes
+
+    def first_ids(self):
+        """
+        (hts_code, id of its first row) pairs.
+        """
+        first = {}
+        for item_id, code in enumerate(self.codes()):
+            first.setdefault(code, item_id)
+        return first.items()
+
+
+def _key_positions(column: np.ndarray, width: int) -> dict:
+    text = column.tobytes().decode("ascii")
+    return {text[i:i + width].rstrip("\0"): i // width for i in range(0, len(text), width)}
+
+
+class MappedSearchIndex:
+    """
+    N-gram index stored in a .htsc file, with the lookup interface and
+    results of search_index.SearchIndex. Read-only; postings are slices of
+    the mapping.
+    """
+
+    def __init__(self, mapped: MappedCatalogFile):
+        c = mapped.columns
+        self.size = len(mapped)
+        self._grams = _key_positions(c["search.grams"], NGRAM_SIZE)
+        self._prefixes = _key_positions(c["search.prefixes"], NGRAM_SIZE - 1)
+        self._columns = c
+        self._lengths = c["search.lengths"]
+
+    def _posting(self, name: str, position: int) -> np.ndarray:
+        offsets = self._columns[f"search.{name}.offsets"]
+        return self._columns[f"search.{name}.values"][offsets[position]:offsets[position + 1]]
+
+    def _prefix(self, norm: str) -> np.ndarray:
+        position = self._prefixes.get(norm)
+        return self._posting("prefixes", position) if position is not None else self._lengths[:0]
+
+    def _selective(self, norm: str, limit: int) -> list[np.ndarray]:
+        postings = [self._posting("grams", self._grams[gram]) for gram in ngrams(norm) if gram in self._grams]
+        if not postings:
+            return []
+        max_df = max(limit, int(self.size * MAX_GRAM_FREQUENCY))
+        return [posting for posting in postings if len(posting) <= max_df] or [min(postings, key=len)]
+
+    def candidates(self, query: str, limit: int = MAX_CANDIDATES) -> list[int]:
+        norm = normalize(query)
+        if not norm:
+            return []
+        if len(norm) < NGRAM_SIZE:
+            return self._prefix(norm)[:limit].tolist()
+        selective = self._selective(norm, limit)
+        if not selective:
+            return []
+        ids, overlap = np.unique(np.concatenate(selective), return_counts=True)
+        # Most shared n-grams, then shortest text, then catalog order
+        order = np.lexsort((ids, self._lengths[ids], -overlap))[:limit]
+        return ids[order].tolist()
+
+    def match_count(self, query: str) -> int:
+        norm = normalize(query)
+        if not norm:
+            return 0
+        if len(norm) < NGRAM_SIZE:
+            return len(self._prefix(norm))
+        selective = sorted(self._selective(norm, MAX_CANDIDATES), key=len)
+        if not selective:
+            return 0
+        matches = selective[0]
+        for posting in selective[1:]:
+            matches = np.intersect1d(matches, posting, assume_unique=True)
+        return len(matches)
+
+
+class MappedTree:
+    """
+    HTS hierarchy stored in a .htsc file as child lists, with the read
+    interface of hts_tree.HTSTree. Only the rows of the nodes served are
+    decoded; the full tree is built once, when requested.
+    """
+
+    def __init__(self, mapped: MappedCatalogFile, etag: str):
+        self.mapped = mapped
+        self.etag = etag
+        c = mapped.columns
+        self._root_ids = c["tree.roots"]
+        self._offsets = c["tree.children.offsets"]
+        self._children = c["tree.children.values"]
+        self._nodes = None
+        self._roots = None
+        self._json = {}
+
+    def _node_id(self, hts_code: str):
+        if self._nodes is None:
+            # A duplicated code's last row is its node
+            self._nodes = {code: item_id for item_id, code in enumerate(self.mapped.codes())}
+        return self._nodes.get(hts_code)
+
+    def _limit(self, item_id: int, depth: int = None) -> dict:
+        children = self._children[self._offsets[item_id]:self._offsets[item_id + 1]].tolist()
+        node = tree_node(self.mapped[item_id])
+        node["child_count"] = len(children)
+        if depth is None or depth > 0:
+            node["children"] = [self._limit(child, None if depth is None else depth - 1) for child in children]
+        return node
+
+    @property
+    def roots(self) -> list[dict]:
+        if self._roots is None:
+            self._roots = [self._limit(item_id) for item_id in self._root_ids.tolist()]
+        return self._roots
+
+    def to_json(self, encoding: str = None) -> bytes:
+        body = self._json.get(encoding)
+        if body is None:
+            body = orjson.dumps(self.roots, default=str) if encoding is None else compress(self.to_json(), encoding)
+            self._json[encoding] = body
+        return body
+
+    def get_roots(self, depth: int = 0) -> list[dict]:
+        return [self._limit(item_id, depth) for item_id in self._root_ids.tolist()]
+
+    def get_children(self, hts_code: str):
+        item_id = self._node_id(hts_code)
+        if item_id is None:
+            return None
+        return self._limit(item_id, 1)["children"]
+
+    def get_subtree(self, hts_code: str, depth: int = 1):
+        item_id = self._node_id(hts_code)
+        return self._limit(item_id, depth) if item_id is not None else None
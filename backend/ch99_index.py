@@ -0,0 +1,73 @@
+import json
+from collections import defaultdict
+from datetime import date
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class Ch99Index:
+    """
+    Chapter 99 rules keyed by (ch99 heading, country) for O(1) lookups.
+    Each rule applies from `effective_from` up to, but excluding, `effective_to`
+    (either may be missing for an open range).
+    """
+
+    def __init__(self, rules: list[dict]):
+        self.by_key = defaultdict(list)
+        for rule in rules:
+            start = _parse_date(rule.get("effective_from"))
+            end = _parse_date(rule.get("effective_to"))
+            self.by_key[(rule.get("hts_code"), rule.get("country"))].append((start, end, rule))
+        for entries in self.by_key.values():
+            entries.sort(key=lambda entry: entry[0] or date.min)
+
+    def lookup(self, heading: str, country_code: str, as_of: date = None) -> list[dict]:
+        """
+        Rules for a heading and country that are in effect on `as_of` (default today).
+        """
+        entries = self.by_key.get((heading, country_code))
+        if not entries:
+            return []
+        as_of = _parse_date(as_of) or date.today()
+        return [
+            rule for start, end, rule in entries
+            if (start is None or start <= as_of) and (end is None or as_of < end)
+        ]
+
+
+def reverse_index(rows) -> dict[str, list[int]]:
+    """
+    Chapter 99 heading -> ids of the rows whose chapter99_refs name it, in row
+    order. None rows (removed by a revision delta) are skipped.
+    """
+    referrers = defaultdict(list)
+    for item_id, row in enumerate(rows):
+        if row is None:
+            continue
+        for heading in row.get("chapter99_refs") or ():
+            referrers[heading].append(item_id)
+    return dict(referrers)
+
+
+def changed_rule_keys(old_rules: list[dict], new_rules: list[dict]) -> set[tuple]:
+    """
+    (heading, country) keys whose rules were added, removed or edited between
+    two versions of chapter99.json.
+    """
+    def grouped(rules):
+        groups = defaultdict(list)
+        for rule in rules:
+            groups[(rule.get("hts_code"), rule.get("country"))].append(json.dumps(rule, sort_keys=True, default=str))
+        return {key: sorted(entries) for key, entries in groups.items()}
+
+    old, new = grouped(old_rules), grouped(new_rules)
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
@@ -1,4 +1,88 @@
 import re
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+
+# Distinct rate strings kept compiled; HTS uses a few thousand at most
+RATE_CACHE_SIZE = 4096
+
+AD_VALOREM_REGEX = re.compile(r"([\d.]+)\s*%")
+CENTS_REGEX = re.compile(r"([\d.]+)\s*(?:¢|cents?\b|c\b)(?:\s*/\s*([^\s+;,()]+)|\s+(each))?")
+DOLLARS_REGEX = re.compile(r"\$\s*([\d.]+)(?:\s*/\s*([^\s+;,()]+)|\s+(each))?")
+PROGRAMS_REGEX = re.compile(r"\(([^)]*)\)")
+
+
+@dataclass(frozen=True)
+class CompiledRate:
+    """
+    A duty rate string parsed once into its arithmetic parts.
+
+    ad_valorem: fraction of declared value (0.025 for "2.5%")
+    specific: dollars per unit of quantity (0.019 for "1.9¢/kg")
+    unit: unit of the specific part ("kg"), None if there is none
+    compound: True when both parts apply ("15.4¢/kg + 40.5%")
+    free: True for "Free" rates
+    programs: special program / country codes a "Free (A,AU,BH...)" rate applies to
+    """
+    text: str
+    ad_valorem: float = 0.0
+    specific: float = 0.0
+    unit: str | None = None
+    compound: bool = False
+    free: bool = False
+    programs: frozenset = frozenset()
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+@lru_cache(maxsize=RATE_CACHE_SIZE)
+def compile_rate(value: str) -> CompiledRate:
+    """
+    Parses a rate string like "2.5%", "1.9¢/kg", "15.4¢/kg + 40.5%" or
+    "Free (A,AU,BH)" into a CompiledRate. Memoized per distinct string.
+    """
+    if not value:
+        return CompiledRate(text="")
+
+    text = str(value).strip()
+    val_str = text.lower()
+
+    # Anywhere in the text, as in "See note 2: Free (A,AU)"
+    if "free" in val_str:
+        programs = frozenset()
+        match = PROGRAMS_REGEX.search(text)
+        if match:
+            programs = frozenset(c.strip() for c in match.group(1).split(","))
+        return CompiledRate(text=text, free=True, programs=programs)
+
+    # Ad valorem part strictly requires '%' to avoid confusing specific rates
+    match = AD_VALOREM_REGEX.search(val_str)
+    ad_valorem = _to_float(match.group(1)) / 100.0 if match else 0.0
+
+    specific, unit = 0.0, None
+    match = CENTS_REGEX.search(val_str)
+    if match:
+        specific = _to_float(match.group(1)) / 100.0
+        unit = match.group(2) or match.group(3)
+    else:
+        match = DOLLARS_REGEX.search(val_str)
+        if match:
+            specific = _to_float(match.group(1))
+            unit = match.group(2) or match.group(3)
+
+    return CompiledRate(
+        text=text,
+        ad_valorem=ad_valorem,
+        specific=specific,
+        unit=unit,
+        compound=ad_valorem > 0 and specific > 0,
+    )
+
 
 def parse_percent(value: str) -> float:
     """
@@ -6,44 +90,13 @@ def parse_percent(value: str) -> float:
     Returns 0.0 if value is Free, None, or invalid.
     Strictly requires '%' symbol for numeric values to avoid confusing specific rates.
     """
-    if not value:
-        return 0.0
-    
-    val_str = str(value).lower().strip()
-    if "free" in val_str:
-        return 0.0
-        
-    if "%" not in val_str:
-        return 0.0
-    
-    # Extract number
-    match = re.search(r"([\d\.]+)", val_str)
-    if match:
-        try:
-            return float(match.group(1)) / 100.0
-        except ValueError:
-            return 0.0
-            
-    return 0.0
+    return compile_rate(value).ad_valorem
 
 def parse_cents(value: str) -> float:
     """
     Parses a specific rate string like "6.5¢/kg" into a float dollars (0.065).
     """
-    if not value:
-        return 0.0
-        
-    val_str = str(value).lower().strip()
-    # Looks for cents symbol or "¢"
-    match = re.search(r"([\d\.]+)\s*(?:¢|c|cents)", val_str)
-    if match:
-        try:
-            return float(match.group(1)) / 100.0
-        except ValueError:
-            return 0.0
-    
-    # Might handle $/kg too if needed, but per specs focused on cents
-    return 0.0
+    return compile_rate(value).specific
 
 def calculate_duty(
     hts_doc: dict,
@@ -61,45 +114,18 @@ def calculate_duty(
     country_code: ISO 2-char country code of origin (e.g. "CA", "CN")
     chapter99_duties: List of dicts e.g. [{"type": "percent", "rate": 0.25}] for Section 301
     """
-    duty = 0.0
     duties_meta = hts_doc.get("duties", {})
 
     # 1️⃣ General duty
-    general_rate = duties_meta.get("general")
-    if general_rate:
-        # Assuming general is usually ad valorem percent. 
-        # Real world is mixed (compound duties), but we start with percent as per prompt "6.5%"
-        rate = parse_percent(general_rate)
-        # Check if it might be specific? 
-        # Prompt examples: "6.5%", "14%". "15.4¢/kg + 40.5%" usually in 'other' or complex general
-        # For this version we treat general as ad valorem primarily unless forced otherwise.
-        # But wait, specs said "General duty rate... 6.5%".
-        # If parse_percent returns > 0, use it.
-        # Implementation note: parse_percent is safe.
-        duty += declared_value * rate
-        
-        # If General was specific (e.g. cents/kg), parse_percent might return 0 if no %.
-        # Let's check for specific if percent was 0 and string wasn't "Free"
-        if rate == 0.0 and "free" not in str(general_rate).lower():
-             spec_rate = parse_cents(general_rate)
-             if spec_rate > 0:
-                 duty += quantity * spec_rate
+    # Ad valorem and specific parts both apply for compound rates
+    general = compile_rate(duties_meta.get("general"))
+    duty = declared_value * general.ad_valorem + quantity * general.specific
 
     # 2️⃣ Preferential duty (FTA)
-    special = duties_meta.get("special") or ""
-    # "Free (A,AU,BH,CL...)"
-    # We check if country_code is in the parens
-    if special and "free" in special.lower():
-        # Simple check: is country code in the string inside parens?
-        # e.g. (A, AU, ...)
-        # Regex to find codes in parens
-        if "(" in special and ")" in special:
-            content = special[special.find("(")+1:special.find(")")]
-            codes = [c.strip() for c in content.split(",")]
-            # Mapping: "CA" might match 'CA' or 'MX' (USMCA uses 'S' sometimes? user spec says "Free (A,AU...)")
-            # We assume direct match for now.
-            if country_code in codes:
-                duty = 0.0 # Override General
+    # "Free (A,AU,BH,CL...)": country codes in the parens override General
+    special = compile_rate(duties_meta.get("special"))
+    if country_code in special.programs:
+        duty = 0.0
 
     # 3️⃣ Chapter 99 additional duties
     # These stack on top
@@ -110,3 +136,40 @@ def calculate_duty(
             duty += quantity * ch99["rate"]
 
     return round(duty, 2)
+
+
+def sum_ch99_rates(chapter99_duties: list[dict]) -> tuple[float, float]:
+    """
+    Totals Chapter 99 duties into (ad valorem fraction, specific dollars per unit).
+    """
+    percent = sum(ch99["rate"] for ch99 in chapter99_duties if ch99["type"] == "percent")
+    specific = sum(ch99["rate"] for ch99 in chapter99_duties if ch99["type"] == "specific")
+    return percent, specific
+
+
+def calculate_duty_vectorized(
+    declared_values,
+    quantities,
+    ad_valorem_rates,
+    specific_rates,
+    special_free,
+    ch99_percent,
+    ch99_specific,
+):
+    """
+    Array version of calculate_duty for many line items at once.
+
+    All arguments are equal-length arrays, one entry per line:
+    ad_valorem_rates / specific_rates come from the compiled general rate,
+    special_free marks lines whose country is in the special rate's programs,
+    ch99_percent / ch99_specific are the summed Chapter 99 rates.
+    Returns (base_duty, ch99_duty, total_duty) arrays rounded to cents.
+    """
+    values = np.asarray(declared_values, dtype=np.float64)
+    qty = np.asarray(quantities, dtype=np.float64)
+
+    base = values * np.asarray(ad_valorem_rates, dtype=np.float64) + qty * np.asarray(specific_rates, dtype=np.float64)
+    base = np.where(np.asarray(special_free, dtype=bool), 0.0, base)
+    ch99 = values * np.asarray(ch99_percent, dtype=np.float64) + qty * np.asarray(ch99_specific, dtype=np.float64)
+
+    return np.round(base, 2), np.round(ch99, 2), np.round(base + ch99, 2)
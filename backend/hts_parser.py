@@ -71,3 +71,23 @@ def parse_hts_row(row: dict) -> dict:
         "created_at": datetime.utcnow().isoformat(), # JSON serializable
         "updated_at": datetime.utcnow().isoformat(),
     }
+
+def assign_parents_by_indent(rows):
+    """
+    Sets parent_hts from indent levels for rows in schedule order.
+
+    infer_parent only strips the last code segment, which misses the real
+    parent when intermediate headings have no own code. Here the parent is the
+    nearest preceding coded row with a smaller indent. Rows without a code
+    (pure text headings) are dropped but do not break the hierarchy.
+    """
+    stack = []
+    for row in rows:
+        if not row.get("hts_code"):
+            continue
+        indent = row.get("indent", 0)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        row["parent_hts"] = stack[-1][1] if stack else None
+        stack.append((indent, row["hts_code"]))
+        yield row
@@ -0,0 +1,179 @@
+import threading
+import orjson
+from responses import compress
+
+# Row fields the tree never serves: search-only or per-ingest bookkeeping
+DROPPED_FIELDS = ('description_clean', 'created_at', 'updated_at')
+# Row fields every node carries, as .htsc files decode them, when a JSON or
+# database row leaves them out
+NODE_DEFAULTS = {'stat_suffix': None, 'level': None, 'parent_hts': None, 'source': None, 'indent': 0}
+DUTY_COLUMNS = ('general', 'special', 'other')
+
+
+def tree_node(item: dict) -> dict:
+    """
+    Tree node of a catalog row: its served fields, with the description as
+    name and the number of children. Every tree backend builds its nodes here,
+    so /api/tree has the same shape whatever the catalog is stored in.
+    """
+    node = {**NODE_DEFAULTS, **{k: v for k, v in item.items() if k not in DROPPED_FIELDS}}
+    duties = item.get('duties') or {}
+    node['duties'] = {column: duties.get(column) for column in DUTY_COLUMNS}
+    node['units'] = list(item.get('units') or [])
+    node['chapter99_refs'] = list(item.get('chapter99_refs') or [])
+    node['requires_ch99'] = bool(node['chapter99_refs'])
+    if not node.get('keywords'):
+        node.pop('keywords', None)
+    node['children'] = []
+    node['name'] = item.get('description')
+    node['child_count'] = 0
+    return node
+
+
+def _shallow(node: dict) -> dict:
+    """
+    Copy of a tree node without its children, plus the number of children
+    so clients know whether it can be expanded.
+    """
+    shallow = {k: v for k, v in node.items() if k != 'children'}
+    shallow['child_count'] = len(node['children'])
+    shallow['children'] = []
+    return shallow
+
+
+class HTSTree:
+    """
+    Hierarchy of HTS rows linked through parent_hts.
+    Built once per catalog version and patched in place by catalog revision
+    deltas; nodes are shared and must not be mutated by readers. Patches and
+    reads hold `lock`, so a serialized tree always matches the ETag it is
+    cached under; the catalog holds it across a whole delta.
+    """
+
+    def __init__(self, items: list[dict], etag: str):
+        self.etag = etag
+        self.lock = threading.RLock()
+        # optimize lookup
+        self.node_map = {item['hts_code']: tree_node(item) for item in items}
+        self.roots = []
+
+        # Build tree
+        for item in items:
+            self._link(self.node_map[item['hts_code']])
+
+        # Serialized full tree per content-coding (None for identity)
+        self._json = {}
+
+    def _link(self, node: dict):
+        parent_code = node.get('parent_hts')
+        if parent_code and parent_code in self.node_map:
+            parent = self.node_map[parent_code]
+            parent['children'].append(node)
+            parent['child_count'] = len(parent['children'])
+        else:
+            # If no parent or parent not found in subset, treat as root
+            self.roots.append(node)
+
+    def _unlink(self, node: dict):
+        parent = self.node_map.get(node.get('parent_hts'))
+        siblings = parent['children'] if parent is not None else self.roots
+        for i, sibling in enumerate(siblings):
+            if sibling is node:
+                del siblings[i]
+                if parent is not None:
+                    parent['child_count'] = len(siblings)
+                return
+
+    def add(self, item: dict, etag: str):
+        """
+        Inserts a row; roots whose parent is the new code move under it.
+        """
+        with self.lock:
+            node = tree_node(item)
+            self.node_map[item['hts_code']] = node
+            adopted = [root for root in self.roots if root.get('parent_hts') == item['hts_code']]
+            if adopted:
+                self.roots = [root for root in self.roots if root.get('parent_hts') != item['hts_code']]
+                node['children'].extend(adopted)
+                node['child_count'] = len(adopted)
+            self._link(node)
+            self._changed(etag)
+
+    def remove(self, hts_code: str, etag: str):
+        """
+        Deletes a node; its children become roots, as orphans do at build time.
+        """
+        with self.lock:
+            node = self.node_map.pop(hts_code, None)
+            if node is None:
+                return
+            self._unlink(node)
+            self.roots.extend(node['children'])
+            self._changed(etag)
+
+    def update(self, item: dict, etag: str):
+        """
+        Replaces a node's fields in place, keeping its children.
+        """
+        with self.lock:
+            node = self.node_map.get(item['hts_code'])
+            if node is None:
+                return self.add(item, etag)
+            if node.get('parent_hts') != item.get('parent_hts'):
+                self._unlink(node)
+                node['parent_hts'] = item.get('parent_hts')
+                self._link(node)
+            children = node['children']
+            node.update(tree_node(item))
+            node['children'] = children
+            node['child_count'] = len(children)
+            self._changed(etag)
+
+    def _changed(self, etag: str):
+        self.etag = etag
+        self._json = {}
+
+    def to_json(self, encoding: str = None) -> bytes:
+        """
+        Serialized full tree, compressed with `encoding` when given. Each
+        variant is encoded once and reused for every request.
+        """
+        with self.lock:
+            body = self._json.get(encoding)
+            if body is None:
+                if encoding is None:
+                    body = orjson.dumps(self.roots, default=str)
+                else:
+                    body = compress(self.to_json(), encoding)
+                self._json[encoding] = body
+            return body
+
+    def _limit(self, node: dict, depth: int) -> dict:
+        limited = _shallow(node)
+        if depth > 0:
+            limited['children'] = [self._limit(child, depth - 1) for child in node['children']]
+        return limited
+
+    def get_roots(self, depth: int = 0) -> list[dict]:
+        with self.lock:
+            return [self._limit(node, depth) for node in self.roots]
+
+    def get_children(self, hts_code: str):
+        """
+        Direct children of a node, without grandchildren. None if the code is unknown.
+        """
+        with self.lock:
+            node = self.node_map.get(hts_code)
+            if node is None:
+                return None
+            return [_shallow(child) for child in node['children']]
+
+    def get_subtree(self, hts_code: str, depth: int = 1):
+        """
+        A node with its descendants down to `depth` levels. None if the code is unknown.
+        """
+        with self.lock:
+            node = self.node_map.get(hts_code)
+            if node is None:
+                return None
+            return self._limit(node, depth)
@@ -0,0 +1,257 @@
+"""
+Offline ingestion of a full HTS release into the catalog artifact the API loads.
+
+    python ingest.py hts_2025_revision_1.json --release 2025-rev1
+    python ingest.py hts_export.csv --output data/catalog.json --workers 4
+    python ingest.py hts_2025_revision_1.json --output data/catalog.htsc
+    python ingest.py hts_2025_revision_1.json --output data/catalog.sqlite
+
+Rows are streamed from disk, parsed with parse_hts_row in a process pool with a
+bounded number of chunks in flight, linked to their parents by indent and
+written out row by row, so memory stays flat regardless of release size.
+The TF-IDF matrix for semantic search is written next to the artifact
+(e.g. catalog.json.vectors.npy, catalog.json.idf.npy) unless --no-vectors is given.
+A .sqlite output also stores the Chapter 99 rules (see catalog_db.py).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from hts_parser import parse_hts_row, assign_parents_by_indent
+from catalog import DATA_DIR, CH99_DATA_PATH
+from catalog_store import write_catalog_file
+from catalog_db import write_catalog_db, is_database_path
+from semantic import SemanticIndex
+
+CATALOG_FORMAT = "hts-catalog"
+CATALOG_FORMAT_VERSION = 1
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'catalog.json')
+CHUNK_SIZE = 1000
+READ_SIZE = 1024 * 1024
+
+# Header names of the USITC CSV export mapped to the API's JSON keys
+CSV_COLUMNS = {
+    "hts number": "htsno",
+    "indent": "indent",
+    "description": "description",
+    "unit of quantity": "units",
+    "general rate of duty": "general",
+    "special rate of duty": "special",
+    "column 2 rate of duty": "other",
+    "footnotes": "footnotes",
+}
+
+# Derived or per-run fields left out of the artifact; the catalog recomputes them
+DROPPED_FIELDS = ("description_clean", "created_at", "updated_at")
+
+
+def iter_json_array(f):
+    """
+    Yields the elements of a top-level JSON array without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array of HTS rows")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            row, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Row cut off at the end of the buffer: read more and retry
+            if eof:
+                raise
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield row
+
+
+def _csv_row(row: dict) -> dict:
+    mapped = {}
+    for header, value in row.items():
+        key = CSV_COLUMNS.get((header or "").strip().lower())
+        if key:
+            mapped[key] = value
+    if mapped.get("footnotes"):
+        mapped["footnotes"] = [{"value": mapped["footnotes"]}]
+    else:
+        mapped.pop("footnotes", None)
+    mapped["indent"] = int(mapped.get("indent") or 0)
+    return mapped
+
+
+def read_rows(path: str):
+    """
+    Streams raw rows from a .json array, .jsonl or .csv release file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield _csv_row(row)
+        elif ext == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_chunk(chunk: list[dict]) -> list[dict]:
+    parsed = []
+    for row in chunk:
+        item = parse_hts_row(row)
+        for field in DROPPED_FIELDS:
+            item.pop(field, None)
+        parsed.append(item)
+    return parsed
+
+
+def parse_rows(rows, workers: int = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Parses rows in order, using a process pool when workers > 1.
+    At most two chunks per worker are in flight at any time.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in _chunks(rows, chunk_size):
+            yield from _parse_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(rows, chunk_size):
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _searchable(row: dict) -> dict:
+    # Only the fields the semantic vectors are built from
+    return {"description": row.get("description"), "keywords": row.get("keywords")}
+
+
+def ingest(source: str, output: str = DEFAULT_OUTPUT, release: str = None, workers: int = None,
+           vectors: bool = True, ch99_path: str = CH99_DATA_PATH) -> dict:
+    """
+    Runs the pipeline and atomically replaces `output`. Returns the artifact metadata.
+    An output ending in .htsc is written in the memory-mappable columnar format;
+    one ending in .sqlite is a catalog database that also holds the Chapter 99
+    rules of `ch99_path`. With `vectors`, the semantic search matrix is written
+    next to it.
+    """
+    release = release or os.path.splitext(os.path.basename(source))[0]
+    meta = {
+        "format": CATALOG_FORMAT,
+        "format_version": CATALOG_FORMAT_VERSION,
+        "release": release,
+        "source": os.path.basename(source),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    rows = assign_parents_by_indent(parse_rows(read_rows(source), workers=workers))
+
+    out_dir = os.path.dirname(os.path.abspath(output))
+    os.makedirs(out_dir, exist_ok=True)
+    if output.endswith(".htsc"):
+        # The columnar format needs the full string table before writing
+        rows = list(rows)
+        write_catalog_file(output, rows, meta)
+        meta["row_count"] = len(rows)
+        if vectors:
+            SemanticIndex.from_rows(_searchable(row) for row in rows).save(output)
+        return meta
+
+    if is_database_path(output):
+        searchable = []
+
+        def collect(rows):
+            for row in rows:
+                if vectors:
+                    searchable.append(_searchable(row))
+                yield row
+
+        rules = []
+        if ch99_path and os.path.exists(ch99_path):
+            with open(ch99_path, encoding="utf-8") as f:
+                rules = json.load(f)
+        # Rows are streamed into the database
+        meta["row_count"] = write_catalog_db(output, collect(rows), rules, meta)
+        if vectors:
+            SemanticIndex.from_rows(searchable).save(output)
+        return meta
+
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    count = 0
+    searchable = []
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(meta, separators=(",", ":"))[:-1])
+            f.write(',"rows":[')
+            for row in rows:
+                if count:
+                    f.write(",\n")
+                f.write(json.dumps(row, separators=(",", ":"), ensure_ascii=False))
+                if vectors:
+                    searchable.append(_searchable(row))
+                count += 1
+            f.write(f'],"row_count":{count}}}')
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    meta["row_count"] = count
+    if vectors:
+        SemanticIndex.from_rows(searchable).save(output)
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a full HTS release into the catalog artifact.")
+    parser.add_argument("source", help="HTS release export (.json, .jsonl or .csv)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="catalog artifact path; use a .htsc extension for the binary format "
+                             "or .sqlite for a catalog database")
+    parser.add_argument("--release", help="release name stored in the artifact (default: source file name)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--no-vectors", action="store_true", help="skip the semantic search matrix")
+    parser.add_argument("--ch99", default=CH99_DATA_PATH, help="Chapter 99 rules stored in a .sqlite output")
+    args = parser.parse_args(argv)
+
+    started = datetime.now()
+    meta = ingest(args.source, args.output, release=args.release, workers=args.workers,
+                  vectors=not args.no_vectors, ch99_path=args.ch99)
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"Wrote {meta['row_count']} rows of release {meta['release']} to {args.output} in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,101 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import (FastAPI, UploadFile, File, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect,
+                     Depends, Header)
 from fastapi.middleware.cors import CORSMiddleware
-from services import fetch_hts_codes, compare_excel
+from fastapi.responses import PlainTextResponse, FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager, suppress
+from services import (search_page, parse_cursor, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, lookup_hts_prefix,
+                      calculate_duty_batch, compare_duty_matrix, compare_excel, search_usitc, classify_products,
+                      read_products)
+from usitc_client import usitc_client, normalize_query
+from schemas import (DutyBatchRequest, DutyCompareRequest, ClassifyRequest, PortfolioRequest, DEFAULT_CLASSIFY_TOP_K,
+                     MAX_CLASSIFY_TOP_K)
+from catalog import load_catalog, get_catalog, reload_if_stale, set_auto_reload, RELOAD_CHECK_INTERVAL
+from revisions import revision_store, diff_revisions, apply_revision, replay_applied_revision
+from portfolio import portfolio_store, save_portfolio, recalculate_portfolio
+from workers import work_pool, PoolOverloaded, TaskTimeout
+from search_session import SearchSession
+from duty_engine import compile_rate
+from profiler import profiler, PROFILE_SLOW_MS, PROFILER_TOKEN
+from responses import (ORJSONResponse, CompressionMiddleware, negotiate_encoding, parse_fields, project,
+                       base_etag, encoded_etag)
+import metrics
+import asyncio
+import json
+import logging
+import secrets
+import threading
+import time
 import uvicorn
-import io
+import tempfile
 
-app = FastAPI(title="Customs Tracker API")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Long-running work gets more time than the pool default
+BATCH_TIMEOUT = 60.0
+SYNC_TIMEOUT = 300.0
+# Distinct product descriptions per classification task
+CLASSIFY_CHUNK_SIZE = 50
+
+logger = logging.getLogger(__name__)
+
+# Set (e.g. from a SIGHUP handler) to reload the catalog even if its files look unchanged
+reload_requested = threading.Event()
+
+def _reload_catalog() -> bool:
+    """
+    Reloads the catalog if needed and replays the revision applied through
+    the API, possibly by another serve.py worker. True if the catalog changed.
+    """
+    before = get_catalog()
+    if reload_requested.is_set():
+        reload_requested.clear()
+        catalog = load_catalog(before.hts_path, before.ch99_path)
+    else:
+        catalog = reload_if_stale()
+    replayed = replay_applied_revision() is not None
+    # Build derived structures before the new snapshot serves requests. Semantic
+    # vectors are only mapped here when stored; computing them waits for a semantic query
+    catalog.tree
+    if catalog.has_stored_vectors:
+        catalog.semantic_index
+    return catalog is not before or replayed
+
+async def watch_catalog():
+    """
+    Reloads the catalog off the event loop when its files change on disk, a
+    reload was requested or another process applied a revision. Requests in
+    flight finish on the previous snapshot.
+    """
+    while True:
+        await asyncio.sleep(RELOAD_CHECK_INTERVAL)
+        if await run_in_threadpool(_reload_catalog):
+            # Workers do not reload on their own; fresh ones fork from the new catalog
+            work_pool.restart()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the HTS catalog, its tree and stored vectors once so requests never parse the JSON files,
+    # then fork the workers so they share it. A catalog preloaded by serve.py is reused.
+    catalog = reload_if_stale()
+    replay_applied_revision()
+    catalog.tree
+    if catalog.has_stored_vectors:
+        catalog.semantic_index
+    set_auto_reload(False)
+    work_pool.start()
+    if PROFILE_SLOW_MS:
+        profiler.start(float(PROFILE_SLOW_MS) / 1000)
+    watcher = asyncio.create_task(watch_catalog())
+    yield
+    watcher.cancel()
+    with suppress(asyncio.CancelledError):
+        await watcher
+    profiler.stop()
+    work_pool.shutdown()
+    set_auto_reload(True)
+    await usitc_client.aclose()
+
+app = FastAPI(title="Customs Tracker API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,47 +103,468 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Cursor"],
 )
+app.add_middleware(CompressionMiddleware)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.monotonic()
+    response = await call_next(request)
+    finished = time.monotonic()
+    # Route template rather than the raw path keeps label cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.REQUEST_LATENCY.observe(finished - started, method=request.method, route=route,
+                                    status=str(response.status_code))
+    if profiler.enabled:
+        await run_in_threadpool(profiler.record, f"{request.method} {route}", started, finished)
+    return response
+
+def _cache_stats():
+    rates = compile_rate.cache_info()
+    return [
+        ("usitc", usitc_client.cache.hits, usitc_client.cache.misses),
+        ("compiled_rates", rates.hits, rates.misses),
+        ("search_queries", metrics.QUERY_CACHE_HITS.value(), metrics.QUERY_CACHE_MISSES.value()),
+    ]
+
+metrics.Gauge("hts_cache_hits_total", "Cache hits by cache (this process).",
+              lambda: [((name,), hits) for name, hits, _ in _cache_stats()], ("cache",), kind="counter")
+metrics.Gauge("hts_cache_misses_total", "Cache misses by cache (this process).",
+              lambda: [((name,), misses) for name, _, misses in _cache_stats()], ("cache",), kind="counter")
+metrics.Gauge("hts_cache_hit_ratio", "Cache hit ratio by cache (this process).",
+              lambda: [((name,), hits / (hits + misses) if hits + misses else 0.0)
+                       for name, hits, misses in _cache_stats()], ("cache",))
+metrics.Gauge("hts_catalog_load_seconds", "Time taken to load the current catalog.",
+              lambda: get_catalog().load_seconds)
+metrics.Gauge("hts_catalog_version", "Version counter of the current catalog.", lambda: get_catalog().version)
+metrics.Gauge("hts_catalog_rows", "Rows in the current catalog.", lambda: get_catalog().row_count)
+metrics.Gauge("usitc_upstream_calls_total", "Upstream USITC API calls.",
+              lambda: usitc_client.upstream_calls, kind="counter")
+metrics.Gauge("worker_pool_pending_tasks", "Tasks queued or running in the worker pool.",
+              lambda: work_pool.pending)
+metrics.Gauge("worker_pool_rejected_total", "Tasks rejected because the pool was full.",
+              lambda: work_pool.rejected, kind="counter")
+metrics.Gauge("worker_pool_timeouts_total", "Tasks that exceeded their timeout.",
+              lambda: work_pool.timed_out, kind="counter")
+
+@app.exception_handler(PoolOverloaded)
+async def pool_overloaded_handler(request: Request, exc: PoolOverloaded):
+    return ORJSONResponse({"detail": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+
+@app.exception_handler(TaskTimeout)
+async def task_timeout_handler(request: Request, exc: TaskTimeout):
+    return ORJSONResponse({"detail": "Request timed out"}, status_code=503, headers={"Retry-After": "5"})
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Customs Tracker API is running"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics in the text exposition format.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def _profiler_admin(x_admin_token: str | None = Header(None)):
+    if not PROFILER_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiler endpoints are disabled")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, PROFILER_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/debug/profiler", dependencies=[Depends(_profiler_admin)])
+async def get_profiler():
+    """
+    Sampling profiler state and the profiles recorded for slow requests.
+    """
+    return {
+        "enabled": profiler.enabled,
+        "threshold_ms": profiler.threshold * 1000 if profiler.enabled else None,
+        "profiles": list(profiler.profiles),
+    }
+
+@app.post("/debug/profiler", dependencies=[Depends(_profiler_admin)])
+async def set_profiler(enabled: bool, threshold_ms: float = Query(500.0, ge=0)):
+    """
+    Turns the sampling profiler on or off. While on, requests slower than
+    threshold_ms are saved as folded stacks for flame graphs.
+    The /debug/profiler endpoints need PROFILER_TOKEN set and sent as X-Admin-Token.
+    """
+    if enabled:
+        profiler.start(threshold_ms / 1000)
+    else:
+        await run_in_threadpool(profiler.stop)
+    return await get_profiler()
+
+@app.get("/debug/profiler/{name}", dependencies=[Depends(_profiler_admin)])
+async def get_profile(name: str):
+    """
+    A recorded profile as folded stacks (flamegraph.pl / speedscope input).
+    """
+    path = profiler.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain")
+
+def _fields(fields: str | None):
+    try:
+        return parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
 @app.get("/api/search")
-def search_hts(q: str = ""):
+async def search_hts(q: str = "", limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+                     cursor: str | None = None, mode: str = Query("fuzzy", pattern="^(fuzzy|semantic)$"),
+                     fields: str | None = None):
     """
     Search for HTS codes by product name or description.
+    mode=semantic ranks by TF-IDF similarity with synonyms instead of fuzzy matching.
+    Returns one page of results; X-Next-Cursor is passed back as `cursor` for
+    the next page and X-Total-Count is the number of matches. Fuzzy queries
+    matching more rows than one candidate pool count the rows containing the
+    query, so their total is an estimate; deeper cursors widen the pool.
+    fields=hts_code,description limits each result to those fields.
+    Scoring runs in the worker pool.
+    """
+    try:
+        parse_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {cursor!r}")
+    fields = _fields(fields)
+    page = await work_pool.run(search_page, q, limit, cursor, mode)
+    headers = {"X-Total-Count": str(page["total"])}
+    if page["next_cursor"] is not None:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return ORJSONResponse(project(page["results"], fields), headers=headers)
+
+async def _stream_search(websocket: WebSocket, session: SearchSession, seq, query: str, limit: int, mode: str):
+    try:
+        async for message in session.search(query, limit, mode):
+            await websocket.send_json({"seq": seq, "q": query, **message})
+    except ValueError as exc:
+        await websocket.send_json({"seq": seq, "q": query, "error": str(exc)})
+    except PoolOverloaded:
+        await websocket.send_json({"seq": seq, "q": query, "error": "Server busy, retry shortly"})
+    except TaskTimeout:
+        await websocket.send_json({"seq": seq, "q": query, "error": "Search timed out"})
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            # Superseded by the next message or the connection closed
+            raise
+        await websocket.send_json({"seq": seq, "q": query, "error": "Server busy, retry shortly"})
+    except Exception:
+        logger.exception("Search session query %r failed", query)
+        await websocket.send_json({"seq": seq, "q": query, "error": "Search failed"})
+
+@app.websocket("/api/search/session")
+async def search_session(websocket: WebSocket):
+    """
+    As-you-type search. Each client message {"q", "limit"?, "mode"?, "seq"?}
+    supersedes the previous one, whose search is cancelled. Replies echo seq
+    and q: a preliminary {"results", "final": false} may precede the
+    {"results", "total", "final": true} page. Extending the previous query
+    only rescores the rows that matched it.
     """
-    results = fetch_hts_codes(q)
-    return results
+    await websocket.accept()
+    session = SearchSession()
+    task = None
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except (KeyError, ValueError):
+                # Binary frames (no "text" key) and malformed JSON get an error, not a dropped session
+                message = None
+            if task is not None:
+                task.cancel()
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": "Expected a JSON object"})
+                continue
+            try:
+                limit = int(message.get("limit", DEFAULT_SEARCH_LIMIT))
+            except (TypeError, ValueError):
+                limit = DEFAULT_SEARCH_LIMIT
+            task = asyncio.create_task(_stream_search(
+                websocket, session, message.get("seq"), str(message.get("q") or ""), limit,
+                message.get("mode") or "fuzzy"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if task is not None:
+            task.cancel()
+
+@app.get("/api/hts/{prefix}")
+async def autocomplete_hts(prefix: str, limit: int = Query(20, ge=1, le=200)):
+    """
+    Autocomplete HTS codes by prefix (e.g. "8471.30").
+    """
+    # Database and mapped catalogs read the code index and rows from disk
+    return await run_in_threadpool(lookup_hts_prefix, prefix, limit=limit)
 
 @app.get("/api/usitc-search")
-def search_usitc_proxy(q: str = ""):
+async def search_usitc_proxy(q: str = ""):
     """
     Proxy to USITC API
     """
-    from services import search_usitc
-    return search_usitc(q)
+    return await search_usitc(q)
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    # Compressed variants carry the tag with an encoding suffix; either form matches
+    candidates = [base_etag(tag) for tag in header.split(",")]
+    return etag in candidates or "*" in candidates
+
+# Tree handlers run in the threadpool: building a tree and the SQLite or
+# memory-mapped node queries are catalog I/O
+
+def _tree(request: Request, depth: int | None, fields):
+    tree = get_catalog().tree
+    full = depth is None and fields is None
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if full else None
+    # Each content-coding of the full tree gets its own strong ETag
+    headers = {"ETag": encoded_etag(tree.etag, encoding)}
+    if full:
+        headers["Vary"] = "Accept-Encoding"
+    if _etag_matches(request, tree.etag):
+        return Response(status_code=304, headers=headers)
+    if full:
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=tree.to_json(encoding), media_type="application/json", headers=headers)
+    nodes = tree.roots if depth is None else tree.get_roots(depth)
+    return ORJSONResponse(project(nodes, fields), headers=headers)
 
 @app.get("/api/tree")
-def get_tree():
+async def get_tree(request: Request, depth: int | None = Query(None, ge=0), fields: str | None = None):
     """
     Get hierarchy tree of HTS codes.
+    Without depth the full tree is returned; depth=0 returns only the roots.
+    fields=hts_code,name limits nodes to those fields (children and
+    child_count are always kept). The full tree is served precompressed.
+    """
+    return await run_in_threadpool(_tree, request, depth, _fields(fields))
+
+def _tree_children(request: Request, hts_code: str, fields):
+    tree = get_catalog().tree
+    headers = {"ETag": tree.etag}
+    if _etag_matches(request, tree.etag):
+        return Response(status_code=304, headers=headers)
+    children = tree.get_children(hts_code)
+    if children is None:
+        raise HTTPException(status_code=404, detail=f"HTS code {hts_code} not found")
+    return ORJSONResponse(project(children, fields), headers=headers)
+
+@app.get("/api/tree/{hts_code}/children")
+async def get_tree_children(hts_code: str, request: Request, fields: str | None = None):
+    """
+    Direct children of a tree node, for lazy expansion in the UI.
     """
-    from services import get_hts_tree
-    return get_hts_tree()
+    return await run_in_threadpool(_tree_children, request, hts_code, _fields(fields))
+
+def _subtree(request: Request, hts_code: str, depth: int, fields):
+    tree = get_catalog().tree
+    headers = {"ETag": tree.etag}
+    if _etag_matches(request, tree.etag):
+        return Response(status_code=304, headers=headers)
+    subtree = tree.get_subtree(hts_code, depth)
+    if subtree is None:
+        raise HTTPException(status_code=404, detail=f"HTS code {hts_code} not found")
+    return ORJSONResponse(project([subtree], fields)[0], headers=headers)
+
+@app.get("/api/tree/{hts_code}")
+async def get_subtree(hts_code: str, request: Request, depth: int = Query(1, ge=0, le=10),
+                      fields: str | None = None):
+    """
+    A tree node with its descendants down to the given depth.
+    """
+    return await run_in_threadpool(_subtree, request, hts_code, depth, _fields(fields))
+
+@app.post("/api/duty/batch")
+async def duty_batch(request: DutyBatchRequest):
+    """
+    Calculate duties for every line of a customs entry in one pass.
+    """
+    lines = [line.model_dump() for line in request.lines]
+    return await work_pool.run(calculate_duty_batch, lines, timeout=BATCH_TIMEOUT)
+
+@app.post("/api/duty/compare")
+async def duty_compare(request: DutyCompareRequest):
+    """
+    Duty matrix of HTS codes x countries of origin for one declared value,
+    e.g. to compare sourcing from CN, VN and MX.
+    """
+    return await work_pool.run(
+        compare_duty_matrix, request.hts_codes, request.countries, request.value, request.quantity,
+        request.entry_date, timeout=BATCH_TIMEOUT)
+
+async def _classify_stream(products: list[dict], top_k: int, mode: str):
+    """
+    NDJSON lines {"index", "id", "description", "suggestions", "total"} (or
+    "error") per product, in the order chunks finish. Identical descriptions
+    are ranked once; chunks run on every pool worker, a few at a time so the
+    batch does not starve other requests of pool slots.
+    """
+    positions = {}
+    for index, product in enumerate(products):
+        positions.setdefault(normalize_query(product["description"]), []).append(index)
+    queries = list(positions)
+    chunks = [queries[i:i + CLASSIFY_CHUNK_SIZE] for i in range(0, len(queries), CLASSIFY_CHUNK_SIZE)]
+    window = max(1, work_pool.processes)
+    pending = {}
+    try:
+        while chunks or pending:
+            while chunks and len(pending) < window:
+                chunk = chunks.pop(0)
+                task = asyncio.ensure_future(
+                    work_pool.run(classify_products, chunk, top_k, mode, timeout=BATCH_TIMEOUT))
+                pending[task] = chunk
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                chunk = pending.pop(task)
+                try:
+                    results = task.result()
+                except PoolOverloaded:
+                    results = [{"error": "Server busy, retry these products"}] * len(chunk)
+                except TaskTimeout:
+                    results = [{"error": "Classification timed out"}] * len(chunk)
+                for query_str, result in zip(chunk, results):
+                    for index in positions[query_str]:
+                        product = products[index]
+                        line = {"index": index, "id": product["id"], "description": product["description"], **result}
+                        yield json.dumps(line) + "\n"
+    finally:
+        # Client went away: drop the chunks that have not started
+        for task in pending:
+            task.cancel()
+
+@app.post("/api/classify")
+async def classify(request: ClassifyRequest):
+    """
+    Classify a list of product descriptions (or {"id", "description"} objects):
+    the top_k HTS suggestions per product, streamed as NDJSON as chunks finish.
+    """
+    products = [{"id": None, "description": p} if isinstance(p, str) else p.model_dump() for p in request.products]
+    return StreamingResponse(_classify_stream(products, request.top_k, request.mode),
+                             media_type="application/x-ndjson")
+
+@app.post("/api/classify/upload")
+async def classify_upload(file: UploadFile = File(...),
+                          top_k: int = Query(DEFAULT_CLASSIFY_TOP_K, ge=1, le=MAX_CLASSIFY_TOP_K),
+                          mode: str = Query("fuzzy", pattern="^(fuzzy|semantic)$")):
+    """
+    Classify the products of an .xlsx supplier sheet (a description column and
+    an optional SKU/ID column), streamed as NDJSON like /api/classify.
+    """
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload .xlsx")
+
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as tmp:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(tmp.write, chunk)
+        await run_in_threadpool(tmp.flush)
+        try:
+            products = await work_pool.run(read_products, tmp.name, timeout=SYNC_TIMEOUT)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(_classify_stream(products, top_k, mode), media_type="application/x-ndjson")
+
+def _ch99_referrer_codes(catalog, heading: str) -> list[str]:
+    # The reverse index is built over the whole catalog on first use and after
+    # each revision, and database/mapped rows are read from disk
+    return [catalog.items[item_id].get("hts_code") for item_id in catalog.ch99_referrers.get(heading, ())]
+
+@app.get("/api/ch99/{heading}/hts")
+async def get_ch99_referrers(heading: str):
+    """
+    HTS codes whose rows reference a Chapter 99 heading, e.g. every line a
+    Section 301 rule change applies to.
+    """
+    codes = await run_in_threadpool(_ch99_referrer_codes, get_catalog(), heading)
+    return {"heading": heading, "count": len(codes), "hts_codes": codes}
+
+@app.get("/api/portfolios")
+async def list_portfolios():
+    return {"portfolios": portfolio_store.list()}
+
+@app.put("/api/portfolios/{name}")
+async def put_portfolio(name: str, request: PortfolioRequest):
+    """
+    Save a portfolio of (HTS, value, quantity, country) lines, calculated
+    against the current Chapter 99 rules.
+    """
+    lines = [line.model_dump() for line in request.lines]
+    try:
+        return await run_in_threadpool(save_portfolio, portfolio_store.directory, name, lines)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/portfolios/{name}/recalculate")
+async def recalculate_saved_portfolio(name: str, dry_run: bool = False):
+    """
+    Before/after duties of the portfolio lines affected by Chapter 99 rules
+    changed since its last calculation. dry_run=true keeps the portfolio's
+    baseline rules.
+    """
+    try:
+        return await work_pool.run(
+            recalculate_portfolio, portfolio_store.directory, name, dry_run, timeout=BATCH_TIMEOUT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Portfolio {name} not found")
+
+@app.get("/api/revisions")
+async def list_revisions():
+    """
+    Available HTS revisions and the one the live catalog is on.
+    """
+    return {"current": get_catalog().release, "revisions": revision_store.list()}
+
+@app.get("/api/revisions/{a}/diff/{b}")
+async def get_revision_diff(a: str, b: str, duty_only: bool = False):
+    """
+    Rows added, removed and changed between two HTS revisions.
+    duty_only=true lists only changes to duties or Chapter 99 references.
+    """
+    try:
+        return await work_pool.run(diff_revisions, revision_store.directory, a, b, duty_only, timeout=BATCH_TIMEOUT)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Revision {e.args[0]} not found")
+
+@app.post("/api/revisions/{revision}/apply")
+async def apply_catalog_revision(revision: str):
+    """
+    Moves the live catalog to a revision incrementally, without a full rebuild.
+    Other serve.py workers replay it within RELOAD_CHECK_INTERVAL seconds, and
+    it survives catalog reloads and restarts until another revision is applied.
+    """
+    try:
+        summary = await run_in_threadpool(apply_revision, revision)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Revision {revision} not found")
+    # Forked workers hold the previous rows; fork fresh ones from the patched catalog
+    work_pool.restart()
+    return {"revision": revision, "summary": summary}
 
 @app.post("/api/sync")
 async def sync_excel(file: UploadFile = File(...)):
     """
     Upload an Excel file to sync/compare data.
+    The upload is spooled to a temporary file and streamed row by row.
     """
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload .xlsx")
-    
-    content = await file.read()
-    result = compare_excel(io.BytesIO(content), [])
-    return result
+
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as tmp:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(tmp.write, chunk)
+        await run_in_threadpool(tmp.flush)
+        try:
+            return await work_pool.run(compare_excel, tmp.name, timeout=SYNC_TIMEOUT)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
+    # Development server; use serve.py for multi-process production deployments
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,130 @@
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+from catalog import DATA_DIR, get_catalog
+from ch99_index import Ch99Index, changed_rule_keys
+from duty_engine import calculate_duty
+from services import get_applicable_ch99
+
+PORTFOLIO_DIR = os.environ.get("HTS_PORTFOLIO_DIR") or os.path.join(DATA_DIR, 'portfolios')
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,99}$")
+
+
+class PortfolioStore:
+    """
+    Directory of saved portfolios, one JSON file per portfolio holding its
+    lines ({"hts_code", "value", "quantity", "country", "entry_date"?}) and the
+    Chapter 99 rules its duties were last calculated with.
+    """
+
+    def __init__(self, directory: str = PORTFOLIO_DIR):
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        """
+        File of a portfolio. Raises ValueError for names that are not plain file stems.
+        """
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid portfolio name {name!r}")
+        return os.path.join(self.directory, name + ".json")
+
+    def load(self, name: str) -> dict:
+        """
+        A saved portfolio. Raises KeyError if it does not exist.
+        """
+        try:
+            with open(self.path(name), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(name)
+
+    def save(self, name: str, lines: list[dict], ch99_rules: list[dict]):
+        path = self.path(name)
+        os.makedirs(self.directory, exist_ok=True)
+        document = {
+            "lines": lines,
+            "ch99_rules": ch99_rules,
+            "calculated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, default=str)
+        os.replace(tmp_path, path)
+
+    def list(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+portfolio_store = PortfolioStore()
+
+
+def save_portfolio(directory: str, name: str, lines: list[dict]) -> dict:
+    """
+    Saves portfolio lines against the live catalog's Chapter 99 rules.
+    """
+    PortfolioStore(directory).save(name, lines, get_catalog().ch99_rules)
+    return {"portfolio": name, "lines": len(lines)}
+
+
+def recalculate_portfolio(directory: str, name: str, dry_run: bool = False) -> dict:
+    """
+    Before/after duties of the portfolio lines touched by the Chapter 99 rules
+    that changed since the portfolio was last calculated.
+
+    Changed (heading, country) rule keys are resolved to catalog rows through
+    the reverse Chapter 99 index, so only lines on those rows and countries
+    are recalculated. Both sides use the current HTS rows; the delta is due to
+    the rule changes alone. Unless `dry_run`, the portfolio is marked as
+    calculated with the current rules. Raises KeyError for unknown portfolios.
+    A plain function of its arguments so it can run in a worker process.
+    """
+    store = PortfolioStore(directory)
+    portfolio = store.load(name)
+    catalog = get_catalog()
+    old_rules = portfolio.get("ch99_rules") or []
+    changed = changed_rule_keys(old_rules, catalog.ch99_rules)
+
+    touched = {}
+    for heading, country in changed:
+        touched.setdefault(country, set()).update(catalog.ch99_referrers.get(heading, ()))
+
+    old_index = Ch99Index(old_rules)
+    affected = []
+    for i, line in enumerate(portfolio["lines"]):
+        item_id = catalog.by_code.get(line["hts_code"])
+        if item_id is None or item_id not in touched.get(line["country"], ()):
+            continue
+        doc = catalog.items[item_id]
+        value, quantity, country = line["value"], line.get("quantity") or 0.0, line["country"]
+        as_of = line.get("entry_date") or date.today()
+        old_ch99 = [rule for ref in doc.get("chapter99_refs", []) for rule in old_index.lookup(ref, country, as_of)]
+        before = calculate_duty(doc, value, quantity, country, old_ch99)
+        after = calculate_duty(doc, value, quantity, country, get_applicable_ch99(doc, country, as_of))
+        affected.append({
+            "line": i,
+            "hts_code": line["hts_code"],
+            "country": country,
+            "value": value,
+            "quantity": quantity,
+            "before": before,
+            "after": after,
+            "delta": round(after - before, 2),
+        })
+
+    if not dry_run:
+        store.save(name, portfolio["lines"], catalog.ch99_rules)
+
+    total_before = round(sum(line["before"] for line in affected), 2)
+    total_after = round(sum(line["after"] for line in affected), 2)
+    return {
+        "portfolio": name,
+        "changed_rules": [{"heading": heading, "country": country} for heading, country in sorted(changed, key=str)],
+        "lines": len(portfolio["lines"]),
+        "affected": affected,
+        "total_before": total_before,
+        "total_after": total_after,
+        "total_delta": round(total_after - total_before, 2),
+    }
@@ -0,0 +1,116 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+While enabled, a background thread samples the Python stacks of every other
+thread in the process every `interval` seconds into a bounded ring buffer.
+When a request takes longer than `threshold` seconds, the samples taken during
+it are written as folded stacks ("frame;frame;frame count" per line), the input
+format of flamegraph.pl and speedscope.
+
+Only the serving process is sampled: work sent to the worker pool shows up as
+the awaiting request handler. Run with WORKER_PROCESSES=0 to profile it in-process.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or os.path.join(os.path.dirname(__file__), "data", "profiles")
+# Set to a number of milliseconds to profile requests slower than that from startup
+PROFILE_SLOW_MS = os.environ.get("PROFILE_SLOW_MS")
+# The /debug/profiler endpoints are disabled unless this is set; requests send it as X-Admin-Token
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN")
+SAMPLE_INTERVAL = 0.005
+MAX_SAMPLES = 200_000
+MAX_PROFILES = 50
+
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, directory: str = PROFILE_DIR, interval: float = SAMPLE_INTERVAL,
+                 max_samples: int = MAX_SAMPLES):
+        self.directory = directory
+        self.interval = interval
+        self.threshold = None
+        self.samples = deque(maxlen=max_samples)
+        self.profiles = deque(maxlen=MAX_PROFILES)
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self, threshold: float):
+        """
+        Starts sampling; requests slower than `threshold` seconds get a profile.
+        """
+        self.threshold = threshold
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.samples.clear()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.samples.append((now, _fold(frame)))
+
+    def collect(self, started: float, finished: float) -> Counter:
+        """
+        Folded stacks sampled between two time.monotonic() readings.
+        """
+        return Counter(stack for at, stack in list(self.samples) if started <= at <= finished)
+
+    def record(self, label: str, started: float, finished: float):
+        """
+        Writes the profile of a request if it was slower than the threshold.
+        Returns the profile name, or None.
+        """
+        if not self.enabled or finished - started < self.threshold:
+            return None
+        stacks = self.collect(started, finished)
+        if not stacks:
+            return None
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{int((finished - started) * 1000)}ms-{_slug(label)}.folded"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.profiles.append(name)
+        return name
+
+    def path(self, name: str):
+        """
+        Path of a recorded profile, None if unknown.
+        """
+        if name not in self.profiles:
+            return None
+        return os.path.join(self.directory, name)
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")[:60]
+
+
+profiler = SamplingProfiler()
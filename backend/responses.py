@@ -0,0 +1,168 @@
+import gzip
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used instead
+    brotli = None
+
+# Bodies smaller than this are sent as is; compressing them costs more than it saves
+MINIMUM_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Tree nodes always keep their structure so clients can walk and expand them
+TREE_FIELDS = ("children", "child_count")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson. Dates and numpy values are encoded
+    natively; anything else orjson does not know falls back to str().
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str | None):
+    """
+    Content-coding to answer an Accept-Encoding header with, or None for
+    identity. br is preferred over gzip at equal quality when available.
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in supported_encodings():
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str | None) -> bytes:
+    if encoding is None:
+        return body
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content-coding {encoding!r}")
+
+
+def encoded_etag(etag: str, encoding: str | None) -> str:
+    """
+    ETag of a compressed variant, e.g. '"abc"' -> '"abc-gzip"', so the
+    identity and encoded bodies never share a strong validator.
+    """
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else f"{etag}-{encoding}"
+
+
+def base_etag(etag: str) -> str:
+    """
+    The ETag an encoded_etag() came from; other tags are returned as is.
+    """
+    etag = etag.strip().removeprefix("W/")
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) and "content-encoding" not in headers
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and text responses with the content-coding negotiated from
+    Accept-Encoding. Responses sent in one piece are compressed whole;
+    streamed responses (NDJSON) and already encoded ones pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                return await send(message)
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if _compressible(headers):
+                headers.add_vary_header("Accept-Encoding")
+                if encoding and not message.get("more_body") and len(body) >= self.minimum_size:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    if "etag" in headers:
+                        headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def parse_fields(fields: str | None):
+    """
+    Field names of a comma-separated `fields=` parameter, None when absent.
+    Raises ValueError when it names no field.
+    """
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise ValueError("fields must name at least one field")
+    return names
+
+
+def project(records: list[dict], fields) -> list[dict]:
+    """
+    Copies of the records with only the given fields. Nested tree children
+    are projected the same way. Records are returned as is when fields is None.
+    """
+    if fields is None:
+        return records
+    keep = fields + tuple(field for field in TREE_FIELDS if field not in fields)
+    return [_project_record(record, keep) for record in records]
+
+
+def _project_record(record: dict, keep: tuple) -> dict:
+    projected = {field: record[field] for field in keep if field in record}
+    if projected.get("children"):
+        projected["children"] = [_project_record(child, keep) for child in projected["children"]]
+    return projected
@@ -0,0 +1,189 @@
+import json
+import os
+from functools import lru_cache
+from catalog import DATA_DIR, get_catalog, read_hts_rows, file_signature, row_key
+
+REVISIONS_DIR = os.environ.get("HTS_REVISIONS_DIR") or os.path.join(DATA_DIR, 'revisions')
+REVISION_EXTENSIONS = (".htsc", ".json")
+# Last revision applied through the API; not a revision itself
+APPLIED_FILE = ".applied"
+
+# Per-run or derived fields that never count as a change
+IGNORED_FIELDS = {"description_clean", "requires_ch99", "created_at", "updated_at", "score", "probability"}
+EMPTY_VALUES = (None, "", [], {})
+
+
+def _comparable(row: dict) -> dict:
+    # Missing and empty fields are equivalent across JSON and .htsc sources
+    return {k: v for k, v in row.items() if k not in IGNORED_FIELDS and v not in EMPTY_VALUES}
+
+
+def diff_rows(old_rows, new_rows) -> dict:
+    """
+    Delta between two revisions, keyed by (hts_code, stat_suffix).
+
+    Returns {"added": [row], "removed": [row], "changed": [{"key", "changes", "row"}]}
+    where "changes" maps each differing field to {"from", "to"} and "row" is the
+    new version of the row.
+    """
+    old_by_key = {row_key(row): row for row in old_rows if row}
+    added, changed = [], []
+    seen = set()
+    for row in new_rows:
+        if not row:
+            continue
+        key = row_key(row)
+        seen.add(key)
+        old = old_by_key.get(key)
+        if old is None:
+            added.append(row)
+            continue
+        before, after = _comparable(old), _comparable(row)
+        changes = {
+            field: {"from": before.get(field), "to": after.get(field)}
+            for field in before.keys() | after.keys()
+            if before.get(field) != after.get(field)
+        }
+        if changes:
+            changed.append({"key": key, "changes": changes, "row": row})
+    removed = [row for key, row in old_by_key.items() if key not in seen]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def summarize_diff(delta: dict, duty_only: bool = False) -> dict:
+    """
+    JSON-friendly view of a delta; duty_only keeps the changes that touch duties.
+    """
+    changed = [
+        {"hts_code": c["key"][0], "stat_suffix": c["key"][1], "changes": c["changes"]}
+        for c in delta["changed"]
+        if not duty_only or "duties" in c["changes"] or "chapter99_refs" in c["changes"]
+    ]
+    return {
+        "summary": {
+            "added": len(delta["added"]),
+            "removed": len(delta["removed"]),
+            "changed": len(delta["changed"]),
+            "duty_changed": sum(
+                1 for c in delta["changed"] if "duties" in c["changes"] or "chapter99_refs" in c["changes"]),
+        },
+        "added": [{"hts_code": r.get("hts_code"), "stat_suffix": r.get("stat_suffix"),
+                   "description": r.get("description"), "duties": r.get("duties")} for r in delta["added"]],
+        "removed": [{"hts_code": r.get("hts_code"), "stat_suffix": r.get("stat_suffix"),
+                     "description": r.get("description")} for r in delta["removed"]],
+        "changed": changed,
+    }
+
+
+@lru_cache(maxsize=8)
+def _load_revision(path: str, signature) -> list:
+    rows, _ = read_hts_rows(path)
+    return list(rows)
+
+
+class RevisionStore:
+    """
+    Directory of HTS releases, one file per revision (e.g. 2025-rev1.json or
+    2025-rev1.htsc as written by ingest.py); the file stem is the revision id.
+    """
+
+    def __init__(self, directory: str = REVISIONS_DIR):
+        self.directory = directory
+
+    def list(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted({
+            os.path.splitext(name)[0]
+            for name in os.listdir(self.directory)
+            if name.endswith(REVISION_EXTENSIONS)
+        })
+
+    def path(self, revision: str):
+        for ext in REVISION_EXTENSIONS:
+            path = os.path.join(self.directory, revision + ext)
+            if os.path.basename(path) == revision + ext and os.path.exists(path):
+                return path
+        return None
+
+    def load(self, revision: str) -> list:
+        """
+        Rows of a revision. Raises KeyError if it does not exist.
+        """
+        path = self.path(revision)
+        if path is None:
+            raise KeyError(revision)
+        return _load_revision(path, file_signature(path))
+
+    def diff(self, a: str, b: str) -> dict:
+        return diff_rows(self.load(a), self.load(b))
+
+    def applied(self):
+        """
+        The last revision applied to the catalog, as {"revision", "base"}, or None.
+        """
+        try:
+            with open(os.path.join(self.directory, APPLIED_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def mark_applied(self, revision: str, base: list):
+        path = os.path.join(self.directory, APPLIED_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"revision": revision, "base": base}, f)
+        os.replace(tmp_path, path)
+
+
+revision_store = RevisionStore()
+
+
+def diff_revisions(directory: str, a: str, b: str, duty_only: bool = False) -> dict:
+    """
+    Summarized diff between two revisions of a store directory.
+    A plain function of its arguments so it can run in a worker process.
+    """
+    delta = RevisionStore(directory).diff(a, b)
+    return {"from": a, "to": b, **summarize_diff(delta, duty_only=duty_only)}
+
+
+def _base(catalog) -> list:
+    # The files a catalog was loaded from, as stored in the applied record
+    return json.loads(json.dumps([catalog.hts_path, catalog.signature[0]]))
+
+
+def _apply(catalog, revision: str, store: RevisionStore) -> dict:
+    delta = diff_rows([item for _, item in catalog.live_items()], store.load(revision))
+    catalog.apply_delta(delta, release=revision)
+    return summarize_diff(delta)["summary"]
+
+
+def apply_revision(revision: str, store: RevisionStore = revision_store) -> dict:
+    """
+    Moves the live catalog to `revision` by applying only the delta between
+    its current rows and the revision. Raises KeyError for unknown revisions.
+    The revision is recorded in the store so other processes serving the
+    same catalog files, and this one after a reload, replay it.
+    """
+    catalog = get_catalog()
+    summary = _apply(catalog, revision, store)
+    store.mark_applied(revision, _base(catalog))
+    return summary
+
+
+def replay_applied_revision(store: RevisionStore = revision_store):
+    """
+    Applies the revision recorded by apply_revision to the live catalog if it
+    was loaded from the same files and is not on that revision yet. Returns
+    the diff summary, or None when there was nothing to replay.
+    """
+    applied = store.applied()
+    catalog = get_catalog()
+    if applied is None or applied["base"] != _base(catalog) or catalog.release == applied["revision"]:
+        return None
+    try:
+        return _apply(catalog, applied["revision"], store)
+    except KeyError:
+        # The revision file was removed since
+        return None
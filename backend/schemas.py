@@ -0,0 +1,49 @@
+from datetime import date
+from typing import Annotated
+from pydantic import BaseModel, Field
+
+# Upper bound on lines per batch request
+MAX_BATCH_LINES = 100_000
+# Upper bounds on a country-of-origin comparison matrix
+MAX_COMPARE_CODES = 1_000
+MAX_COMPARE_COUNTRIES = 100
+# Product classification batches
+DEFAULT_CLASSIFY_TOP_K = 5
+MAX_CLASSIFY_TOP_K = 20
+MAX_CLASSIFY_PRODUCTS = 50_000
+
+
+class DutyLine(BaseModel):
+    hts_code: str
+    value: float = Field(ge=0, description="Declared value in USD")
+    quantity: float = Field(0.0, ge=0, description="Quantity in the HTS unit of measure")
+    country: str = Field(min_length=2, max_length=2, description="ISO 2-char country of origin")
+    entry_date: date | None = Field(None, description="Date Chapter 99 rules are evaluated at (default today)")
+
+
+class DutyBatchRequest(BaseModel):
+    lines: list[DutyLine] = Field(max_length=MAX_BATCH_LINES)
+
+
+class PortfolioRequest(BaseModel):
+    lines: list[DutyLine] = Field(min_length=1, max_length=MAX_BATCH_LINES)
+
+
+class DutyCompareRequest(BaseModel):
+    hts_codes: list[str] = Field(min_length=1, max_length=MAX_COMPARE_CODES)
+    countries: list[Annotated[str, Field(min_length=2, max_length=2)]] = Field(
+        min_length=1, max_length=MAX_COMPARE_COUNTRIES, description="ISO 2-char countries of origin")
+    value: float = Field(ge=0, description="Declared value in USD, applied to every code")
+    quantity: float = Field(0.0, ge=0, description="Quantity in the HTS unit of measure")
+    entry_date: date | None = Field(None, description="Date Chapter 99 rules are evaluated at (default today)")
+
+
+class Product(BaseModel):
+    id: str | int | None = Field(None, description="Supplier SKU or other reference, echoed back")
+    description: str
+
+
+class ClassifyRequest(BaseModel):
+    products: list[str | Product] = Field(min_length=1, max_length=MAX_CLASSIFY_PRODUCTS)
+    top_k: int = Field(DEFAULT_CLASSIFY_TOP_K, ge=1, le=MAX_CLASSIFY_TOP_K, description="Suggestions per product")
+    mode: str = Field("fuzzy", pattern="^(fuzzy|semantic)$")
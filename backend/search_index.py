@@ -0,0 +1,227 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+NGRAM_SIZE = 3
+# Upper bound on rows handed to the fuzzy scorer per query
+MAX_CANDIDATES = 200
+# N-grams found in more than this share of rows are skipped when rarer ones exist
+MAX_GRAM_FREQUENCY = 0.2
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGIT = re.compile(r"\D+")
+# "8471", "8471.30", "8471 30 01" ... digits with optional dot/space separators
+_CODE_QUERY = re.compile(r"^\s*\d{2,}[\d.\s]*$")
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercases and collapses punctuation/whitespace to single spaces.
+    """
+    if not text:
+        return ""
+    return _NON_ALNUM.sub(" ", str(text).lower()).strip()
+
+
+def tokenize(text: str) -> list[str]:
+    return normalize(text).split()
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> set[str]:
+    """
+    Character n-grams of the normalized text, e.g. "lap top" -> {"lap", "ap ", "p t", ...}.
+    """
+    norm = normalize(text)
+    return {norm[i:i + n] for i in range(len(norm) - n + 1)}
+
+
+def normalize_code(code: str) -> str:
+    """
+    Digits only, e.g. "8471.30.01" -> "84713001".
+    """
+    if not code:
+        return ""
+    return _NON_DIGIT.sub("", str(code))
+
+
+def looks_like_code(query: str) -> bool:
+    return bool(query and _CODE_QUERY.match(query))
+
+
+def _item_fields(item: dict) -> list[str]:
+    fields = [item.get('description_clean') or (item.get('description') or '').lower(),
+              item.get('hts_code') or '']
+    fields.extend(item.get('keywords') or [])
+    return fields
+
+
+def search_text(item: dict) -> str:
+    """
+    The indexed fields of a row, normalized and joined.
+    """
+    return " ".join(normalize(field) for field in _item_fields(item) if field)
+
+
+class SearchIndex:
+    """
+    Inverted n-gram index over description_clean, hts_code and keywords.
+    Narrows a query to the rows sharing the most n-grams with it so the
+    fuzzy scorer only runs on a small candidate set.
+    """
+
+    def __init__(self, items: list[dict]):
+        self.size = 0
+        self.postings = defaultdict(set)
+        # Indexed text length per row, to rank rows with equal overlap
+        self.lengths = {}
+        # Token prefixes shorter than an n-gram, for 1-2 character queries
+        self.prefixes = defaultdict(set)
+        for item_id, item in enumerate(items):
+            self.add(item_id, item)
+
+    def _keys(self, item: dict):
+        grams, prefixes = set(), set()
+        for field in _item_fields(item):
+            grams |= ngrams(field)
+            for token in tokenize(field):
+                for i in range(1, min(len(token), NGRAM_SIZE - 1) + 1):
+                    prefixes.add(token[:i])
+        return grams, prefixes
+
+    def add(self, item_id: int, item: dict):
+        grams, prefixes = self._keys(item)
+        for gram in grams:
+            self.postings[gram].add(item_id)
+        for prefix in prefixes:
+            self.prefixes[prefix].add(item_id)
+        self.lengths[item_id] = len(search_text(item))
+        self.size += 1
+
+    def remove(self, item_id: int, item: dict):
+        """
+        Drops a row; `item` must be the row as it was indexed.
+        """
+        grams, prefixes = self._keys(item)
+        for table, keys in ((self.postings, grams), (self.prefixes, prefixes)):
+            for key in keys:
+                posting = table.get(key)
+                if posting is not None:
+                    posting.discard(item_id)
+                    if not posting:
+                        del table[key]
+        self.lengths.pop(item_id, None)
+        self.size -= 1
+
+    def candidates(self, query: str, limit: int = MAX_CANDIDATES) -> list[int]:
+        """
+        Returns up to `limit` item ids ranked by n-gram overlap with the query.
+        Rows with the same overlap (every row containing a one-word query)
+        rank shortest text first, where the query covers most of the row,
+        then in catalog order.
+        """
+        norm = normalize(query)
+        if not norm:
+            return []
+
+        if len(norm) < NGRAM_SIZE:
+            ids = self.prefixes.get(norm, set())
+            return sorted(ids)[:limit]
+
+        selective = self._selective(norm, limit)
+        if not selective:
+            return []
+
+        counts = Counter()
+        for posting in selective:
+            counts.update(posting)
+        lengths = self.lengths
+        top = heapq.nsmallest(limit, counts.items(), key=lambda hit: (-hit[1], lengths[hit[0]], hit[0]))
+        return [item_id for item_id, _ in top]
+
+    def match_count(self, query: str) -> int:
+        """
+        About how many rows contain the query: the rows holding every
+        selective n-gram of it (the token prefix for short queries).
+        Not capped like candidates().
+        """
+        norm = normalize(query)
+        if not norm:
+            return 0
+        if len(norm) < NGRAM_SIZE:
+            return len(self.prefixes.get(norm, ()))
+        selective = sorted(self._selective(norm, MAX_CANDIDATES), key=len)
+        if not selective:
+            return 0
+        return len(selective[0].intersection(*selective[1:]))
+
+    def _selective(self, norm: str, limit: int) -> list[set]:
+        # Postings of the query's n-grams, without those found in most rows
+        postings = [self.postings[gram] for gram in ngrams(norm) if gram in self.postings]
+        if not postings:
+            return []
+        max_df = max(limit, int(self.size * MAX_GRAM_FREQUENCY))
+        return [posting for posting in postings if len(posting) <= max_df] or [min(postings, key=len)]
+
+
+class CodeIndex:
+    """
+    Sorted array of normalized HTS digits; prefix lookups are a bisect plus
+    a scan over the matching range.
+    """
+
+    def __init__(self, items: list[dict]):
+        entries = sorted(
+            (normalize_code(item.get('hts_code')), item_id)
+            for item_id, item in enumerate(items)
+            if normalize_code(item.get('hts_code'))
+        )
+        self.keys = [key for key, _ in entries]
+        self.ids = [item_id for _, item_id in entries]
+
+    def get(self, code: str):
+        """
+        Item id of the row whose code has exactly these digits, or None.
+        """
+        digits = normalize_code(code)
+        pos = bisect_left(self.keys, digits)
+        if digits and pos < len(self.keys) and self.keys[pos] == digits:
+            return self.ids[pos]
+        return None
+
+    def add(self, item_id: int, item: dict):
+        digits = normalize_code(item.get('hts_code'))
+        if not digits:
+            return
+        pos = bisect_left(self.keys, digits)
+        while pos < len(self.keys) and self.keys[pos] == digits and self.ids[pos] < item_id:
+            pos += 1
+        self.keys.insert(pos, digits)
+        self.ids.insert(pos, item_id)
+
+    def remove(self, item_id: int, item: dict):
+        digits = normalize_code(item.get('hts_code'))
+        pos = bisect_left(self.keys, digits)
+        while pos < len(self.keys) and self.keys[pos] == digits:
+            if self.ids[pos] == item_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return
+            pos += 1
+
+    def prefix(self, query: str, limit: int = None) -> list[tuple[str, int]]:
+        """
+        Returns (digits, item_id) pairs whose code starts with the query digits,
+        in code order.
+        """
+        digits = normalize_code(query)
+        if not digits:
+            return []
+        matches = []
+        pos = bisect_left(self.keys, digits)
+        while pos < len(self.keys) and self.keys[pos].startswith(digits):
+            matches.append((self.keys[pos], self.ids[pos]))
+            if limit and len(matches) >= limit:
+                break
+            pos += 1
+        return matches
@@ -0,0 +1,131 @@
+"""
+As-you-type search sessions, served over the /api/search/session WebSocket.
+
+A session remembers the rows that matched its last query. When the next query
+finishes its last word ("lapt" -> "laptop") only those rows are rescored
+instead of asking the n-gram index for fresh candidates: a row that did not
+match a prefix of the word is very unlikely to match the whole word. Rows are scored in chunks on the
+worker pool, best previous matches first, so a preliminary top few can be sent
+after the first chunk and a superseded query stops at the next chunk boundary
+when its task is cancelled.
+
+Narrowed rankings are approximations and are kept out of the query cache that
+/api/search answers from; fresh rankings are shared with it. /api/search ranks
+in the worker pool, so with worker processes the two only meet in a shared
+cache (SHARED_CACHE_PATH); otherwise the session does not use the query cache.
+"""
+import heapq
+from starlette.concurrency import run_in_threadpool
+from cache import SharedCache
+from catalog import get_catalog
+from search_index import NGRAM_SIZE, MAX_CANDIDATES, looks_like_code
+from services import (search_page, score_rows, fuzzy_total, query_cache, query_cache_key, DEFAULT_SEARCH_LIMIT,
+                      MAX_SEARCH_LIMIT, SEARCH_MODES, _project)
+from usitc_client import normalize_query
+from workers import work_pool
+from metrics import Counter
+
+# Rows per scoring task; cancellation takes effect between chunks
+SESSION_CHUNK_SIZE = 50
+# Hits sent as soon as the first chunk is scored
+FIRST_BATCH = 10
+
+SESSION_QUERIES = Counter(
+    "hts_search_session_queries_total", "As-you-type session queries by how they were answered.", ("path",))
+
+
+def _best(scored: list, limit: int) -> list:
+    # Ties keep catalog order, as in /api/search
+    return heapq.nsmallest(limit, scored, key=lambda hit: (-hit[0], hit[1]))
+
+
+def _shares_query_cache() -> bool:
+    # Worker processes fill their own copies of an in-process query cache
+    return work_pool.processes == 0 or isinstance(query_cache, SharedCache)
+
+
+def _projected(catalog, hits: list) -> list:
+    return [_project(catalog.items[item_id], score) for score, item_id in hits]
+
+
+class SearchSession:
+    """
+    Per-connection search state: the last completed fuzzy query and its hits.
+    """
+
+    def __init__(self):
+        self.query = None
+        self.fingerprint = None
+        # (score, item_id) of every row matching self.query, best first
+        self.hits = []
+
+    def reset(self):
+        self.query, self.fingerprint, self.hits = None, None, []
+
+    def narrows(self, catalog, query_str: str) -> bool:
+        """
+        Whether query_str can be answered from the hits of the last query: it
+        finishes the last word typed. A new word can match rows on its own, so
+        it gets fresh candidates. Queries shorter than an n-gram come from a
+        truncated prefix list and are never narrowed from either.
+        """
+        return bool(
+            self.hits
+            and self.fingerprint == catalog.fingerprint
+            and len(self.query) >= NGRAM_SIZE
+            and query_str.startswith(self.query)
+            and " " not in query_str[len(self.query):]
+        )
+
+    async def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT, mode: str = "fuzzy"):
+        """
+        Yields result messages for a query: optionally a preliminary
+        {"results", "final": False} with the best hits of the first chunk, then
+        {"results", "total", "final": True} with the first page.
+        Raises ValueError for an unknown mode.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}")
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        catalog = get_catalog()
+        query_str = normalize_query(query)
+
+        if not query_str or mode != "fuzzy" or looks_like_code(query_str):
+            # Empty, semantic and code queries are single cheap lookups
+            SESSION_QUERIES.inc(path="direct")
+            page = await work_pool.run(search_page, query, limit, None, mode)
+            self.reset()
+            yield {"results": page["results"], "total": page["total"], "final": True}
+            return
+
+        key = query_cache_key(catalog, query_str)
+        shared = _shares_query_cache()
+        # A SharedCache lookup is a SQLite query; keep it off the event loop
+        cached = await run_in_threadpool(query_cache.get, key) if shared else None
+        if cached is not None and len(cached[0]) == cached[1]:
+            SESSION_QUERIES.inc(path="cached")
+            hits, total = cached
+        else:
+            narrowed = self.narrows(catalog, query_str)
+            SESSION_QUERIES.inc(path="narrowed" if narrowed else "fresh")
+            if narrowed:
+                pool = [item_id for _, item_id in self.hits]
+            else:
+                pool = await run_in_threadpool(catalog.search_index.candidates, query_str)
+
+            scored = []
+            for start in range(0, len(pool), SESSION_CHUNK_SIZE):
+                scored.extend(await work_pool.run(score_rows, query_str, pool[start:start + SESSION_CHUNK_SIZE]))
+                if start == 0 and len(pool) > SESSION_CHUNK_SIZE:
+                    # Best of the first chunk while the rest is scored
+                    yield {"results": _projected(catalog, _best(scored, min(limit, FIRST_BATCH))), "final": False}
+            hits = _best(scored, len(scored))
+            total = len(hits)
+            if narrowed or len(pool) >= MAX_CANDIDATES:
+                # More rows may contain the query than the pool held, as in /api/search
+                total = await run_in_threadpool(fuzzy_total, catalog, query_str, total)
+            if shared and not narrowed:
+                await run_in_threadpool(query_cache.set, key, (hits, total))
+
+        self.query, self.fingerprint, self.hits = query_str, catalog.fingerprint, hits
+        yield {"results": _projected(catalog, hits[:limit]), "total": total, "final": True}
@@ -0,0 +1,274 @@
+"""
+Semantic search over HTS descriptions with hashed TF-IDF vectors.
+
+Every row's description and keywords are turned into a sparse bag of stemmed
+words and character trigrams, hashed into a fixed number of dimensions,
+weighted by IDF and L2-normalized. The rows form one dense float32 matrix, so a
+query is answered with a single matrix-vector product plus a top-K selection
+instead of a Levenshtein pass per row. Queries are expanded with trade
+synonyms ("notebook" -> "portable automatic data processing machine") to
+bridge everyday and tariff vocabulary.
+
+ingest.py stores the matrix next to the catalog artifact (catalog.htsc.vectors.npy
+and catalog.htsc.idf.npy) and the API maps it read-only at startup; catalogs
+without it are vectorized on the first semantic query.
+"""
+import os
+import zlib
+from functools import lru_cache
+import numpy as np
+from search_index import tokenize
+
+EMBEDDING_DIM = 512
+# Character trigrams catch inflections and typos but weigh less than words
+TRIGRAM_WEIGHT = 0.3
+# Synonym expansions weigh less than the words actually typed
+SYNONYM_WEIGHT = 0.6
+# Cosine similarity below which a row is not a hit
+MIN_SIMILARITY = 0.1
+
+STOPWORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "its", "not", "of", "on", "or", "other",
+    "such", "than", "the", "thereof", "to", "whether", "with", "more", "less", "nesoi", "including",
+}
+
+# Everyday product terms -> tariff vocabulary
+SYNONYMS = {
+    "laptop": "portable automatic data processing machine",
+    "notebook": "portable automatic data processing machine",
+    "computer": "automatic data processing machine",
+    "pc": "automatic data processing machine",
+    "tablet": "portable automatic data processing machine",
+    "server": "automatic data processing machine unit",
+    "phone": "telephone cellular network",
+    "smartphone": "telephone cellular network",
+    "cellphone": "telephone cellular network",
+    "tv": "television reception apparatus",
+    "monitor": "display",
+    "car": "motor vehicle transport person",
+    "automobile": "motor vehicle transport person",
+    "suv": "motor vehicle transport person",
+    "truck": "motor vehicle transport good",
+    "bike": "bicycle",
+    "tire": "tyre pneumatic rubber",
+    "tyre": "tire pneumatic rubber",
+    "sneaker": "footwear outer sole rubber plastic",
+    "shoe": "footwear",
+    "boot": "footwear",
+    "tshirt": "t shirt knitted crocheted",
+    "sweater": "jersey pullover knitted",
+    "jeans": "trouser denim cotton",
+    "pants": "trouser",
+    "coffee": "coffee roasted",
+    "fridge": "refrigerator",
+    "couch": "seat upholstered",
+    "sofa": "seat upholstered",
+    "toy": "toy",
+    "drone": "unmanned aircraft",
+    "battery": "accumulator electric",
+    "charger": "static converter",
+    "cable": "insulated wire conductor",
+    "screw": "screw bolt threaded",
+}
+
+
+def stem(word: str) -> str:
+    """
+    Crude plural folding: "machines" -> "machine", "batteries" -> "battery".
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_features(token: str) -> tuple:
+    """
+    (feature, weight) pairs of one token: its stem and the stem's trigrams.
+    """
+    if token in STOPWORDS:
+        return ()
+    word = stem(token)
+    padded = f" {word} "
+    return (("w:" + word, 1.0),) + tuple(("c:" + padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2))
+
+
+def _features(text: str, weight: float = 1.0, features: dict = None) -> dict:
+    features = {} if features is None else features
+    for token in tokenize(text):
+        for feature, share in _word_features(token):
+            features[feature] = features.get(feature, 0.0) + weight * share
+    return features
+
+
+def query_features(query: str) -> dict:
+    """
+    Features of a query, including its synonym expansions.
+    """
+    features = _features(query)
+    for token in tokenize(query):
+        expansion = SYNONYMS.get(stem(token)) or SYNONYMS.get(token)
+        if expansion:
+            _features(expansion, SYNONYM_WEIGHT, features)
+    return features
+
+
+def _row_text(row: dict) -> str:
+    return " ".join([row.get("description_clean") or row.get("description") or ""] + list(row.get("keywords") or []))
+
+
+@lru_cache(maxsize=1 << 18)
+def _bucket(feature: str, dim: int) -> int:
+    """
+    Signed hash bucket of a feature: +(col + 1) or -(col + 1).
+    """
+    h = zlib.crc32(feature.encode("utf-8"))
+    return (h % dim + 1) * (1 if h & 0x80000000 else -1)
+
+
+def _hashed(features: dict, dim: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Columns and signed, sublinear weights of hashed features.
+    """
+    buckets = np.fromiter((_bucket(feature, dim) for feature in features), dtype=np.int64, count=len(features))
+    weights = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    return np.abs(buckets) - 1, _sublinear(weights) * np.sign(buckets)
+
+
+def _sublinear(weights: np.ndarray) -> np.ndarray:
+    return np.where(weights >= 1, 1.0 + np.log(np.maximum(weights, 1)), weights).astype(np.float32)
+
+
+# Named after the full artifact name: catalog.json, catalog.htsc and
+# catalog.sqlite in one directory each get their own vectors
+def vectors_path(catalog_path: str) -> str:
+    return catalog_path + ".vectors.npy"
+
+
+def idf_path(catalog_path: str) -> str:
+    return catalog_path + ".idf.npy"
+
+
+class SemanticIndex:
+    """
+    Row-normalized TF-IDF matrix (rows x EMBEDDING_DIM) and its IDF weights.
+    Removed rows have all-zero vectors and never match.
+    """
+
+    def __init__(self, matrix: np.ndarray, idf: np.ndarray):
+        self.matrix = matrix
+        self.idf = idf
+        self.dim = matrix.shape[1]
+
+    @classmethod
+    def from_rows(cls, rows, dim: int = EMBEDDING_DIM) -> "SemanticIndex":
+        """
+        Vectorizes rows (None for removed rows) in two passes: term counts, then IDF.
+        """
+        rows = list(rows)
+        row_ids, buckets, weights = [], [], []
+        for i, row in enumerate(rows):
+            if row is None:
+                continue
+            features = _features(_row_text(row))
+            row_ids.extend([i] * len(features))
+            buckets.extend(_bucket(feature, dim) for feature in features)
+            weights.extend(features.values())
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        buckets = np.asarray(buckets, dtype=np.int64)
+        cols = np.abs(buckets) - 1
+
+        matrix = np.zeros((len(rows), dim), dtype=np.float32)
+        np.add.at(matrix, (row_ids, cols), _sublinear(np.asarray(weights, dtype=np.float32)) * np.sign(buckets))
+        # Document frequency per bucket
+        df = np.count_nonzero(matrix, axis=0).astype(np.float64)
+        idf = (np.log((1 + len(rows)) / (1 + df)) + 1).astype(np.float32)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return cls(matrix, idf)
+
+    def _vector(self, row) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if row is not None:
+            cols, vals = _hashed(_features(_row_text(row)), self.dim)
+            np.add.at(vector, cols, vals)
+            vector *= self.idf
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def patched(self, rows_by_id: dict) -> "SemanticIndex":
+        """
+        Copy with the vectors of some rows replaced (None clears a removed row),
+        growing the matrix for new row ids. IDF weights are kept as they are.
+        """
+        size = max(self.matrix.shape[0], max(rows_by_id, default=-1) + 1)
+        matrix = np.zeros((size, self.dim), dtype=np.float32)
+        matrix[:self.matrix.shape[0]] = self.matrix
+        for item_id, row in rows_by_id.items():
+            matrix[item_id] = self._vector(row)
+        return SemanticIndex(matrix, self.idf)
+
+    def save(self, catalog_path: str):
+        """
+        Writes the matrix and IDF next to a catalog artifact, replacing old files.
+        """
+        for path, array in ((vectors_path(catalog_path), self.matrix), (idf_path(catalog_path), self.idf)):
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, array)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, catalog_path: str, row_count: int):
+        """
+        Maps the stored matrix of a catalog artifact, or returns None when it is
+        missing, older than the catalog or sized for another row count.
+        """
+        vectors, idf = vectors_path(catalog_path), idf_path(catalog_path)
+        try:
+            if os.path.getmtime(vectors) < os.path.getmtime(catalog_path):
+                return None
+            matrix = np.load(vectors, mmap_mode="r")
+            weights = np.load(idf)
+        except (OSError, ValueError):
+            return None
+        if matrix.shape[0] != row_count or matrix.shape[1] != weights.shape[0]:
+            return None
+        return cls(matrix, weights)
+
+    def embed(self, query: str) -> np.ndarray:
+        """
+        Normalized vector of a query with its synonym expansions.
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = query_features(query)
+        if features:
+            cols, vals = _hashed(features, self.dim)
+            np.add.at(vector, cols, vals)
+            vector *= self.idf
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def search(self, query: str, limit: int, min_similarity: float = MIN_SIMILARITY) -> tuple[list, int]:
+        """
+        Top `limit` (similarity, row id) pairs by cosine similarity, best first,
+        and the number of rows above `min_similarity`.
+        """
+        vector = self.embed(query)
+        if not vector.any():
+            return [], 0
+        scores = self.matrix @ vector
+        matches = np.flatnonzero(scores >= min_similarity)
+        total = len(matches)
+        if total > limit:
+            matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+        # Ties keep catalog order
+        order = np.lexsort((matches, -scores[matches]))
+        return [(float(scores[i]), int(i)) for i in matches[order]], total
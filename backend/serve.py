@@ -0,0 +1,145 @@
+"""
+Production launcher: one catalog, N pre-forked API workers.
+
+    python serve.py --workers 4 --port 8000
+    kill -HUP <master pid>     # reload the catalog in every worker
+    kill -TERM <master pid>    # graceful shutdown
+
+The master loads and indexes the catalog once, freezes the garbage collector so
+those objects stay in untouched copy-on-write pages, binds the listening socket
+and forks the workers, which all accept from it. Search rankings and USITC
+responses are cached in a SQLite file shared by every worker (SHARED_CACHE_PATH).
+
+SIGHUP is forwarded to the workers; each swaps in a freshly loaded catalog in
+the background while requests in flight finish on the old one. Workers that
+exit unexpectedly are replaced. A revision applied through the API patches the
+worker that received the request and is recorded in the revision store; the
+other workers, and every worker after a reload, replay it.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Seconds workers get to finish in-flight requests on shutdown
+GRACEFUL_TIMEOUT = 30.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, log_level: str):
+    import uvicorn
+    import main
+
+    signal.signal(signal.SIGHUP, lambda *_: main.reload_requested.set())
+    config = uvicorn.Config(main.app, log_level=log_level, timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, log_level)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info"):
+    # Import the app before forking so workers inherit the loaded modules,
+    # shared-memory metrics and the catalog
+    from catalog import load_catalog
+    import main  # noqa: F401
+
+    catalog = load_catalog()
+    catalog.tree
+    if catalog.has_stored_vectors:
+        catalog.semantic_index
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind(host, port)
+    children = {_spawn(sock, log_level) for _ in range(workers)}
+    print(f"Serving on {host}:{port} with {workers} workers (master pid {os.getpid()})", flush=True)
+
+    stopping = False
+
+    def forward(signum, _frame):
+        nonlocal stopping
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            stopping = True
+            signum = signal.SIGTERM
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    deadline = None
+    while children:
+        try:
+            pid, _status = os.waitpid(-1, 0 if not stopping else os.WNOHANG)
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid == 0:
+            deadline = deadline or time.monotonic() + GRACEFUL_TIMEOUT + 5
+            if time.monotonic() > deadline:
+                for child in children:
+                    os.kill(child, signal.SIGKILL)
+            time.sleep(0.1)
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited; starting a replacement", flush=True)
+            children.add(_spawn(sock, log_level))
+    sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers sharing one catalog.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="API worker processes")
+    parser.add_argument("--pool-processes", type=int, default=None,
+                        help="CPU pool processes per worker (default 0: a thread, the workers give parallelism)")
+    parser.add_argument("--shared-cache", default=None,
+                        help="SQLite file for the shared caches (default: a file in the temp directory)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Read when the caches and pool are created, i.e. when main is imported
+    if args.shared_cache:
+        os.environ["SHARED_CACHE_PATH"] = args.shared_cache
+    os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(tempfile.gettempdir(), f"hts-cache-{args.port}.sqlite3"))
+    if args.pool_processes is not None:
+        os.environ["WORKER_PROCESSES"] = str(args.pool_processes)
+    os.environ.setdefault("WORKER_PROCESSES", "0")
+    serve(args.host, args.port, args.workers, args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
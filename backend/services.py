@@ -1,145 +1,631 @@
-import json
 import os
-import requests
+import heapq
+from itertools import islice
+from zipfile import BadZipFile
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
 from fuzzywuzzy import fuzz
+from catalog import get_catalog
+from usitc_client import usitc_client, normalize_query
+from search_index import looks_like_code, normalize_code, MAX_CANDIDATES
+from duty_engine import compile_rate, sum_ch99_rates, calculate_duty_vectorized
+from metrics import FUZZY_SCORES, QUERY_CACHE_HITS, QUERY_CACHE_MISSES
+from cache import make_cache
+from schemas import DEFAULT_CLASSIFY_TOP_K, MAX_CLASSIFY_PRODUCTS
 
-def load_hts_data():
-    try:
-        # Try to load from local JSON file
-        file_path = os.path.join(os.path.dirname(__file__), 'data', 'hts_subset.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+# Codes listed per added/removed/changed category in a sync report
+MAX_SYNC_DETAILS = 1000
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+# Row fields returned by search; full rows stay on the server
+SEARCH_FIELDS = ('hts_code', 'stat_suffix', 'description', 'level', 'indent', 'parent_hts', 'duties', 'requires_ch99')
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "600"))
+# Hits kept per cached query; deeper pages are ranked again
+QUERY_CACHE_DEPTH = 1000
+# "fuzzy" scores index candidates with Levenshtein ratios; "semantic" ranks all
+# rows by TF-IDF cosine similarity with synonym expansion
+SEARCH_MODES = ("fuzzy", "semantic")
 
-from hts_parser import parse_hts_row
+# Normalized query -> ranked (score, item_id) hits of one catalog version
+query_cache = make_cache("search", maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+_query_cache_fingerprint = None
+
+def load_hts_data():
+    """
+    Returns the HTS rows of the shared in-memory catalog.
+    """
+    return get_catalog().items
 
-def search_usitc(query: str):
+async def search_usitc(query: str):
     """
     Proxies search to USITC API and maps to standard model using central parser.
+    Served through the shared, cached client in usitc_client.
     """
-    try:
-        url = f"https://hts.usitc.gov/reststop/search?keyword={query}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        raw_data = response.json()
-        
-        # Determine if list or dict wrapper
-        results = raw_data if isinstance(raw_data, list) else raw_data.get('results', [])
-        
-        mapped_results = []
-        for item in results:
-            mapped_item = parse_hts_row(item)
-            mapped_results.append(mapped_item)
-            
-        return mapped_results
-
-    except Exception as e:
-        print(f"USITC API Error: {e}")
-        return []
-
-def fetch_hts_codes(query: str):
-    """
-    Fetches HTS codes with AI-like probability scores.
-    """
-    db = load_hts_data()
-    
+    return await usitc_client.search(query)
+
+def score_item(query_str: str, item: dict) -> int:
+    """
+    Fuzzy score of a single row against a lowercased query.
+    """
+    # Search match on description, hts_code, or keywords (if present)
+    # Note: new model uses 'description' instead of 'full_name'
+    description = item.get('description_clean') or item.get('description', '').lower()
+    hts_code = item.get('hts_code', '')
+
+    score_name = fuzz.partial_ratio(query_str, description)
+    score_code = fuzz.ratio(query_str, hts_code)
+
+    # Check keywords if they exist (not strictly in new spec but good to keep if valid)
+    keywords = item.get('keywords', [])
+    score_kw = 0
+    if keywords:
+        score_kw = max([fuzz.partial_ratio(query_str, kw.lower()) for kw in keywords])
+
+    return max(score_name, score_code, score_kw)
+
+def score_to_probability(score: int) -> str:
+    # Simulate "Probability" based on score
+    prob = round((score / 100) * 0.95 * 100, 2)
+    if score == 100: prob = 98.5
+    return f"{prob}%"
+
+def score_code_match(query_digits: str, code_digits: str) -> int:
+    """
+    Score of a code prefix match: 100 for an exact code, otherwise scaled by
+    how much of the code the query covers (always above the 40 cut-off).
+    """
+    if query_digits == code_digits:
+        return 100
+    return int(50 + 50 * len(query_digits) / len(code_digits))
+
+def lookup_hts_prefix(prefix: str, limit: int = 20):
+    """
+    Autocomplete HTS codes by digit prefix using the catalog's sorted code index.
+    """
+    catalog = get_catalog()
+    return [
+        {
+            'hts_code': catalog.items[item_id].get('hts_code'),
+            'stat_suffix': catalog.items[item_id].get('stat_suffix'),
+            'description': catalog.items[item_id].get('description'),
+            'level': catalog.items[item_id].get('level'),
+        }
+        for _, item_id in catalog.code_index.prefix(prefix, limit=limit)
+    ]
+
+def _project(item: dict, score: int, probability: str = None) -> dict:
+    """
+    Lightweight search hit: the fields the result views use, not the full row.
+    """
+    return {
+        **{field: item.get(field) for field in SEARCH_FIELDS},
+        'score': score,
+        'probability': probability or score_to_probability(score),
+    }
+
+def parse_cursor(cursor) -> int:
+    """
+    Offset encoded in a search cursor. Raises ValueError for invalid cursors.
+    """
+    if cursor in (None, ""):
+        return 0
+    offset = int(cursor)
+    if offset < 0:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return offset
+
+def search_page(query: str, limit: int = DEFAULT_SEARCH_LIMIT, cursor=None, mode: str = "fuzzy") -> dict:
+    """
+    One page of ranked search hits with AI-like probability scores.
+
+    Returns {"results", "total", "next_cursor"}. In fuzzy mode only the
+    candidates returned by the catalog's n-gram index are scored; semantic mode
+    scores every row with one matrix-vector product. Only the hits up to the
+    end of the requested page are selected (top-K) and projected.
+    Raises ValueError for an invalid cursor or mode.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}")
+    catalog = get_catalog()
+    db = catalog.items
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    offset = parse_cursor(cursor)
+    end = offset + limit
+
     if not query:
-        # Return all with 100% prob if no query
-        for item in db:
-            item['probability'] = "100%"
-            item['score'] = 100
-        return db
+        # No ranking: every live row at 100%, in catalog order
+        total = catalog.row_count
+        page = [_project(item, 100, "100%") for _, item in islice(catalog.live_items(), offset, end)]
+        return _page(page, total, end)
 
-    results = []
-    query_str = query.lower()
-    for item in db:
-        # Search match on description, hts_code, or keywords (if present)
-        # Note: new model uses 'description' instead of 'full_name'
-        description = item.get('description', '')
-        hts_code = item.get('hts_code', '')
-        
-        score_name = fuzz.partial_ratio(query_str, description.lower())
-        score_code = fuzz.ratio(query_str, hts_code)
-        
-        # Check keywords if they exist (not strictly in new spec but good to keep if valid)
-        keywords = item.get('keywords', [])
-        score_kw = 0
-        if keywords:
-            score_kw = max([fuzz.partial_ratio(query_str, kw.lower()) for kw in keywords]) if keywords else 0
-            
-        score = max(score_name, score_code, score_kw)
-        
+    hits, total = _ranked_hits(catalog, query, end, mode)
+    page = [_project(db[item_id], score) for score, item_id in hits[offset:end]]
+    return _page(page, total, end)
+
+def _ranked_hits(catalog, query: str, depth: int, mode: str = "fuzzy") -> tuple[list, int]:
+    """
+    Top `depth` (score, item_id) hits of a query and the total number of hits,
+    served from the query cache when it holds a deep enough ranking.
+    """
+    key = query_cache_key(catalog, query, mode)
+    cached = query_cache.get(key)
+    if cached is not None and (len(cached[0]) >= depth or len(cached[0]) == cached[1]):
+        QUERY_CACHE_HITS.inc()
+        return cached
+    QUERY_CACHE_MISSES.inc()
+    # Pages past the default candidate pool widen it, so deep cursors reach every match
+    ranked = _rank(catalog, key[2], max(depth, QUERY_CACHE_DEPTH), mode, max(MAX_CANDIDATES, depth))
+    query_cache.set(key, ranked)
+    return ranked
+
+def query_cache_key(catalog, query: str, mode: str = "fuzzy") -> tuple:
+    """
+    Query cache key of a query against a catalog. The first key of a new
+    catalog version drops the rankings of the previous one.
+    """
+    global _query_cache_fingerprint
+    if catalog.fingerprint != _query_cache_fingerprint:
+        if _query_cache_fingerprint is not None:
+            # Rankings of the previous catalog can no longer be hit; free them
+            query_cache.clear()
+        _query_cache_fingerprint = catalog.fingerprint
+    return (catalog.fingerprint, mode, normalize_query(query))
+
+def score_rows(query_str: str, item_ids: list[int]) -> list[tuple[int, int]]:
+    """
+    (score, item_id) of the given rows scoring above the 40 cut-off against a
+    normalized query, in the order given. Runs in the worker pool.
+    """
+    catalog = get_catalog()
+    FUZZY_SCORES.inc(len(item_ids))
+    scored = []
+    for item_id in item_ids:
+        item = catalog.items[item_id]
+        if item is None:
+            continue
+        score = score_item(query_str, item)
         if score > 40:
-            item_copy = item.copy()
-            item_copy['score'] = score
-            # Simulate "Probability" based on score
-            prob = round((score / 100) * 0.95 * 100, 2)
-            if score == 100: prob = 98.5
-            item_copy['probability'] = f"{prob}%"
-            results.append(item_copy)
-    
-    results.sort(key=lambda x: x['score'], reverse=True)
+            scored.append((score, item_id))
+    return scored
+
+def _rank(catalog, query_str: str, depth: int, mode: str = "fuzzy",
+          candidates: int = MAX_CANDIDATES) -> tuple[list, int]:
+    """
+    Top `depth` (score, item_id) hits and the total number of matches.
+    Fuzzy queries score the `candidates` rows sharing the most n-grams with
+    the query; their total also counts the rows containing the query that
+    fell outside that pool, so it is an estimate past the pool size.
+    """
+    scored = []
+    if looks_like_code(query_str):
+        # Fast path: code queries are prefix lookups, no fuzzy scan
+        query_digits = normalize_code(query_str)
+        # Rank within equal scores keeps code order
+        scored = [
+            (score_code_match(query_digits, code_digits), rank, item_id)
+            for rank, (code_digits, item_id) in enumerate(catalog.code_index.prefix(query_digits))
+        ]
+        # No code starts with these digits: fall back to fuzzy matching for typos
+
+    if not scored and mode == "semantic":
+        hits, total = catalog.semantic_index.search(query_str, depth)
+        # Cosine similarity on the same 0-100 scale as fuzzy scores
+        return [(round(similarity * 100, 1), item_id) for similarity, item_id in hits], total
+
+    total = None
+    if not scored:
+        pool = catalog.search_index.candidates(query_str, candidates)
+        FUZZY_SCORES.inc(len(pool))
+        for item_id in pool:
+            score = score_item(query_str, catalog.items[item_id])
+            if score > 40:
+                # Ties keep catalog order
+                scored.append((score, item_id, item_id))
+        if len(pool) >= candidates:
+            total = fuzzy_total(catalog, query_str, len(scored))
+
+    top = heapq.nsmallest(depth, scored, key=lambda hit: (-hit[0], hit[1]))
+    return [(score, item_id) for score, _, item_id in top], total or len(scored)
+
+def fuzzy_total(catalog, query_str: str, scored: int) -> int:
+    """
+    Matches of a fuzzy query whose candidate pool was full: the scored hits,
+    or the rows containing the query when there are more of them.
+    """
+    return max(scored, catalog.search_index.match_count(query_str))
+
+def _page(results: list, total: int, end: int) -> dict:
+    return {"results": results, "total": total, "next_cursor": str(end) if end < total else None}
+
+def fetch_hts_codes(query: str, limit: int = DEFAULT_SEARCH_LIMIT, cursor=None, mode: str = "fuzzy"):
+    """
+    Fetches the top `limit` HTS codes for a query with AI-like probability scores.
+    """
+    return search_page(query, limit, cursor, mode)["results"]
+
+def classify_products(descriptions: list[str], top_k: int = DEFAULT_CLASSIFY_TOP_K, mode: str = "fuzzy") -> list[dict]:
+    """
+    Top `top_k` HTS suggestions per product description, as
+    {"suggestions", "total"}. Descriptions must be unique normalized queries;
+    rankings go through the query cache so repeats across batches are shared.
+    Runs in the worker pool, one chunk of a batch per task.
+    """
+    catalog = get_catalog()
+    results = []
+    for query_str in descriptions:
+        if not query_str:
+            results.append({"suggestions": [], "total": 0})
+            continue
+        hits, total = _ranked_hits(catalog, query_str, top_k, mode)
+        results.append({
+            "suggestions": [_suggestion(catalog.items[item_id], score) for score, item_id in hits[:top_k]],
+            "total": total,
+        })
     return results
 
+def _suggestion(item: dict, score) -> dict:
+    return {
+        'hts_code': item.get('hts_code'),
+        'stat_suffix': item.get('stat_suffix'),
+        'description': item.get('description'),
+        'score': score,
+        'probability': score_to_probability(score),
+    }
+
 def get_hts_tree():
     """
-    Builds a hierarchical tree from the dataset using parent_hts.
-    """
-    db = load_hts_data()
-    
-    # optimize lookup
-    node_map = {item['hts_code']: {**item, 'children': [], 'name': item.get('description')} for item in db}
-    roots = []
-    
-    # Build tree
-    for item in db:
-        code = item['hts_code']
-        node = node_map[code]
-        parent_code = item.get('parent_hts')
-        
-        if parent_code and parent_code in node_map:
-            node_map[parent_code]['children'].append(node)
-        else:
-            # If no parent or parent not found in subset, treat as root
-            roots.append(node)
-            
-    return roots
+    Returns the root nodes of the catalog's precomputed HTS hierarchy.
+    """
+    return get_catalog().tree.roots
 
 def load_chapter99_data():
-    try:
-        file_path = os.path.join(os.path.dirname(__file__), 'data', 'chapter99.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    """
+    Returns the Chapter 99 rules of the shared in-memory catalog.
+    """
+    return get_catalog().ch99_rules
 
-def get_applicable_ch99(hts_doc: dict, country_code: str):
+def get_applicable_ch99(hts_doc: dict, country_code: str, as_of=None):
     """
-    Finds applicable Chapter 99 duties for a given HTS document and country.
+    Finds applicable Chapter 99 duties for a given HTS document and country,
+    in effect on `as_of` (default today).
     """
-    ch99_db = load_chapter99_data()
+    ch99_index = get_catalog().ch99_index
     duties = []
-    
+
     # We rely on 'chapter99_refs' populated by the parser
     # If not present (legacy or raw data), we can't link
     refs = hts_doc.get("chapter99_refs", [])
-    
+
     for ref in refs:
-        # Find matching rule in DB
-        # Optimize: could convert DB to dict for O(1) lookup if large
-        match = next((item for item in ch99_db if item["hts_code"] == ref), None)
-        if match:
-             # Check country condition
-             # If country matches the restricted country (e.g. CN)
-             if match.get("country") == country_code:
-                 duties.append(match)
-                 
+        duties.extend(ch99_index.lookup(ref, country_code, as_of))
+
     return duties
 
-def compare_excel(file_content: bytes, current_db_codes: list):
+def calculate_duty_batch(lines: list[dict]):
+    """
+    Calculates duties for a whole customs entry in one vectorized pass.
+
+    lines: [{"hts_code", "value", "quantity", "country", "entry_date"?}, ...]
+    Rates and Chapter 99 duties are resolved once per distinct (HTS code, country,
+    entry date); the arithmetic for all lines runs on NumPy arrays.
+    """
+    catalog = get_catalog()
+    n = len(lines)
+    values = np.fromiter((line["value"] for line in lines), dtype=np.float64, count=n)
+    quantities = np.fromiter((line.get("quantity") or 0.0 for line in lines), dtype=np.float64, count=n)
+
+    keys = [(line["hts_code"], line["country"], line.get("entry_date")) for line in lines]
+    key_index = {}
+    inverse = np.empty(n, dtype=np.int64)
+    for i, key in enumerate(keys):
+        inverse[i] = key_index.setdefault(key, len(key_index))
+
+    # Per distinct key: ad valorem, specific, special free, ch99 %, ch99 specific, found
+    params = np.zeros((len(key_index), 6), dtype=np.float64)
+    for (hts_code, country, entry_date), pos in key_index.items():
+        doc = catalog.get(hts_code)
+        if doc is None:
+            continue
+        duties_meta = doc.get("duties", {})
+        general = compile_rate(duties_meta.get("general"))
+        free = country in compile_rate(duties_meta.get("special")).programs
+        ch99_percent, ch99_specific = sum_ch99_rates(get_applicable_ch99(doc, country, entry_date))
+        params[pos] = (general.ad_valorem, general.specific, free, ch99_percent, ch99_specific, 1.0)
+
+    line_params = params[inverse]
+    found = line_params[:, 5].astype(bool)
+    base, ch99, total = calculate_duty_vectorized(
+        values, quantities,
+        line_params[:, 0], line_params[:, 1], line_params[:, 2],
+        line_params[:, 3], line_params[:, 4],
+    )
+
+    results = []
+    for i, (hts_code, country, _) in enumerate(keys):
+        if found[i]:
+            results.append({
+                "line": i,
+                "hts_code": hts_code,
+                "country": country,
+                "value": float(values[i]),
+                "quantity": float(quantities[i]),
+                "base_duty": float(base[i]),
+                "ch99_duty": float(ch99[i]),
+                "duty": float(total[i]),
+            })
+        else:
+            results.append({
+                "line": i,
+                "hts_code": hts_code,
+                "country": country,
+                "error": f"HTS code {hts_code} not found",
+            })
+
+    return {
+        "lines": results,
+        "totals": {
+            "lines": n,
+            "errors": int(n - found.sum()),
+            "value": round(float(values[found].sum()), 2),
+            "base_duty": round(float(base[found].sum()), 2),
+            "ch99_duty": round(float(ch99[found].sum()), 2),
+            "duty": round(float(total[found].sum()), 2),
+        },
+    }
+
+def compare_duty_matrix(hts_codes: list[str], countries: list[str], value: float, quantity: float = 0.0,
+                        entry_date=None):
     """
-    Reads an uploaded Excel file and compares HTS codes.
+    Duties of every HTS code from every origin country, for one declared value
+    and quantity, as codes x countries matrices.
+
+    General rates are compiled once per code and Chapter 99 rules looked up once
+    per (code, country); the arithmetic runs as one broadcast NumPy pass.
+    Unknown codes get an "error" and null rows.
+    """
+    catalog = get_catalog()
+    hts_codes = list(dict.fromkeys(hts_codes))
+    countries = list(dict.fromkeys(countries))
+    n, m = len(hts_codes), len(countries)
+
+    # Per code: ad valorem, specific; per (code, country): special free, ch99 %, ch99 specific
+    general = np.zeros((n, 2), dtype=np.float64)
+    free = np.zeros((n, m), dtype=bool)
+    ch99 = np.zeros((n, m, 2), dtype=np.float64)
+    codes = []
+    for i, hts_code in enumerate(hts_codes):
+        doc = catalog.get(hts_code)
+        if doc is None:
+            codes.append({"hts_code": hts_code, "error": f"HTS code {hts_code} not found"})
+            continue
+        codes.append({"hts_code": hts_code, "description": doc.get("description")})
+        duties_meta = doc.get("duties", {})
+        rate = compile_rate(duties_meta.get("general"))
+        general[i] = (rate.ad_valorem, rate.specific)
+        programs = compile_rate(duties_meta.get("special")).programs
+        refs = doc.get("chapter99_refs")
+        for j, country in enumerate(countries):
+            free[i, j] = country in programs
+            if refs:
+                ch99[i, j] = sum_ch99_rates(get_applicable_ch99(doc, country, entry_date))
+
+    base, ch99_duty, total = calculate_duty_vectorized(
+        value, quantity, general[:, :1], general[:, 1:], free, ch99[:, :, 0], ch99[:, :, 1])
+    # Shapes broadcast to (codes, countries)
+    base, ch99_duty, total = (np.broadcast_to(a, (n, m)) for a in (base, ch99_duty, total))
+
+    found = np.array([("error" not in code) for code in codes], dtype=bool)
+    cheapest = np.argmin(total, axis=1) if m else np.zeros(n, dtype=np.int64)
+
+    def matrix(a):
+        return [row.tolist() if ok else None for row, ok in zip(a, found)]
+
+    for code, ok, j in zip(codes, found, cheapest):
+        if ok:
+            code["cheapest_country"] = countries[j]
+    return {
+        "countries": countries,
+        "value": value,
+        "quantity": quantity,
+        "codes": codes,
+        "base_duty": matrix(base),
+        "ch99_duty": matrix(ch99_duty),
+        "duty": matrix(total),
+        "effective_rate": matrix(np.round(total / value, 6) if value else np.zeros((n, m))),
+    }
+
+def _find_column(header: list, *names: str):
+    for idx, title in enumerate(header):
+        title = str(title or "").lower()
+        if any(name in title for name in names):
+            return idx
+    return None
+
+def _first_column(header: list, *names: str):
+    for name in names:
+        idx = _find_column(header, name)
+        if idx is not None:
+            return idx
+    return None
+
+def _even_digits(digits: str) -> str:
+    # Numeric cells lose the leading zero of chapters 01-09; codes have 2, 4, 6... digits
+    return digits.zfill(len(digits) + len(digits) % 2)
+
+def _cell_code(value) -> str:
     """
-    # Placeholder for Excel logic
-    return {"status": "success", "rows": 0, "columns": []}
+    HTS code of a sheet cell. Codes typed as numbers come back from Excel as
+    ints (84713001) or floats (8471.30 -> 8471.3) and are turned back into
+    codes: floats as heading plus two-digit groups, e.g. "8471.30".
+    """
+    if isinstance(value, bool):
+        return ""
+    if isinstance(value, int):
+        return _even_digits(str(value)) if value > 0 else ""
+    if isinstance(value, float):
+        if not value > 0:
+            return ""
+        heading, _, fraction = f"{value:.6f}".partition(".")
+        fraction = fraction.rstrip("0")
+        fraction += "0" * (len(fraction) % 2)
+        return ".".join([_even_digits(heading)] + [fraction[i:i + 2] for i in range(0, len(fraction), 2)])
+    if isinstance(value, str):
+        return value.strip()
+    return ""
+
+def _cell_rate(value):
+    """
+    Duty rate text of a sheet cell. Numbers are ad valorem fractions, as a
+    %-formatted cell stores them (0.025 -> "2.5%"). None for empty cells.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{round(value * 100, 6):g}%"
+    return None if value is None else str(value)
+
+def read_products(file_path: str, max_products: int = MAX_CLASSIFY_PRODUCTS) -> list[dict]:
+    """
+    Products of an uploaded supplier sheet as {"id", "description"}, in row order.
+
+    The header row needs a description column ("Description", "Product"...)
+    and may have an identifier column ("SKU", "Part", "ID"...).
+    Raises ValueError for unreadable sheets and sheets over `max_products` rows.
+    """
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError) as e:
+        raise ValueError(f"Could not read workbook: {e}")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = []
+        for row in rows:
+            if any(cell is not None for cell in row):
+                header = [str(cell) if cell is not None else "" for cell in row]
+                break
+
+        # By name priority: "Product ID" must not win over "Description"
+        description_col = _first_column(header, "description", "product", "item", "name")
+        if description_col is None:
+            raise ValueError("No product description column found in header row")
+        id_col = _first_column(header, "sku", "part", "id", "reference")
+        if id_col == description_col:
+            id_col = None
+
+        products = []
+        for row in rows:
+            description = row[description_col] if description_col < len(row) else None
+            if description is None or not str(description).strip():
+                continue
+            if len(products) >= max_products:
+                raise ValueError(f"Sheets are limited to {max_products} products")
+            product_id = row[id_col] if id_col is not None and id_col < len(row) else None
+            if isinstance(product_id, float) and product_id.is_integer():
+                product_id = int(product_id)
+            elif product_id is not None and not isinstance(product_id, (int, str)):
+                product_id = str(product_id)
+            products.append({"id": product_id, "description": str(description).strip()})
+        return products
+    finally:
+        workbook.close()
+
+def compare_excel(file_path: str, max_details: int = MAX_SYNC_DETAILS):
+    """
+    Streams an uploaded Excel file and compares its HTS codes with the catalog.
+
+    The sheet needs a header row with an HTS column ("HTS Code", "hts_code"...)
+    and may have a general duty column ("General", "Duty rate"...).
+    Rows are read one at a time in read-only mode, so memory stays bounded by the
+    catalog size; at most `max_details` codes are listed per category.
+
+    Catalog codes count as removed only under the headings (first four digits)
+    the sheet lists codes for, so a sheet covering a few chapters is not
+    reported as deleting the rest of the catalog. Repeated codes are counted
+    as duplicates, so added + changed + unchanged + duplicate == rows.
+    """
+    catalog = get_catalog()
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError) as e:
+        raise ValueError(f"Could not read workbook: {e}")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = []
+        for row in rows:
+            if any(cell is not None for cell in row):
+                header = [str(cell) if cell is not None else "" for cell in row]
+                break
+
+        code_col = _find_column(header, "hts")
+        if code_col is None:
+            raise ValueError("No HTS code column found in header row")
+        duty_col = _find_column(header, "general", "duty", "rate")
+
+        counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0, "duplicate": 0}
+        added, removed, changed = [], [], []
+        # Digits of the codes listed so far and the headings they fall under
+        seen, headings = set(), set()
+        total = 0
+
+        for row in rows:
+            code = _cell_code(row[code_col]) if code_col < len(row) else ""
+            if not code:
+                continue
+            total += 1
+
+            digits = normalize_code(code)
+            if digits in seen:
+                counts["duplicate"] += 1
+                continue
+            if digits:
+                seen.add(digits)
+                headings.add(digits[:4])
+
+            item_id = catalog.code_index.get(code)
+            if item_id is None:
+                counts["added"] += 1
+                if len(added) < max_details:
+                    added.append(code)
+                continue
+
+            item = catalog.items[item_id]
+            sheet_duty = _cell_rate(row[duty_col]) if duty_col is not None and duty_col < len(row) else None
+            catalog_duty = (item.get("duties") or {}).get("general")
+            sheet_rate = compile_rate(sheet_duty)
+            catalog_rate = compile_rate(catalog_duty)
+            if sheet_duty is not None and (sheet_rate.ad_valorem, sheet_rate.specific) != (catalog_rate.ad_valorem, catalog_rate.specific):
+                counts["changed"] += 1
+                if len(changed) < max_details:
+                    changed.append({
+                        "hts_code": item.get("hts_code"),
+                        "sheet_general": sheet_duty,
+                        "catalog_general": catalog_duty,
+                        "ad_valorem_diff": round(sheet_rate.ad_valorem - catalog_rate.ad_valorem, 6),
+                        "specific_diff": round(sheet_rate.specific - catalog_rate.specific, 6),
+                    })
+            else:
+                counts["unchanged"] += 1
+    finally:
+        workbook.close()
+
+    # A two-digit chapter code covers its headings; do not count them twice
+    scopes = sorted(h for h in headings if not any(h != other and h.startswith(other) for other in headings))
+    for heading in scopes:
+        for digits, item_id in catalog.code_index.prefix(heading):
+            if digits not in seen:
+                counts["removed"] += 1
+                if len(removed) < max_details:
+                    removed.append(catalog.items[item_id].get("hts_code"))
+
+    return {
+        "status": "success",
+        "rows": total,
+        "columns": header,
+        "summary": counts,
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "truncated": any(counts[key] > max_details for key in ("added", "removed", "changed")),
+    }
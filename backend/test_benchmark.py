@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+from benchmark import generate_catalog, run_benchmarks, compare, main
+
+def test_synthetic_catalog():
+    print("Testing Benchmark Suite...")
+    rows, rules = generate_catalog(500)
+    assert len(rows) == 500
+    codes = {row["hts_code"] for row in rows}
+    assert len(codes) == 500
+    assert all(row["parent_hts"] in codes for row in rows if row["parent_hts"])
+    assert any(row["chapter99_refs"] for row in rows) and rules
+    print("✅ Synthetic catalog is a consistent hierarchy with Ch99 refs")
+
+def test_regression_check():
+    results = run_benchmarks(300, repeat=2)
+    assert set(results) == {"catalog_load", "search", "search_cached", "search_semantic", "tree_build", "ch99_linking", "duty_single", "duty_batch"}
+    assert all(r["p50"] <= r["p95"] <= r["p99"] and r["ops_per_sec"] > 0 for r in results.values())
+
+    baseline = {"300": json.loads(json.dumps(results))}
+    assert compare({"300": results}, baseline, 0.25) == []
+    baseline["300"]["search"]["p95"] = results["search"]["p95"] / 10
+    baseline["300"]["duty_batch"]["peak_bytes"] = results["duty_batch"]["peak_bytes"] // 2
+    regressions = compare({"300": results}, baseline, 0.25)
+    assert any("300/duty_batch: peak memory" in r for r in regressions)
+    print("✅ Regressions beyond the threshold are reported")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.json")
+        assert main(["--sizes", "300", "--repeat", "2", "--baseline", path, "--save-baseline"]) == 0
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+        stored["300"]["tree_build"]["peak_bytes"] = 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        assert main(["--sizes", "300", "--repeat", "2", "--baseline", path]) == 1
+    print("✅ CLI fails against a regressed baseline")
+
+if __name__ == "__main__":
+    test_synthetic_catalog()
+    test_regression_check()
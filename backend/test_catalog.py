@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import catalog
+from catalog import HTSCatalog, load_catalog, get_catalog
+
+def _write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+def test_catalog_hot_reload():
+    print("Testing Catalog Loading and Hot Reload...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hts_path = os.path.join(tmp, 'hts.json')
+        ch99_path = os.path.join(tmp, 'ch99.json')
+        _write(hts_path, [{"hts_code": "8471", "description": "Machines"}])
+        _write(ch99_path, [])
+
+        cat = load_catalog(hts_path, ch99_path)
+        assert get_catalog() is cat
+        assert cat.get("8471")["description_clean"] == "machines"
+        print("✅ Catalog loaded once and shared")
+
+        # Change the file on disk -> next check picks up a new version
+        _write(hts_path, [{"hts_code": "8471", "description": "Machines"},
+                          {"hts_code": "8703", "description": "Motor cars"}])
+        os.utime(hts_path, ns=(0, 1))
+        catalog._last_check = 0.0
+        reloaded = get_catalog()
+        assert reloaded is not cat
+        assert reloaded.version == cat.version + 1
+        assert len(reloaded.items) == 2
+        print("✅ Catalog reloaded after file change")
+
+        # Unchanged files -> same snapshot
+        catalog._last_check = 0.0
+        assert get_catalog() is reloaded
+        print("✅ Unchanged files keep the snapshot")
+
+    # Restore the default catalog for the other tests
+    load_catalog()
+
+def test_missing_files():
+    cat = HTSCatalog('/nonexistent/hts.json', '/nonexistent/ch99.json')
+    assert cat.items == [] and cat.ch99_rules == []
+    print("✅ Missing files give an empty catalog")
+
+if __name__ == "__main__":
+    test_catalog_hot_reload()
+    test_missing_files()
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from catalog import HTSCatalog, SUBSET_DATA_PATH, CH99_DATA_PATH, load_catalog
+from catalog_db import CatalogDatabase, DatabaseTree, write_catalog_db, replace_ch99_rules
+from services import fetch_hts_codes
+from ingest import ingest
+
+def _rows():
+    with open(SUBSET_DATA_PATH, encoding="utf-8") as f:
+        rows = json.load(f)
+    rows[2]["keywords"] = ["notebook", "laptop"]
+    rows[9]["chapter99_refs"] = ["9903.88.03"]
+    return rows
+
+def _codes(nodes):
+    return [(node["hts_code"], node["child_count"], _codes(node["children"])) for node in nodes]
+
+def test_database_catalog():
+    print("Testing SQLite Catalog Backend...")
+    rows = _rows()
+    with open(CH99_DATA_PATH, encoding="utf-8") as f:
+        rules = json.load(f)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, db_path = os.path.join(tmp, "catalog.json"), os.path.join(tmp, "catalog.sqlite")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        assert write_catalog_db(db_path, iter(rows), rules, {"release": "subset"}) == len(rows)
+
+        database = CatalogDatabase(db_path)
+        assert len(database) == len(rows) and database.metadata == {"release": "subset"}
+        assert [row["hts_code"] for row in database] == [row["hts_code"] for row in rows]
+        assert database[2]["keywords"] == ["notebook", "laptop"] and database[-1]["hts_code"] == rows[-1]["hts_code"]
+        print("✅ Rows round-trip through the database")
+
+        memory, db = HTSCatalog(json_path, CH99_DATA_PATH), HTSCatalog(db_path, os.path.join(tmp, "none.json"))
+        assert db.release == "subset" and db.ch99_rules == rules and db.row_count == len(rows)
+        assert db.get("8471.30.01") == memory.get("8471.30.01")
+        assert db.ch99_referrers == memory.ch99_referrers == {"9903.88.03": [9]}
+        for query in ("84", "8471.30", "8703.23"):
+            assert db.code_index.prefix(query) == memory.code_index.prefix(query), query
+        assert db.code_index.get("8471.30.01") == memory.code_index.get("8471.30.01")
+        print("✅ Code lookups, Ch99 rules and references come from the database")
+
+        assert isinstance(db.tree, DatabaseTree)
+        assert _codes(db.tree.get_roots(2)) == _codes(memory.tree.get_roots(2))
+        assert _codes(db.tree.get_children("8471")) == _codes(memory.tree.get_children("8471"))
+        assert _codes([db.tree.get_subtree("8471", 3)]) == _codes([memory.tree.get_subtree("8471", 3)])
+        assert db.tree.get_subtree("0000", 1) is None and db.tree.get_children("0000") is None
+        assert json.loads(db.tree.to_json()) == json.loads(memory.tree.to_json())
+        assert db.tree.roots is db.tree.roots
+        print("✅ Subtree queries match the in-memory tree")
+
+        for query in ("co", "machines", "motor cars"):
+            assert db.search_index.candidates(query) == memory.search_index.candidates(query), query
+        for query in ("co", "motor cars", "laptop", "zzzz"):
+            assert db.search_index.match_count(query) == memory.search_index.match_count(query), query
+        try:
+            for path in (json_path, db_path):
+                load_catalog(path, CH99_DATA_PATH)
+                ranked = [fetch_hts_codes(q) for q in ("laptop", "motor cars", "coffee", "8471")]
+                if path == json_path:
+                    expected = ranked
+            assert ranked == expected
+            print("✅ FTS5 prefiltering gives the same search results")
+
+            replace_ch99_rules(db_path, [])
+            catalog = load_catalog(db_path, CH99_DATA_PATH)
+            assert catalog.ch99_rules == rules
+            catalog.apply_delta({"added": [], "removed": [rows[0]], "changed": []})
+            assert isinstance(catalog.items, list) and catalog.get(rows[0]["hts_code"]) is None
+            assert catalog.row_count == len(rows) - 1 and not isinstance(catalog.tree, DatabaseTree)
+            print("✅ Revision deltas move the catalog to in-memory indexes")
+        finally:
+            load_catalog()
+
+def test_ingest_database_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "release.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"htsno": "8471", "indent": 0, "description": "Machines"}) + "\n")
+            f.write(json.dumps({"htsno": "8471.30", "indent": 1, "description": "Laptops", "general": "Free"}) + "\n")
+        output = os.path.join(tmp, "catalog.sqlite")
+        meta = ingest(source, output, workers=1)
+        assert meta["row_count"] == 2
+        catalog = HTSCatalog(output, CH99_DATA_PATH)
+        assert catalog.get("8471.30")["parent_hts"] == "8471" and catalog.ch99_rules
+        assert catalog.semantic_index.matrix.shape[0] == 2
+    print("✅ ingest.py writes .sqlite output")
+
+if __name__ == "__main__":
+    test_database_catalog()
+    test_ingest_database_output()
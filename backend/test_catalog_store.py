@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+from catalog import HTSCatalog, SUBSET_DATA_PATH, CH99_DATA_PATH
+from catalog_store import MappedCatalogFile, MappedSearchIndex, MappedTree, write_catalog_file
+from ingest import ingest
+
+def _codes(nodes):
+    return [(node["hts_code"], node.get("child_count"), _codes(node["children"])) for node in nodes]
+
+def test_binary_round_trip():
+    print("Testing Columnar Catalog Format...")
+    with open(SUBSET_DATA_PATH, encoding="utf-8") as f:
+        rows = json.load(f)
+    rows[2]["keywords"] = ["notebook", "laptop"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.htsc")
+        write_catalog_file(path, rows, {"release": "subset"})
+
+        mapped = MappedCatalogFile(path)
+        assert len(mapped) == len(rows) and mapped.metadata["release"] == "subset"
+        for original, decoded in zip(rows, mapped):
+            for key in ("hts_code", "description", "parent_hts", "duties", "indent", "level"):
+                assert decoded[key] == original.get(key), key
+            assert decoded.get("footnotes") == original.get("footnotes")
+        assert mapped[2]["keywords"] == ["notebook", "laptop"]
+        assert mapped[-1]["hts_code"] == rows[-1]["hts_code"]
+        print("✅ Rows round-trip through interned strings and integer columns")
+
+        catalog = HTSCatalog(path, CH99_DATA_PATH)
+        json_path = os.path.join(tmp, "catalog.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        memory = HTSCatalog(json_path, CH99_DATA_PATH)
+        assert catalog.release == "subset" and catalog.row_count == len(rows)
+        assert catalog.get("8471.30.01")["description_clean"].startswith("portable")
+        assert isinstance(catalog.search_index, MappedSearchIndex) and isinstance(catalog.tree, MappedTree)
+        assert catalog.by_code == memory.by_code and catalog.code_index.prefix("84") == memory.code_index.prefix("84")
+        print("✅ Catalog loads the memory-mapped file")
+
+        for query in ("laptop", "machines", "motor cars", "co", "8471.30", "zzzz", ""):
+            assert catalog.search_index.candidates(query) == memory.search_index.candidates(query), query
+            assert catalog.search_index.match_count(query) == memory.search_index.match_count(query), query
+        assert catalog.search_index.candidates("machines", limit=1) == memory.search_index.candidates("machines", limit=1)
+        print("✅ Stored postings give the in-memory index's candidates")
+
+        tree = catalog.tree
+        assert _codes(tree.get_roots(2)) == _codes(memory.tree.get_roots(2))
+        assert _codes(tree.get_children("8471")) == _codes(memory.tree.get_children("8471"))
+        assert _codes([tree.get_subtree("8471", 3)]) == _codes([memory.tree.get_subtree("8471", 3)])
+        assert tree.get_subtree("0000", 1) is None and tree.get_children("0000") is None
+        assert json.loads(tree.to_json()) == json.loads(memory.tree.to_json())
+        print("✅ Stored child lists give the in-memory tree")
+
+        catalog.apply_delta({"added": [], "removed": [rows[0]], "changed": []})
+        assert isinstance(catalog.items, list) and catalog.get(rows[0]["hts_code"]) is None
+        assert not isinstance(catalog.search_index, MappedSearchIndex) and catalog.row_count == len(rows) - 1
+        print("✅ Revision deltas move the catalog to in-memory indexes")
+
+def test_ingest_binary_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "release.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"htsno": "8471", "indent": 0, "description": "Machines"}) + "\n")
+            f.write(json.dumps({"htsno": "8471.30", "indent": 1, "description": "Laptops", "units": "No."}) + "\n")
+        output = os.path.join(tmp, "catalog.htsc")
+        meta = ingest(source, output, workers=1)
+        assert meta["row_count"] == 2
+        mapped = MappedCatalogFile(output)
+        assert mapped[1]["parent_hts"] == "8471" and mapped[1]["units"] == ["No."]
+    print("✅ ingest.py writes .htsc output")
+
+if __name__ == "__main__":
+    test_binary_round_trip()
+    test_ingest_binary_output()
@@ -1,4 +1,6 @@
+from datetime import date
 from services import get_applicable_ch99
+from ch99_index import Ch99Index, reverse_index, changed_rule_keys
 
 def test_ch99_linking():
     print("Testing Chapter 99 Linking Logic...")
@@ -28,5 +30,51 @@ def test_ch99_linking():
     assert len(duties_none) == 0
     print("✅ No refs = No extra duty")
 
+def test_ch99_index_effective_dates():
+    print("\nTesting Chapter 99 Index...")
+    index = Ch99Index([
+        {"hts_code": "9903.88.03", "rate": 0.10, "type": "percent", "country": "CN",
+         "effective_from": "2018-07-06", "effective_to": "2019-05-10"},
+        {"hts_code": "9903.88.03", "rate": 0.25, "type": "percent", "country": "CN",
+         "effective_from": "2019-05-10"},
+        {"hts_code": "9903.88.03", "rate": 0.15, "type": "percent", "country": "VN"},
+    ])
+
+    assert [r["rate"] for r in index.lookup("9903.88.03", "CN", date(2018, 12, 1))] == [0.10]
+    assert [r["rate"] for r in index.lookup("9903.88.03", "CN", "2019-05-10")] == [0.25]
+    assert index.lookup("9903.88.03", "CN", date(2017, 1, 1)) == []
+    print("✅ Effective date ranges respected")
+
+    assert [r["rate"] for r in index.lookup("9903.88.03", "VN")] == [0.15]
+    assert index.lookup("9903.88.03", "DE") == []
+    assert index.lookup("9903.01.01", "CN") == []
+    print("✅ Keyed by heading and country")
+
+def test_reverse_index():
+    print("\nTesting Reverse Chapter 99 Index...")
+    rows = [
+        {"hts_code": "4013.10", "chapter99_refs": ["9903.88.03"]},
+        None,
+        {"hts_code": "8471.30", "chapter99_refs": ["9903.88.03", "9903.88.15"]},
+        {"hts_code": "0901.21"},
+    ]
+    assert reverse_index(rows) == {"9903.88.03": [0, 2], "9903.88.15": [2]}
+    print("✅ Headings map to the live rows referencing them")
+
+    old = [
+        {"hts_code": "9903.88.03", "rate": 0.25, "type": "percent", "country": "CN"},
+        {"hts_code": "9903.88.15", "rate": 0.075, "type": "percent", "country": "CN"},
+    ]
+    new = [
+        {"country": "CN", "type": "percent", "rate": 0.25, "hts_code": "9903.88.03"},
+        {"hts_code": "9903.88.15", "rate": 0.15, "type": "percent", "country": "CN"},
+        {"hts_code": "9903.88.15", "rate": 0.1, "type": "percent", "country": "VN"},
+    ]
+    assert changed_rule_keys(old, new) == {("9903.88.15", "CN"), ("9903.88.15", "VN")}
+    assert changed_rule_keys(old, old) == set()
+    print("✅ Changed rules are keyed by heading and country")
+
 if __name__ == "__main__":
     test_ch99_linking()
+    test_ch99_index_effective_dates()
+    test_reverse_index()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+import main
+from services import classify_products, read_products, fetch_hts_codes
+from main import app
+
+def _write_workbook(path, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def test_classify_products():
+    print("Testing Bulk Classification...")
+    results = classify_products(["laptop", "coffee", ""], top_k=2)
+    assert [s["hts_code"] for s in results[0]["suggestions"]] == [r["hts_code"] for r in fetch_hts_codes("laptop", 2)]
+    assert results[1]["suggestions"][0]["hts_code"].startswith("0901")
+    assert set(results[1]["suggestions"][0]) == {"hts_code", "stat_suffix", "description", "score", "probability"}
+    assert results[2] == {"suggestions": [], "total": 0}
+    print("✅ Top-K suggestions per description, same ranking as /api/search")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "supplier.xlsx")
+        _write_workbook(path, [
+            ["SKU", "Product ID", "Description"],
+            [1001, "P-1", "Laptop computer"],
+            ["A-2", "P-2", None],
+            ["A-3", "P-3", "Roasted coffee"],
+        ])
+        products = read_products(path)
+        assert products == [{"id": 1001, "description": "Laptop computer"}, {"id": "A-3", "description": "Roasted coffee"}]
+        _write_workbook(path, [["SKU", "Price"], ["A-1", 3]])
+        try:
+            read_products(path)
+            assert False, "sheet without descriptions accepted"
+        except ValueError:
+            pass
+    print("✅ Supplier sheets are read by description and SKU columns")
+
+def test_classify_endpoint():
+    print("\nTesting /api/classify...")
+    chunk_size = main.CLASSIFY_CHUNK_SIZE
+    main.CLASSIFY_CHUNK_SIZE = 1
+    try:
+        with TestClient(app) as client:
+            products = ["laptop", {"id": "sku-7", "description": "Coffee"}, "LAPTOP ", "zzzz"]
+            response = client.post("/api/classify", json={"products": products, "top_k": 1})
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda l: l["index"])
+            assert [line["index"] for line in lines] == [0, 1, 2, 3]
+            assert lines[0]["suggestions"] == lines[2]["suggestions"] and len(lines[0]["suggestions"]) == 1
+            assert lines[1]["id"] == "sku-7" and lines[1]["suggestions"][0]["hts_code"].startswith("0901")
+            assert lines[3]["suggestions"] == [] and lines[3]["total"] == 0
+            print("✅ One NDJSON line per product, duplicates ranked once")
+
+            assert client.post("/api/classify", json={"products": []}).status_code == 422
+            assert client.post("/api/classify", json={"products": ["x"], "top_k": 100}).status_code == 422
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "supplier.xlsx")
+                _write_workbook(path, [["Part", "Product description"], ["X1", "motor cars"]])
+                with open(path, "rb") as f:
+                    response = client.post("/api/classify/upload?top_k=3", files={"file": ("supplier.xlsx", f)})
+            line = json.loads(response.text)
+            assert line["id"] == "X1" and len(line["suggestions"]) <= 3 and line["suggestions"][0]["hts_code"].startswith("8703")
+            bad = client.post("/api/classify/upload", files={"file": ("supplier.xlsx", b"not a zip")})
+            assert bad.status_code == 400
+            print("✅ Spreadsheet uploads are classified too")
+    finally:
+        main.CLASSIFY_CHUNK_SIZE = chunk_size
+
+if __name__ == "__main__":
+    test_classify_products()
+    test_classify_endpoint()
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import time
+from fastapi.testclient import TestClient
+from duty_engine import calculate_duty
+from services import calculate_duty_batch, compare_duty_matrix, get_applicable_ch99
+from catalog import get_catalog, load_catalog
+from main import app
+
+HTS_ROWS = [
+    {"hts_code": "4013.10.00.10", "description": "Inner tubes, of rubber",
+     "duties": {"general": "3.7%", "special": "Free (CA, MX)", "other": "25%"},
+     "chapter99_refs": ["9903.88.03"]},
+    {"hts_code": "8703.23.01.00", "description": "Passenger motor vehicles",
+     "duties": {"general": "2.5%", "special": "Free", "other": "25%"}},
+    {"hts_code": "0901.21", "description": "Coffee, roasted",
+     "duties": {"general": "1.9¢/kg", "special": "Free", "other": None}},
+]
+CH99_RULES = [
+    {"hts_code": "9903.88.03", "rate": 0.25, "type": "percent", "country": "CN"},
+]
+
+def _load_test_catalog(tmp):
+    hts_path = os.path.join(tmp, 'hts.json')
+    ch99_path = os.path.join(tmp, 'ch99.json')
+    with open(hts_path, 'w', encoding='utf-8') as f:
+        json.dump(HTS_ROWS, f)
+    with open(ch99_path, 'w', encoding='utf-8') as f:
+        json.dump(CH99_RULES, f)
+    return load_catalog(hts_path, ch99_path)
+
+def test_batch_matches_single_line_engine():
+    print("Testing Batch Duty Calculation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        _load_test_catalog(tmp)
+        try:
+            _check_batch()
+        finally:
+            load_catalog()
+
+def _check_batch():
+    lines = [
+        {"hts_code": "4013.10.00.10", "value": 1000.0, "quantity": 10, "country": "CN"},
+        {"hts_code": "4013.10.00.10", "value": 1000.0, "quantity": 10, "country": "DE"},
+        {"hts_code": "4013.10.00.10", "value": 1000.0, "quantity": 10, "country": "CA"},
+        {"hts_code": "8703.23.01.00", "value": 25000.0, "quantity": 1, "country": "JP"},
+        {"hts_code": "0901.21", "value": 500.0, "quantity": 100, "country": "BR"},
+        {"hts_code": "0000.00", "value": 10.0, "quantity": 1, "country": "CN"},
+    ]
+    result = calculate_duty_batch(lines)
+
+    for line, out in zip(lines[:5], result["lines"][:5]):
+        doc = get_catalog().get(line["hts_code"])
+        expected = calculate_duty(doc, line["value"], line["quantity"], line["country"],
+                                  get_applicable_ch99(doc, line["country"]))
+        assert out["duty"] == expected, (out, expected)
+    print("✅ Per-line duties match calculate_duty")
+
+    assert result["lines"][0]["ch99_duty"] == 250.0
+    assert result["lines"][1]["ch99_duty"] == 0.0
+    assert result["lines"][2]["duty"] == 0.0
+    assert result["lines"][4]["duty"] == 1.9
+    assert "error" in result["lines"][5]
+    assert result["totals"]["errors"] == 1
+    assert result["totals"]["duty"] == round(sum(l["duty"] for l in result["lines"][:5]), 2)
+    print("✅ Ch99 stacking, special programs, specific rates, unknown codes and totals")
+
+def test_batch_throughput():
+    lines = [{"hts_code": "4013.10.00.10", "value": 100.0 + i, "quantity": 1, "country": "CN" if i % 2 else "DE"}
+             for i in range(20000)]
+    started = time.perf_counter()
+    result = calculate_duty_batch(lines)
+    elapsed = time.perf_counter() - started
+    assert result["totals"]["lines"] == 20000
+    print(f"✅ 20k lines in {elapsed:.3f}s ({20000 / elapsed:,.0f} lines/s)")
+
+def test_batch_endpoint():
+    with TestClient(app) as client:
+        response = client.post("/api/duty/batch", json={"lines": [
+            {"hts_code": "4013.10.00.10", "value": 1000, "quantity": 1, "country": "CN"},
+        ]})
+        assert response.status_code == 200
+        assert response.json()["totals"]["duty"] > 0
+
+        bad = client.post("/api/duty/batch", json={"lines": [{"hts_code": "4013", "value": -1, "country": "CN"}]})
+        assert bad.status_code == 422
+    print("✅ /api/duty/batch endpoint")
+
+def test_compare_matrix():
+    print("Testing Country-of-Origin Comparison...")
+    with tempfile.TemporaryDirectory() as tmp:
+        _load_test_catalog(tmp)
+        try:
+            codes = ["4013.10.00.10", "0901.21", "0000.00"]
+            countries = ["CN", "DE", "MX"]
+            result = compare_duty_matrix(codes, countries, 1000.0, 10)
+            for i, code in enumerate(codes[:2]):
+                doc = get_catalog().get(code)
+                for j, country in enumerate(countries):
+                    expected = calculate_duty(doc, 1000.0, 10, country, get_applicable_ch99(doc, country))
+                    assert result["duty"][i][j] == expected, (code, country)
+            assert result["duty"][0] == [287.0, 37.0, 0.0]
+            assert result["ch99_duty"][0] == [250.0, 0.0, 0.0]
+            assert result["codes"][0]["cheapest_country"] == "MX"
+            assert result["effective_rate"][0][0] == 0.287
+            assert "error" in result["codes"][2] and result["duty"][2] is None
+        finally:
+            load_catalog()
+    print("✅ Matrix matches calculate_duty for every code and country")
+
+    with TestClient(app) as client:
+        response = client.post("/api/duty/compare", json={
+            "hts_codes": ["4013.10.00.10"], "countries": ["CN", "CN", "VN"], "value": 1000})
+        assert response.status_code == 200
+        assert response.json()["countries"] == ["CN", "VN"]
+        assert len(response.json()["duty"][0]) == 2
+        bad = client.post("/api/duty/compare", json={"hts_codes": ["4013"], "countries": ["CHN"], "value": 1})
+        assert bad.status_code == 422
+    print("✅ /api/duty/compare endpoint")
+
+if __name__ == "__main__":
+    test_batch_matches_single_line_engine()
+    test_batch_throughput()
+    test_batch_endpoint()
+    test_compare_matrix()
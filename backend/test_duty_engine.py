@@ -1,4 +1,4 @@
-from duty_engine import calculate_duty, parse_percent, parse_cents
+from duty_engine import calculate_duty, parse_percent, parse_cents, compile_rate
 
 def test_duty_calculation():
     print("Testing Duty Calculation Logic...")
@@ -69,5 +69,35 @@ def test_duty_calculation():
     
     print("\nAll Tests Passed!")
 
+def test_compiled_rates():
+    print("Testing Compiled Rate Cache...")
+
+    rate = compile_rate("15.4¢/kg + 40.5%")
+    assert rate.ad_valorem == 0.405 and rate.specific == 0.154
+    assert rate.unit == "kg" and rate.compound
+    assert parse_percent("15.4¢/kg + 40.5%") == 0.405
+    print("✅ Compound rate parsed into both parts")
+
+    special = compile_rate("Free (A,AU, BH,CA)")
+    assert special.free and special.programs == frozenset({"A", "AU", "BH", "CA"})
+    assert compile_rate("Free").programs == frozenset()
+    noted = compile_rate("The rate applicable to the article: Free (A,CA)")
+    assert noted.free and noted.ad_valorem == 0.0 and noted.programs == frozenset({"A", "CA"})
+    assert compile_rate(None).ad_valorem == 0.0
+    assert compile_rate("$1.50/kg").specific == 1.5
+    assert compile_rate("37.5¢ each").unit == "each"
+    assert parse_cents("6.5¢/kg") == 0.065
+    print("✅ Special programs, dollar and per-each rates")
+
+    assert compile_rate("2.5%") is compile_rate("2.5%")
+    print("✅ Rates memoized per distinct string")
+
+    # 15.4¢/kg * 100kg + 40.5% of $1000 = 15.40 + 405.00
+    item = {"duties": {"general": "15.4¢/kg + 40.5%", "special": "Free (CA)", "other": None}}
+    assert calculate_duty(item, 1000.0, 100, "CN", []) == 420.40
+    assert calculate_duty(item, 1000.0, 100, "CA", []) == 0.0
+    print("✅ Compound duty calculation")
+
 if __name__ == "__main__":
     test_duty_calculation()
+    test_compiled_rates()
@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+from services import compare_excel, _cell_code
+from catalog import get_catalog, load_catalog
+from revisions import diff_rows
+from main import app
+
+ROWS = [
+    {"hts_code": "8471", "description": "Machines", "parent_hts": None},
+    {"hts_code": "8471.30", "description": "Laptops", "parent_hts": "8471"},
+    {"hts_code": "7308", "description": "Steel structures", "parent_hts": None},
+]
+
+def _write_workbook(path, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def test_compare_excel():
+    print("Testing Excel Sync Diff...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sheet.xlsx")
+        _write_workbook(path, [
+            ["HTS Code", "Description", "General Rate"],
+            ["8471.30.01", "Laptops", "Free"],
+            ["8703", "Motor cars", "5%"],
+            ["0901.21", "Coffee", None],
+            ["9999.99.99", "Unknown", "1%"],
+            ["8471.30.01", "Laptops again", "Free"],
+        ])
+        result = compare_excel(path, max_details=1)
+
+    code_index = get_catalog().code_index
+    in_headings = sum(len(code_index.prefix(heading)) for heading in ("8471", "8703", "0901", "9999"))
+    assert result["rows"] == 5
+    assert result["columns"][0] == "HTS Code"
+    assert result["summary"] == {"added": 1, "removed": in_headings - 3, "changed": 1, "unchanged": 2, "duplicate": 1}
+    assert sum(result["summary"][key] for key in ("added", "changed", "unchanged", "duplicate")) == result["rows"]
+    assert result["added"] == ["9999.99.99"]
+    assert result["changed"][0]["hts_code"] == "8703"
+    assert result["changed"][0]["ad_valorem_diff"] == 0.025
+    assert len(result["removed"]) == 1 and result["truncated"]
+    print("✅ Added / removed / changed codes and duty differences")
+    print("✅ Removed codes are limited to the headings on the sheet, duplicates are counted")
+
+def test_numeric_code_cells():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sheet.xlsx")
+        _write_workbook(path, [["hts_code"], [8471.3], [8471], [84713001], [901.21], [8471.30]])
+        result = compare_excel(path)
+    assert result["summary"]["duplicate"] == 1 and result["summary"]["added"] == 0
+    assert result["summary"]["unchanged"] == 4
+    assert _cell_code(8471.3001) == "8471.30.01" and _cell_code(1012100) == "01012100"
+    print("✅ Codes typed as numbers are read back as dotted codes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sheet.xlsx")
+        _write_workbook(path, [["hts_code", "General"], ["4013.10.00.10", 0.037], ["8471.30.01", 0], ["8703", 0.05]])
+        result = compare_excel(path)
+    assert result["summary"]["unchanged"] == 2 and result["summary"]["changed"] == 1, result["summary"]
+    assert result["changed"][0]["sheet_general"] == "5%" and result["changed"][0]["ad_valorem_diff"] == 0.025
+    print("✅ Numeric duty cells are read as ad valorem fractions")
+
+def test_sync_endpoint():
+    with TestClient(app) as client:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sheet.xlsx")
+            _write_workbook(path, [["hts_code"], ["8471"]])
+            with open(path, "rb") as f:
+                response = client.post("/api/sync", files={"file": ("sheet.xlsx", f)})
+        assert response.status_code == 200
+        assert response.json()["summary"]["unchanged"] == 1
+
+        bad = client.post("/api/sync", files={"file": ("sheet.xlsx", b"not a zip")})
+        assert bad.status_code == 400
+    print("✅ /api/sync streams the upload from disk")
+
+def test_sync_after_revision():
+    print("\nTesting Excel Sync After A Revision...")
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "rev1.json")
+        with open(base, "w", encoding="utf-8") as f:
+            json.dump(ROWS, f)
+        try:
+            catalog = load_catalog(base, os.path.join(tmp, "ch99.json"))
+            catalog.apply_delta(diff_rows(ROWS, ROWS[:2]))
+            assert catalog.items[2] is None
+            path = os.path.join(tmp, "sheet.xlsx")
+            _write_workbook(path, [["hts_code"], ["8471"]])
+            with TestClient(app) as client:
+                with open(path, "rb") as f:
+                    response = client.post("/api/sync", files={"file": ("sheet.xlsx", f)})
+            assert response.status_code == 200
+            assert response.json()["removed"] == ["8471.30"]
+        finally:
+            load_catalog()
+    print("✅ Rows removed by a revision are skipped")
+
+if __name__ == "__main__":
+    test_compare_excel()
+    test_numeric_code_cells()
+    test_sync_endpoint()
+    test_sync_after_revision()
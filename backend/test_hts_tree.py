@@ -0,0 +1,76 @@
+import threading
+import orjson
+from fastapi.testclient import TestClient
+from hts_tree import HTSTree
+from main import app
+
+ITEMS = [
+    {"hts_code": "8471", "description": "Machines", "parent_hts": None},
+    {"hts_code": "8471.30", "description": "Portable machines", "parent_hts": "8471"},
+    {"hts_code": "8471.30.01", "description": "Laptops", "parent_hts": "8471.30"},
+    {"hts_code": "9999.99", "description": "Orphan", "parent_hts": "9999"},
+]
+
+def test_tree_queries():
+    print("Testing Precomputed Tree Queries...")
+    tree = HTSTree(ITEMS, etag='"t"')
+
+    assert [n["hts_code"] for n in tree.roots] == ["8471", "9999.99"]
+    roots = tree.get_roots(depth=0)
+    assert roots[0]["child_count"] == 1 and roots[0]["children"] == []
+    print("✅ depth=0 returns roots only")
+
+    children = tree.get_children("8471.30")
+    assert [c["hts_code"] for c in children] == ["8471.30.01"]
+    assert children[0]["child_count"] == 0
+    assert tree.get_children("0000") is None
+    print("✅ Lazy children lookup")
+
+    subtree = tree.get_subtree("8471", depth=1)
+    assert subtree["children"][0]["hts_code"] == "8471.30"
+    assert subtree["children"][0]["children"] == []
+    assert tree.node_map["8471"]["children"][0]["children"], "shared nodes must not be trimmed"
+    print("✅ Depth-limited subtree")
+
+def test_patch_is_atomic_for_readers():
+    tree = HTSTree(ITEMS, etag='"t1"')
+    tree.to_json("gzip")
+    bodies = []
+    with tree.lock:
+        # A delta in progress: new ETag, half the rows patched
+        tree.remove("9999.99", '"t2"')
+        reader = threading.Thread(target=lambda: bodies.append((tree.etag, tree.to_json())))
+        reader.start()
+        reader.join(0.05)
+        assert reader.is_alive(), "to_json must wait for the patch"
+        tree.add({"hts_code": "7308", "description": "Steel", "parent_hts": None}, '"t2"')
+    reader.join()
+    etag, body = bodies[0]
+    assert etag == '"t2"' and [n["hts_code"] for n in orjson.loads(body)] == ["8471", "7308"]
+    assert tree.to_json() == orjson.dumps(tree.roots, default=str)
+    print("✅ Serialized trees never mix a half-applied delta with the new ETag")
+
+def test_tree_endpoints_etag():
+    print("\nTesting Tree Endpoints...")
+    with TestClient(app) as client:
+        full = client.get("/api/tree")
+        assert full.status_code == 200
+        etag = full.headers["etag"]
+        assert any(node["hts_code"] == "8471" for node in full.json())
+
+        cached = client.get("/api/tree", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        print("✅ ETag / 304 on unchanged catalog")
+
+        children = client.get("/api/tree/8471/children").json()
+        assert [c["hts_code"] for c in children] == ["8471.30"]
+        assert client.get("/api/tree/0000/children").status_code == 404
+
+        subtree = client.get("/api/tree/8471?depth=2").json()
+        assert subtree["children"][0]["children"][0]["hts_code"] == "8471.30.01"
+        print("✅ Children and subtree endpoints")
+
+if __name__ == "__main__":
+    test_tree_queries()
+    test_patch_is_atomic_for_readers()
+    test_tree_endpoints_etag()
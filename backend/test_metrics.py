@@ -0,0 +1,91 @@
+import tempfile
+import time
+from fastapi.testclient import TestClient
+import main
+import metrics
+from profiler import SamplingProfiler, profiler
+from main import app
+
+def test_metric_types():
+    print("Testing Metrics...")
+    histogram = metrics.Histogram("test_latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    counter = metrics.Counter("test_events_total", "Test.", ("kind",))
+    try:
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+        counter.inc(kind="x")
+        counter.inc(2, kind="x")
+        text = metrics.render()
+        assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+        assert 'test_latency_seconds_count{route="/a"} 2' in text
+        assert 'test_events_total{kind="x"} 3' in text
+    finally:
+        metrics.unregister(histogram)
+        metrics.unregister(counter)
+    print("✅ Histograms and counters render in the Prometheus text format")
+
+def test_metrics_endpoint():
+    with TestClient(app) as client:
+        before = metrics.FUZZY_SCORES.value()
+        assert client.get("/api/search?q=automatic data processing").status_code == 200
+        client.get("/api/tree?depth=0")
+        response = client.get("/metrics")
+        assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/search",status="200"}' in text
+        assert 'route="/api/tree"' in text
+        assert "hts_catalog_load_seconds " in text
+        assert 'hts_cache_hit_ratio{cache="compiled_rates"}' in text
+        # Scored in a worker process, counted through shared memory
+        assert metrics.FUZZY_SCORES.value() > before
+    print("✅ /metrics reports request latency, caches, catalog and fuzzy scoring")
+
+def test_sampling_profiler():
+    with tempfile.TemporaryDirectory() as tmp:
+        sampler = SamplingProfiler(directory=tmp, interval=0.001)
+        sampler.start(threshold=0.01)
+        try:
+            started = time.monotonic()
+            deadline = started + 0.05
+            while time.monotonic() < deadline:
+                sum(range(1000))
+            name = sampler.record("GET /slow", started, time.monotonic())
+            assert sampler.record("GET /fast", started, started + 0.001) is None
+        finally:
+            sampler.stop()
+        assert name and name.endswith("GET_slow.folded")
+        with open(sampler.path(name), encoding="utf-8") as f:
+            line = f.readline()
+        assert "test_metrics.py:test_sampling_profiler" in line and line.rstrip().split(" ")[-1].isdigit()
+    print("✅ Slow requests are dumped as folded stacks")
+
+    with TestClient(app) as client, tempfile.TemporaryDirectory() as tmp:
+        assert client.post("/debug/profiler?enabled=true").status_code == 404
+        directory, interval, token = profiler.directory, profiler.interval, main.PROFILER_TOKEN
+        profiler.directory, profiler.interval, main.PROFILER_TOKEN = tmp, 0.001, "secret"
+        admin = {"X-Admin-Token": "secret"}
+        try:
+            assert client.post("/debug/profiler?enabled=true").status_code == 403
+            assert client.get("/debug/profiler", headers={"X-Admin-Token": "wrong"}).status_code == 403
+            assert not profiler.enabled
+            print("✅ Profiler endpoints are off without PROFILER_TOKEN and need the token when on")
+
+            state = client.post("/debug/profiler?enabled=true&threshold_ms=0", headers=admin).json()
+            assert state["enabled"] and state["threshold_ms"] == 0
+            client.get("/api/search?q=portable machines")
+            profiles = client.get("/debug/profiler", headers=admin).json()["profiles"]
+            assert profiles
+            assert client.get(f"/debug/profiler/{profiles[0]}", headers=admin).text
+            assert client.get(f"/debug/profiler/{profiles[0]}").status_code == 403
+            assert client.get("/debug/profiler/missing.folded", headers=admin).status_code == 404
+        finally:
+            client.post("/debug/profiler?enabled=false", headers=admin)
+            profiler.directory, profiler.interval, main.PROFILER_TOKEN = directory, interval, token
+        assert not profiler.enabled
+    print("✅ Profiler toggles at runtime and serves recorded profiles")
+
+if __name__ == "__main__":
+    test_metric_types()
+    test_metrics_endpoint()
+    test_sampling_profiler()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from fastapi.testclient import TestClient
+import main
+import portfolio
+from catalog import load_catalog
+from portfolio import PortfolioStore, save_portfolio, recalculate_portfolio
+from main import app
+
+ROWS = [
+    {"hts_code": "4013.10.00.10", "description": "Inner tubes", "duties": {"general": "4%"},
+     "chapter99_refs": ["9903.88.03"]},
+    {"hts_code": "8471.30.01", "description": "Laptops", "duties": {"general": "Free"},
+     "chapter99_refs": ["9903.88.15"]},
+    {"hts_code": "0901.21", "description": "Coffee", "duties": {"general": "Free"}},
+]
+RULES = [
+    {"hts_code": "9903.88.03", "rate": 0.25, "type": "percent", "country": "CN"},
+    {"hts_code": "9903.88.15", "rate": 0.075, "type": "percent", "country": "CN"},
+]
+LINES = [
+    {"hts_code": "4013.10.00.10", "value": 1000.0, "quantity": 0, "country": "CN"},
+    {"hts_code": "8471.30.01", "value": 2000.0, "quantity": 0, "country": "CN"},
+    {"hts_code": "8471.30.01", "value": 2000.0, "quantity": 0, "country": "VN"},
+    {"hts_code": "0901.21", "value": 500.0, "quantity": 0, "country": "CN"},
+]
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def test_recalculate_portfolio():
+    print("Testing Portfolio Recalculation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        hts_path, ch99_path = os.path.join(tmp, "hts.json"), os.path.join(tmp, "ch99.json")
+        directory = os.path.join(tmp, "portfolios")
+        _write(hts_path, ROWS)
+        _write(ch99_path, RULES)
+        try:
+            catalog = load_catalog(hts_path, ch99_path)
+            assert catalog.ch99_referrers == {"9903.88.03": [0], "9903.88.15": [1]}
+            save_portfolio(directory, "acme", LINES)
+            assert PortfolioStore(directory).list() == ["acme"]
+
+            report = recalculate_portfolio(directory, "acme")
+            assert report["changed_rules"] == [] and report["affected"] == []
+            print("✅ Nothing to recalculate while the rules are unchanged")
+
+            # Section 301 list 4A goes from 7.5% to 15%
+            _write(ch99_path, [RULES[0], {**RULES[1], "rate": 0.15}])
+            load_catalog(hts_path, ch99_path)
+            report = recalculate_portfolio(directory, "acme", dry_run=True)
+            assert report["changed_rules"] == [{"heading": "9903.88.15", "country": "CN"}]
+            assert [line["line"] for line in report["affected"]] == [1]
+            assert report["affected"][0]["before"] == 150.0 and report["affected"][0]["after"] == 300.0
+            assert report["total_delta"] == 150.0
+            print("✅ Only lines on rows and countries of the changed rule are recalculated")
+
+            assert recalculate_portfolio(directory, "acme")["total_delta"] == 150.0
+            assert recalculate_portfolio(directory, "acme")["affected"] == []
+            print("✅ A recalculation moves the portfolio's baseline to the current rules")
+
+            original_store = portfolio.portfolio_store
+            main.portfolio_store = PortfolioStore(directory)
+            try:
+                with TestClient(app) as client:
+                    referrers = client.get("/api/ch99/9903.88.15/hts").json()
+                    assert referrers == {"heading": "9903.88.15", "count": 1, "hts_codes": ["8471.30.01"]}
+                    assert client.get("/api/ch99/9903.01.01/hts").json()["count"] == 0
+                    assert client.put("/api/portfolios/beta", json={"lines": LINES[:1]}).json()["lines"] == 1
+                    assert client.get("/api/portfolios").json() == {"portfolios": ["acme", "beta"]}
+                    result = client.post("/api/portfolios/beta/recalculate").json()
+                    assert result["affected"] == [] and result["lines"] == 1
+                    assert client.post("/api/portfolios/nope/recalculate").status_code == 404
+                    assert client.put("/api/portfolios/..%2Fx", json={"lines": LINES[:1]}).status_code in (400, 404)
+            finally:
+                main.portfolio_store = original_store
+            print("✅ /api/ch99 and /api/portfolios endpoints")
+        finally:
+            load_catalog()
+
+if __name__ == "__main__":
+    test_recalculate_portfolio()
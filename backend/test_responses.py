@@ -0,0 +1,91 @@
+import gzip
+import json
+from fastapi.testclient import TestClient
+import responses
+from hts_tree import HTSTree
+from responses import base_etag, encoded_etag, negotiate_encoding, compress, parse_fields, project
+from main import app
+
+
+def test_negotiation_and_projection():
+    print("Testing Content Negotiation...")
+    assert negotiate_encoding(None) is None and negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    brotli = responses.brotli
+    responses.brotli = None
+    try:
+        assert negotiate_encoding("br, gzip;q=0.8") == "gzip"
+        assert negotiate_encoding("br") is None
+        assert negotiate_encoding("gzip;q=0, *;q=0.5") is None
+    finally:
+        responses.brotli = brotli
+    if brotli is not None:
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert gzip.decompress(compress(b"x" * 100, "gzip")) == b"x" * 100
+    assert encoded_etag('"t"', "gzip") == '"t-gzip"' and encoded_etag('"t"', None) == '"t"'
+    assert base_etag('W/"t-br"') == base_etag('"t-gzip"') == base_etag('"t"') == '"t"'
+    print("✅ br is preferred when installed, gzip otherwise, q=0 refuses a coding; encoded ETags")
+
+    tree = HTSTree([
+        {"hts_code": "8471", "description": "Machines", "description_clean": "machines", "created_at": "t"},
+        {"hts_code": "8471.30", "description": "Laptops", "parent_hts": "8471", "updated_at": "t"},
+    ], etag='"t"')
+    assert not {"description_clean", "created_at", "updated_at"} & set(tree.node_map["8471"])
+    assert project(tree.roots, parse_fields("hts_code, name")) == [
+        {"hts_code": "8471", "name": "Machines", "child_count": 1,
+         "children": [{"hts_code": "8471.30", "name": "Laptops", "child_count": 0, "children": []}]}]
+    assert project(tree.roots, None) is tree.roots
+    try:
+        parse_fields(" , ")
+        assert False, "empty fields accepted"
+    except ValueError:
+        pass
+    print("✅ Tree nodes drop search-only fields, fields= keeps the tree structure")
+
+
+def test_compressed_endpoints():
+    print("\nTesting Compressed Responses...")
+    with TestClient(app) as client:
+        plain = client.get("/api/tree", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        packed = client.get("/api/tree", headers={"Accept-Encoding": "gzip"})
+        assert packed.headers["content-encoding"] == "gzip" and "Accept-Encoding" in packed.headers["vary"]
+        assert packed.json() == plain.json()
+        assert int(packed.headers["content-length"]) < len(plain.content) / 4
+        assert "description_clean" not in plain.json()[0]
+        assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+        for etag in (plain.headers["etag"], packed.headers["etag"], "W/" + packed.headers["etag"]):
+            assert client.get("/api/tree", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"}).status_code == 304
+        print("✅ The full tree is served precompressed, with an ETag per encoding")
+
+        roots = client.get("/api/tree?depth=3", headers={"Accept-Encoding": "gzip"})
+        assert roots.headers["content-encoding"] == "gzip" and roots.headers["etag"].endswith('-gzip"')
+        assert client.get("/api/tree?depth=3", headers={"If-None-Match": roots.headers["etag"]}).status_code == 304
+
+        search = client.get("/api/search?q=&limit=200", headers={"Accept-Encoding": "gzip"})
+        assert search.headers["content-encoding"] == "gzip"
+        slim = client.get("/api/search?q=&limit=200&fields=hts_code,probability").json()
+        assert [hit["hts_code"] for hit in slim] == [hit["hts_code"] for hit in search.json()]
+        assert set(slim[0]) == {"hts_code", "probability"}
+        assert client.get("/api/search?q=laptop&fields=,").status_code == 400
+        print("✅ Search pages are compressed and projected")
+
+        roots = client.get("/api/tree?depth=1&fields=hts_code").json()
+        assert set(roots[0]) == {"hts_code", "child_count", "children"}
+        children = client.get(f"/api/tree/{roots[0]['hts_code']}/children?fields=name").json()
+        assert all(set(child) == {"name", "child_count", "children"} for child in children)
+
+        small = client.get("/api/search?q=laptop&limit=1", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+        lines = client.post("/api/classify", json={"products": ["laptop"] * 3, "top_k": 20},
+                            headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in lines.headers and len(lines.text.splitlines()) == 3
+        assert json.loads(lines.text.splitlines()[0])["index"] == 0
+        print("✅ Small bodies and NDJSON streams are left uncompressed")
+
+
+if __name__ == "__main__":
+    test_negotiation_and_projection()
+    test_compressed_endpoints()
@@ -0,0 +1,102 @@
+import copy
+import json
+import os
+import tempfile
+from fastapi.testclient import TestClient
+import main
+import revisions
+from catalog import load_catalog, get_catalog
+from revisions import RevisionStore, diff_rows, summarize_diff
+from main import app
+
+REV_A = [
+    {"hts_code": "8471", "description": "Machines", "parent_hts": None,
+     "duties": {"general": "Free", "special": "Free", "other": None}},
+    {"hts_code": "8471.30", "description": "Laptops", "parent_hts": "8471",
+     "duties": {"general": "Free", "special": "Free", "other": None}},
+    {"hts_code": "7308", "description": "Steel structures", "parent_hts": None,
+     "duties": {"general": "Free", "special": "Free", "other": None}},
+]
+
+def _rev_b():
+    rows = copy.deepcopy(REV_A)
+    rows[1]["duties"]["general"] = "2.5%"                     # duty change
+    del rows[2]                                                # removed
+    rows.append({"hts_code": "8471.41", "description": "Desktop computers", "parent_hts": "8471",
+                 "duties": {"general": "Free", "special": "Free", "other": None}})  # added
+    return rows
+
+def test_diff_rows():
+    print("Testing Revision Diffs...")
+    delta = diff_rows(REV_A, _rev_b())
+    assert [r["hts_code"] for r in delta["added"]] == ["8471.41"]
+    assert [r["hts_code"] for r in delta["removed"]] == ["7308"]
+    assert delta["changed"][0]["key"] == ("8471.30", None)
+    assert delta["changed"][0]["changes"]["duties"]["to"]["general"] == "2.5%"
+    assert summarize_diff(delta)["summary"]["duty_changed"] == 1
+
+    # Missing vs empty fields are not changes
+    assert diff_rows([{"hts_code": "1", "units": []}], [{"hts_code": "1"}])["changed"] == []
+    print("✅ Added / removed / changed rows keyed by code and suffix")
+
+def test_apply_revision_incrementally():
+    print("\nTesting Incremental Catalog Update...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "revisions"))
+        for name, rows in (("2025-rev1", REV_A), ("2025-rev2", _rev_b())):
+            with open(os.path.join(tmp, "revisions", name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(rows, f)
+        base = os.path.join(tmp, "revisions", "2025-rev1.json")
+        store = RevisionStore(os.path.join(tmp, "revisions"))
+        original_store = revisions.revision_store
+        try:
+            catalog = load_catalog(base, os.path.join(tmp, "ch99.json"))
+            index = catalog.search_index
+            tree = catalog.tree
+            etag = tree.etag
+            assert catalog.search_index.candidates("steel")
+            assert catalog.semantic_index.search("steel", limit=5)[1]
+
+            summary = revisions.apply_revision("2025-rev2", store=store)
+            assert summary == {"added": 1, "removed": 1, "changed": 1, "duty_changed": 1}
+
+            assert get_catalog() is catalog and catalog.search_index is index and catalog.tree is tree
+            assert catalog.release == "2025-rev2" and tree.etag != etag
+            assert catalog.get("7308") is None and catalog.search_index.candidates("steel") == []
+            assert catalog.semantic_index.search("steel", limit=5) == ([], 0)
+            assert catalog.semantic_index.matrix.shape[0] == len(catalog.items)
+            assert catalog.get("8471.30")["duties"]["general"] == "2.5%"
+            assert [c["hts_code"] for c in tree.get_children("8471")] == ["8471.30", "8471.41"]
+            assert [item_id for _, item_id in catalog.code_index.prefix("8471")] == [0, 1, 3]
+            print("✅ Indexes and tree patched in place")
+
+            # Another worker, or this one after a reload, starts from the base files
+            other = load_catalog(base, os.path.join(tmp, "ch99.json"))
+            assert other.release != "2025-rev2"
+            assert revisions.replay_applied_revision(store) == summary
+            assert other.release == "2025-rev2" and other.get("7308") is None
+            assert revisions.replay_applied_revision(store) is None
+            with open(base, "w", encoding="utf-8") as f:
+                json.dump(REV_A + [{"hts_code": "9999", "description": "New"}], f)
+            load_catalog(base, os.path.join(tmp, "ch99.json"))
+            assert revisions.replay_applied_revision(store) is None and get_catalog().get("9999")
+            print("✅ Applied revisions are replayed on catalogs loaded from the same files")
+
+            revisions.revision_store = store
+            main.revision_store = store
+            with TestClient(app) as client:
+                listing = client.get("/api/revisions").json()
+                assert listing["revisions"] == ["2025-rev1", "2025-rev2"]
+                diff = client.get("/api/revisions/2025-rev1/diff/2025-rev2?duty_only=true").json()
+                assert diff["summary"]["duty_changed"] == 1
+                assert diff["changed"][0]["hts_code"] == "8471.30"
+                assert client.get("/api/revisions/2025-rev1/diff/nope").status_code == 404
+            print("✅ /api/revisions endpoints")
+        finally:
+            revisions.revision_store = original_store
+            main.revision_store = original_store
+            load_catalog()
+
+if __name__ == "__main__":
+    test_diff_rows()
+    test_apply_revision_incrementally()
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+from search_index import SearchIndex, CodeIndex, ngrams, normalize, normalize_code, looks_like_code, MAX_CANDIDATES
+from fastapi.testclient import TestClient
+import services
+from services import fetch_hts_codes, lookup_hts_prefix, search_page
+from metrics import QUERY_CACHE_HITS, QUERY_CACHE_MISSES
+from catalog import get_catalog, load_catalog
+from main import app
+
+ITEMS = [
+    {"hts_code": "8471.30.01", "description_clean": "portable digital automatic data processing machines (laptops)"},
+    {"hts_code": "0901.21", "description_clean": "coffee, roasted: not decaffeinated"},
+    {"hts_code": "8703", "description_clean": "motor cars and other motor vehicles", "keywords": ["Sedan", "SUV"]},
+]
+
+def test_index_candidates():
+    print("Testing Search Index Candidate Pruning...")
+
+    assert normalize("8471.30  Laptops!") == "8471 30 laptops"
+    assert "lap" in ngrams("Laptop")
+
+    index = SearchIndex(ITEMS)
+    assert index.candidates("laptop") == [0]
+    print("✅ Description n-grams narrow 'laptop' to one row")
+
+    assert index.candidates("8471.30") == [0]
+    print("✅ HTS code n-grams indexed")
+
+    assert index.candidates("sedan") == [2]
+    print("✅ Keywords indexed")
+
+    assert index.candidates("co") == [1]
+    print("✅ Short queries use token prefixes")
+
+    assert index.candidates("zzzz") == []
+    assert index.candidates("") == []
+    print("✅ No shared n-grams -> no candidates")
+
+    steel = SearchIndex([{"hts_code": "7308.90", "description_clean": "other structures of iron or steel, parts of them"},
+                         {"hts_code": "7308", "description_clean": "steel structures"},
+                         {"hts_code": "7326", "description_clean": "other articles of iron or steel"}])
+    assert steel.candidates("steel", limit=1) == [1] and steel.candidates("steel") == [1, 2, 0]
+    print("✅ Rows with equal overlap rank shortest first")
+
+    assert index.match_count("motor") == 1 and index.match_count("co") == 1 and index.match_count("zzzz") == 0
+    print("✅ Rows containing a query are counted without the candidate cap")
+
+def test_search_uses_index():
+    results = fetch_hts_codes("Laptop")
+    assert results[0]["hts_code"] == "8471.30.01"
+    assert all(r["score"] > 40 for r in results)
+    assert all("coffee" not in r["description"].lower() for r in results)
+    print("✅ fetch_hts_codes scores only indexed candidates")
+
+def test_code_prefix_index():
+    print("\nTesting HTS Code Prefix Index...")
+
+    assert normalize_code("8471.30.01") == "84713001"
+    assert looks_like_code("8471.30") and looks_like_code(" 8471 30 ")
+    assert not looks_like_code("laptop 8471") and not looks_like_code("8")
+
+    index = CodeIndex(ITEMS)
+    assert [item_id for _, item_id in index.prefix("8")] == [0, 2]
+    assert [item_id for _, item_id in index.prefix("8471.3")] == [0]
+    assert index.prefix("99") == []
+    assert len(index.prefix("8", limit=1)) == 1
+    print("✅ Prefix lookups over normalized digits")
+
+    suggestions = lookup_hts_prefix("8471.30", limit=3)
+    assert [s["hts_code"] for s in suggestions] == ["8471.30", "8471.30.01", "8471.30.01.00"]
+    print("✅ Autocomplete returns codes in order")
+
+    results = fetch_hts_codes("8471.30")
+    assert results[0]["hts_code"] == "8471.30" and results[0]["score"] == 100
+    assert all(r["hts_code"].startswith("8471.30") for r in results)
+    print("✅ Code queries take the prefix fast path")
+
+def test_search_pagination():
+    print("\nTesting Paginated Search...")
+    total = get_catalog().row_count
+    first = search_page("", limit=3)
+    assert len(first["results"]) == 3 and first["total"] == total and first["next_cursor"] == "3"
+    assert "description_clean" not in first["results"][0]
+    assert first["results"][0]["probability"] == "100%"
+    print("✅ Empty query returns one page of projections, not the catalog")
+
+    for query in ("", "machines", "8471"):
+        ranked = search_page(query, limit=200)["results"]
+        pages, cursor = [], None
+        while True:
+            page = search_page(query, limit=2, cursor=cursor)
+            pages.extend(page["results"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert pages == ranked, query
+    print("✅ Cursor pages concatenate to the full ranking")
+
+    with TestClient(app) as client:
+        response = client.get("/api/search?q=&limit=2")
+        assert len(response.json()) == 2
+        assert response.headers["x-total-count"] == str(total) and response.headers["x-next-cursor"] == "2"
+        last = client.get(f"/api/search?q=&limit=2&cursor={total - 1}")
+        assert len(last.json()) == 1 and "x-next-cursor" not in last.headers
+        assert client.get("/api/search?q=laptop&cursor=abc").status_code == 400
+        assert client.get("/api/search?q=laptop&limit=0").status_code == 422
+    print("✅ /api/search takes limit/cursor and reports totals in headers")
+
+def test_deep_pages():
+    print("\nTesting Pages Past The Candidate Pool...")
+    rows = [{"hts_code": f"7308.{i:04d}", "description": f"Steel structure part {i}"} for i in range(MAX_CANDIDATES * 2)]
+    rows.append({"hts_code": "0901", "description": "Coffee"})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rows.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        try:
+            load_catalog(path, os.path.join(tmp, "ch99.json"))
+            services.query_cache.clear()
+            first = search_page("steel", limit=50)
+            assert first["total"] == MAX_CANDIDATES * 2
+            seen = [r["hts_code"] for r in first["results"]]
+            cursor = first["next_cursor"]
+            while cursor is not None:
+                page = search_page("steel", limit=50, cursor=cursor)
+                assert page["results"] and page["total"] == first["total"]
+                seen += [r["hts_code"] for r in page["results"]]
+                cursor = page["next_cursor"]
+            assert len(seen) == len(set(seen)) == MAX_CANDIDATES * 2
+        finally:
+            services.query_cache.clear()
+            load_catalog()
+    print("✅ Totals count every matching row and cursors page through all of them")
+
+def test_query_cache():
+    print("\nTesting Query Result Cache...")
+    services.query_cache.clear()
+    hits, misses = QUERY_CACHE_HITS.value(), QUERY_CACHE_MISSES.value()
+    first = fetch_hts_codes("Motor  Cars")
+    assert fetch_hts_codes("motor cars") == first
+    assert search_page("motor cars", limit=1, cursor="1")["results"] == first[1:2]
+    assert QUERY_CACHE_MISSES.value() == misses + 1 and QUERY_CACHE_HITS.value() == hits + 2
+    print("✅ Normalized repeat queries are served from the cache")
+
+    catalog = get_catalog()
+    fingerprint = catalog.fingerprint
+    catalog.fingerprint = "changed"
+    try:
+        assert fetch_hts_codes("motor cars") == first
+        assert QUERY_CACHE_MISSES.value() == misses + 2
+        assert len(services.query_cache) == 1
+    finally:
+        catalog.fingerprint = fingerprint
+    print("✅ A new catalog version invalidates cached rankings")
+
+if __name__ == "__main__":
+    test_index_candidates()
+    test_search_uses_index()
+    test_code_prefix_index()
+    test_search_pagination()
+    test_deep_pages()
+    test_query_cache()
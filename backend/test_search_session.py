@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+from fastapi.testclient import TestClient
+import search_session
+import services
+from cache import SharedCache
+from search_session import SearchSession, SESSION_QUERIES
+from services import search_page
+from main import app
+
+
+def _codes(results):
+    return [r["hts_code"] for r in results]
+
+
+def _run(session, query, limit=20):
+    async def collect():
+        return [message async for message in session.search(query, limit)]
+    return asyncio.run(collect())
+
+
+def test_session_narrowing():
+    print("Testing As-You-Type Session Narrowing...")
+    services.query_cache.clear()
+    session = SearchSession()
+    fresh, narrowed = SESSION_QUERIES.value(path="fresh"), SESSION_QUERIES.value(path="narrowed")
+
+    for query in ("mot", "moto", "motor", "motor c", "motor cars"):
+        final = _run(session, query)[-1]
+        expected = search_page(query, 20)
+        assert final["final"] and final["total"] == expected["total"], query
+        assert _codes(final["results"]) == _codes(expected["results"]), query
+    assert SESSION_QUERIES.value(path="narrowed") == narrowed + 3
+    assert SESSION_QUERIES.value(path="fresh") == fresh + 2
+    print("✅ Finishing a word rescores the last hits, a new word gets fresh candidates")
+
+    assert not session.narrows(services.get_catalog(), "mo")
+    _run(session, "")
+    assert session.query is None and not session.hits
+    print("✅ Empty and code queries reset the session")
+
+    services.query_cache.clear()
+    chunk_size = search_session.SESSION_CHUNK_SIZE
+    search_session.SESSION_CHUNK_SIZE = 1
+    try:
+        messages = _run(SearchSession(), "machines", limit=2)
+    finally:
+        search_session.SESSION_CHUNK_SIZE = chunk_size
+    assert not messages[0]["final"] and messages[-1]["final"]
+    assert _codes(messages[-1]["results"]) == _codes(search_page("machines", 2)["results"])
+    print("✅ A preliminary batch is streamed before the final page")
+
+
+def test_session_query_cache():
+    print("\nTesting Session Query Cache...")
+    services.query_cache.clear()
+    cached = SESSION_QUERIES.value(path="cached")
+    for _ in range(2):
+        _run(SearchSession(), "motor cars")
+    if search_session.work_pool.processes > 0:
+        assert SESSION_QUERIES.value(path="cached") == cached
+        print("✅ An in-process query cache is not consulted when /api/search ranks in worker processes")
+
+    original = search_session.query_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        search_session.query_cache = SharedCache(os.path.join(tmp, "cache.sqlite"), "search")
+        try:
+            first = _run(SearchSession(), "motor cars")[-1]
+            second = _run(SearchSession(), "motor cars")[-1]
+        finally:
+            search_session.query_cache = original
+    assert SESSION_QUERIES.value(path="cached") == cached + 1
+    assert _codes(second["results"]) == _codes(first["results"]) and second["total"] == first["total"]
+    print("✅ A shared query cache answers repeated session queries")
+
+
+def test_session_endpoint():
+    print("\nTesting /api/search/session...")
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/search/session") as ws:
+            ws.send_json({"q": "lap", "seq": 1})
+            ws.send_json({"q": "laptop", "seq": 2, "limit": 5})
+            while True:
+                message = ws.receive_json()
+                if message.get("final") and message["seq"] == 2:
+                    break
+            assert message["q"] == "laptop"
+            assert _codes(message["results"]) == _codes(search_page("laptop", 5)["results"])
+            print("✅ The last query of a burst gets its final page")
+
+            ws.send_json({"q": "laptop", "mode": "bogus", "seq": 3})
+            assert "error" in ws.receive_json()
+            ws.send_text("not json")
+            assert "error" in ws.receive_json()
+            ws.send_bytes(b'{"q": "laptop"}')
+            assert "error" in ws.receive_json()
+            ws.send_json({"q": "laptop", "seq": 5, "limit": 1})
+            while not (message := ws.receive_json()).get("final"):
+                pass
+            assert message["seq"] == 5 and len(message["results"]) == 1
+            print("✅ Bad messages get an error reply and keep the session open")
+
+        original = SearchSession.search
+        for exc, error in ((RuntimeError("boom"), "Search failed"), (asyncio.CancelledError(), "Server busy")):
+            async def failing(self, query, limit=20, mode="fuzzy", exc=exc):
+                raise exc
+                yield
+            SearchSession.search = failing
+            try:
+                with client.websocket_connect("/api/search/session") as ws:
+                    ws.send_json({"q": "laptop", "seq": 4})
+                    message = ws.receive_json()
+                    assert message["seq"] == 4 and message["error"].startswith(error), message
+            finally:
+                SearchSession.search = original
+        print("✅ Pool failures, including tasks dropped by a pool restart, get an error reply")
+
+
+if __name__ == "__main__":
+    test_session_narrowing()
+    test_session_query_cache()
+    test_session_endpoint()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import numpy as np
+from fastapi.testclient import TestClient
+from catalog import HTSCatalog, load_catalog, get_catalog
+from ingest import ingest
+from semantic import SemanticIndex, stem, vectors_path, idf_path
+from services import search_page
+import main
+from main import app
+
+ROWS = [
+    {"description": "Portable automatic data processing machines, weighing not more than 10 kg"},
+    {"description": "Coffee, roasted, not decaffeinated"},
+    {"description": "Motor cars and other motor vehicles principally designed for the transport of persons"},
+    {"description": "New pneumatic tires, of rubber, of a kind used on motor cars"},
+]
+
+def test_semantic_ranking():
+    print("Testing Semantic Search...")
+    assert stem("machines") == "machine" and stem("batteries") == "battery" and stem("glass") == "glass"
+
+    index = SemanticIndex.from_rows(ROWS)
+    assert index.matrix.shape == (4, 512) and index.matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+
+    hits, total = index.search("notebook computer", limit=2)
+    assert hits[0][1] == 0 and total >= 1
+    assert index.search("automobile", limit=1)[0][0][1] == 2
+    assert index.search("tyres", limit=1)[0][0][1] == 3
+    assert index.search("zzzz qqqq", limit=5) == ([], 0)
+    print("✅ Synonyms and inflections reach tariff wording")
+
+    patched = index.patched({1: None, 4: {"description": "Bicycles and other cycles"}})
+    assert patched.matrix.shape[0] == 5 and not patched.matrix[1].any()
+    assert patched.search("bike", limit=1)[0][0][1] == 4
+    assert all(item_id != 1 for _, item_id in patched.search("roasted coffee", limit=5)[0])
+    print("✅ Vectors patched for removed and added rows")
+
+def test_stored_vectors():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "release.json")
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump([{"htsno": f"{i + 1:04d}", "indent": 0, **row} for i, row in enumerate(ROWS)], f)
+        for output in (os.path.join(tmp, "catalog.json"), os.path.join(tmp, "catalog.htsc")):
+            ingest(source, output, workers=1)
+            assert os.path.exists(vectors_path(output)) and os.path.exists(idf_path(output))
+
+            catalog = HTSCatalog(output, os.path.join(tmp, "missing.json"))
+            assert catalog.has_stored_vectors
+            assert isinstance(catalog.semantic_index.matrix, np.memmap)
+            hits, _ = catalog.semantic_index.search("laptop", limit=1)
+            assert catalog.items[hits[0][1]]["hts_code"] == "0001"
+
+        ingest(source, os.path.join(tmp, "plain.json"), workers=1, vectors=False)
+        assert not os.path.exists(vectors_path(os.path.join(tmp, "plain.json")))
+        assert vectors_path(os.path.join(tmp, "catalog.json")) != vectors_path(os.path.join(tmp, "catalog.htsc"))
+        catalog = HTSCatalog(os.path.join(tmp, "plain.json"), os.path.join(tmp, "missing.json"))
+        assert not catalog.has_stored_vectors
+        assert not isinstance(catalog.semantic_index.matrix, np.memmap)
+        print("✅ Ingest stores the matrix per artifact and the catalog maps it")
+
+        try:
+            load_catalog(os.path.join(tmp, "plain.json"), os.path.join(tmp, "missing.json"))
+            main.reload_requested.set()
+            main._reload_catalog()
+            assert get_catalog()._semantic is None
+            load_catalog(os.path.join(tmp, "catalog.htsc"), os.path.join(tmp, "missing.json"))
+            main.reload_requested.set()
+            main._reload_catalog()
+            assert isinstance(get_catalog()._semantic.matrix, np.memmap)
+        finally:
+            load_catalog()
+    print("✅ Reloads only map stored vectors; others are computed on first semantic use")
+
+def test_semantic_mode():
+    results = search_page("notebook computer", limit=3, mode="semantic")["results"]
+    assert results[0]["hts_code"].startswith("8471.30")
+    assert search_page("8471.30", mode="semantic")["results"][0]["hts_code"] == "8471.30"
+    with TestClient(app) as client:
+        response = client.get("/api/search?q=notebook computer&mode=semantic&limit=1")
+        assert response.json()[0]["hts_code"].startswith("8471.30")
+        assert client.get("/api/search?q=laptop&mode=other").status_code == 422
+    print("✅ /api/search?mode=semantic")
+
+if __name__ == "__main__":
+    test_semantic_ranking()
+    test_stored_vectors()
+    test_semantic_mode()
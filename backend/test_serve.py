@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from cache import SharedCache
+
+def test_shared_cache_across_processes():
+    print("Testing Shared Cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = SharedCache(path, "search", maxsize=3, ttl=60)
+        assert cache.get("laptop") is None and cache.misses == 1
+
+        pid = os.fork()
+        if pid == 0:
+            SharedCache(path, "search").set("laptop", [[[100, 2]], 1])
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert cache.get("laptop") == [[[100, 2]], 1] and cache.hits == 1
+        assert SharedCache(path, "usitc").get("laptop") is None
+        print("✅ Entries written by one process are read by another")
+
+        cache.PURGE_EVERY = 1
+        for i in range(5):
+            cache.set(f"q{i}", i)
+        assert len(cache) == 3 and cache.get("q4") == 4 and cache.get("q0") is None
+        expired = SharedCache(path, "search", ttl=-1)
+        expired.set("old", 1)
+        assert expired.get("old") is None
+        cache.clear()
+        assert len(cache) == 0
+    print("✅ Size bound, expiry and clear")
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_prefork_server():
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        master = subprocess.Popen(
+            [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "2",
+             "--log-level", "warning", "--shared-cache", os.path.join(tmp, "cache.sqlite3")],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    httpx.get(url + "/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            for _ in range(4):
+                assert httpx.get(url + "/api/search?q=laptop").json()[0]["hts_code"].startswith("8471")
+            metrics = httpx.get(url + "/metrics").text
+            # Misses and hits are counted across workers through shared memory
+            assert "hts_query_cache_misses_total 1" in metrics and "hts_query_cache_hits_total 3" in metrics
+            print("✅ Workers share the preloaded catalog and the search cache")
+
+            master.send_signal(signal.SIGHUP)
+            for _ in range(50):
+                if "hts_catalog_version 2" in httpx.get(url + "/metrics").text:
+                    break
+                time.sleep(0.1)
+            else:
+                raise AssertionError("catalog not reloaded")
+            assert httpx.get(url + "/api/search?q=laptop").status_code == 200
+            print("✅ SIGHUP reloads the catalog without restarting workers")
+        finally:
+            master.terminate()
+            assert master.wait(timeout=20) == 0
+    print("✅ Graceful shutdown")
+
+if __name__ == "__main__":
+    test_shared_cache_across_processes()
+    test_prefork_server()
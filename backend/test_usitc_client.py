@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cache import SharedCache
+from usitc_client import USITCClient, normalize_query
+
+class StubUSITCHandler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        StubUSITCHandler.hits.append(self.path)
+        time.sleep(0.2)  # slow upstream so concurrent callers overlap
+        if "broken" in self.path:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps([{"htsno": "8471.30.01", "description": "<b>Laptops</b>", "general": "Free"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUSITCHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def _exercise_client(base_url):
+    client = USITCClient(base_url=base_url, cache_ttl=60)
+    try:
+        results = await asyncio.gather(*[client.search("Laptop") for _ in range(5)] + [client.search("  laptop ")])
+        assert all(r == results[0] for r in results)
+        assert results[0][0]["hts_code"] == "8471.30.01"
+        assert results[0][0]["description"] == "Laptops"
+        assert len(StubUSITCHandler.hits) == 1
+        print("✅ Concurrent identical queries coalesced into one upstream call")
+
+        await client.search("LAPTOP")
+        assert len(StubUSITCHandler.hits) == 1 and client.cache.hits == 1
+        print("✅ Repeated query served from cache")
+
+        assert await client.search("broken") == []
+        await client.search("broken")
+        assert len(StubUSITCHandler.hits) == 3
+        print("✅ Upstream errors return [] and are not cached")
+
+        assert await client.search("") == []
+    finally:
+        await client.aclose()
+
+async def _exercise_shared_cache(base_url, path):
+    client = USITCClient(base_url=base_url, cache_ttl=60)
+    client.cache = SharedCache(path, "usitc", ttl=60)
+    loop_thread, threads = threading.get_ident(), []
+    original_db = client.cache._db
+    client.cache._db = lambda: threads.append(threading.get_ident()) or original_db()
+    try:
+        first = await client.search("Laptop")
+        assert await client.search("laptop") == first and client.cache.hits == 1
+        assert threads and loop_thread not in threads
+        print("✅ Shared cache lookups run off the event loop")
+    finally:
+        await client.aclose()
+
+def test_usitc_client_against_stub():
+    print("Testing USITC Client...")
+    assert normalize_query("  Laptop   Bag ") == "laptop bag"
+    StubUSITCHandler.hits = []
+    server = _start_stub_server()
+    try:
+        asyncio.run(_exercise_client(f"http://127.0.0.1:{server.server_port}"))
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(_exercise_shared_cache(f"http://127.0.0.1:{server.server_port}", os.path.join(tmp, "cache.sqlite")))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_usitc_client_against_stub()
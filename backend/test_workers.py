@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import time
+from fastapi.testclient import TestClient
+from workers import WorkPool, PoolOverloaded, TaskTimeout, work_pool
+from main import app
+
+# Inherited by forked workers; a task holds the worker until the test sets the gate
+_started, _gate = multiprocessing.get_context("fork").Event(), multiprocessing.get_context("fork").Event()
+
+def _wait_for_gate():
+    _started.set()
+    return _gate.wait(10)
+
+async def _exercise_pool(pool):
+    assert await pool.run(sum, [1, 2, 3]) == 6
+    print("✅ Task runs in the worker process")
+
+    slow = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+    try:
+        await pool.run(sum, [1])
+        raise AssertionError("expected PoolOverloaded")
+    except PoolOverloaded:
+        pass
+    await slow
+    print("✅ Full pool rejects new work instead of queueing")
+
+    try:
+        await pool.run(time.sleep, 0.5, timeout=0.1)
+        raise AssertionError("expected TaskTimeout")
+    except TaskTimeout:
+        pass
+    # The timed-out task keeps its slot until it really finishes
+    assert pool.pending == 1
+    await asyncio.sleep(0.6)
+    assert pool.pending == 0
+    try:
+        await pool.run(time.sleep, 0.2, timeout=0)
+        raise AssertionError("expected TaskTimeout")
+    except TaskTimeout:
+        pass
+    print("✅ Per-task timeout (0 included), slot released on completion")
+
+async def _restart_with_queued_tasks(pool):
+    # One task running, the rest queued behind it on the only worker
+    tasks = [asyncio.ensure_future(pool.run(time.sleep, 0.3))]
+    tasks += [asyncio.ensure_future(pool.run(sum, [i, 1])) for i in range(6)]
+    await asyncio.sleep(0.05)
+    pool.restart()
+    assert await pool.run(sum, [2, 2]) == 4
+    results = await asyncio.gather(*tasks)
+    assert results[1:] == [i + 1 for i in range(6)]
+    print("✅ Restart drains tasks queued on the old workers")
+
+    # The worker is held busy until the shutdown has dropped the queued tasks.
+    # At most three calls leave the executor's pending queue (one running, two
+    # in the call queue), so cancel_futures drops at least the last four
+    _started.clear()
+    _gate.clear()
+    tasks = [asyncio.ensure_future(pool.run(_wait_for_gate))]
+    tasks += [asyncio.ensure_future(pool.run(sum, [i, 1])) for i in range(6)]
+    assert await asyncio.to_thread(_started.wait, 10)
+    pool.shutdown()
+    dropped = await asyncio.wait_for(asyncio.gather(*tasks[3:], return_exceptions=True), 10)
+    _gate.set()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(outcome, PoolOverloaded) for outcome in dropped), dropped
+    assert outcomes[0] is True
+    assert all(outcome == i + 1 or isinstance(outcome, PoolOverloaded) for i, outcome in enumerate(outcomes[1:3]))
+    assert not any(isinstance(outcome, asyncio.CancelledError) for outcome in outcomes)
+    print("✅ Tasks dropped by a shutdown fail with PoolOverloaded")
+
+def test_work_pool():
+    print("Testing Bounded Work Pool...")
+    pool = WorkPool(processes=1, max_pending=1, timeout=5)
+    pool.start()
+    try:
+        asyncio.run(_exercise_pool(pool))
+    finally:
+        pool.shutdown()
+
+def test_restart_keeps_queued_tasks():
+    print("\nTesting Pool Restart...")
+    pool = WorkPool(processes=1, max_pending=10, timeout=5)
+    pool.start()
+    try:
+        asyncio.run(_restart_with_queued_tasks(pool))
+    finally:
+        pool.shutdown()
+
+def test_overload_returns_503():
+    with TestClient(app) as client:
+        assert client.get("/api/search?q=laptop").json()[0]["hts_code"].startswith("8471")
+        original = work_pool.max_pending
+        work_pool.max_pending = 0
+        try:
+            response = client.get("/api/search?q=laptop")
+        finally:
+            work_pool.max_pending = original
+        assert response.status_code == 503 and response.headers["retry-after"] == "1"
+    print("✅ API degrades with 503 when the pool is full")
+
+if __name__ == "__main__":
+    test_work_pool()
+    test_restart_keeps_queued_tasks()
+    test_overload_returns_503()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import time
+import httpx
+from cache import SharedCache, make_cache
+from hts_parser import parse_hts_row
+from metrics import USITC_LATENCY
+
+logger = logging.getLogger(__name__)
+
+USITC_BASE_URL = os.environ.get("USITC_BASE_URL", "https://hts.usitc.gov")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+class USITCClient:
+    """
+    Async proxy to the USITC search API.
+
+    One pooled httpx client is shared by all requests, responses are kept in a
+    TTL+LRU cache keyed by normalized query, and concurrent identical queries
+    wait on a single upstream call. A SharedCache is read and written on a
+    worker thread so its SQLite calls do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str = USITC_BASE_URL,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        cache_size: int = 512,
+        cache_ttl: float = 600.0,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.cache = make_cache("usitc", maxsize=cache_size, ttl=cache_ttl)
+        self.upstream_calls = 0
+        self._client = None
+        self._inflight = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def search(self, query: str) -> list[dict]:
+        """
+        Searches USITC and maps hits to the standard model using the central parser.
+        """
+        key = normalize_query(query)
+        if not key:
+            return []
+
+        cached = await self._cache_call(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller does not cancel the shared upstream call
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str) -> list[dict]:
+        self.upstream_calls += 1
+        started = time.perf_counter()
+        try:
+            response = await self._get_client().get("/reststop/search", params={"keyword": key})
+            response.raise_for_status()
+            raw_data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            USITC_LATENCY.observe(time.perf_counter() - started, outcome="error")
+            logger.warning("USITC API error for %r: %s", key, e)
+            return []
+        USITC_LATENCY.observe(time.perf_counter() - started, outcome="ok")
+
+        # Determine if list or dict wrapper
+        results = raw_data if isinstance(raw_data, list) else (raw_data or {}).get('results', [])
+        mapped_results = [parse_hts_row(item) for item in results]
+        await self._cache_call(self.cache.set, key, mapped_results)
+        return mapped_results
+
+    async def _cache_call(self, method, *args):
+        if isinstance(self.cache, SharedCache):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+usitc_client = USITCClient()
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from catalog import get_catalog, set_auto_reload
+
+# 0 runs tasks on a single background thread instead of a process pool
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", os.cpu_count() or 1))
+# Tasks queued or running before new ones are rejected with 503
+MAX_PENDING_TASKS = int(os.environ.get("MAX_PENDING_TASKS", max(WORKER_PROCESSES, 1) * 4))
+TASK_TIMEOUT = float(os.environ.get("TASK_TIMEOUT", "10.0"))
+
+
+class PoolOverloaded(Exception):
+    """
+    Raised when the pool already holds MAX_PENDING_TASKS tasks.
+    """
+
+
+class TaskTimeout(Exception):
+    """
+    Raised when a task does not finish within its timeout.
+    """
+
+
+def _init_worker():
+    # The parent's catalog watcher restarts the pool after a reload, so workers
+    # never stat the catalog files themselves
+    set_auto_reload(False)
+    # Forked workers inherit the parent's catalog; others load it here
+    get_catalog()
+
+
+class WorkPool:
+    """
+    Bounded process pool for CPU-bound request work (fuzzy scoring, batch duties).
+
+    At most `max_pending` tasks are queued or running; beyond that run() fails
+    fast with PoolOverloaded instead of queueing without bound. A slot is only
+    released when the task really finishes, so tasks that outlive their
+    timeout still count against the limit.
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, max_pending: int = MAX_PENDING_TASKS,
+                 timeout: float = TASK_TIMEOUT):
+        self.processes = processes
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rejected = 0
+        self.timed_out = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        # Futures of tasks not finished yet, on the current or a draining executor
+        self._futures = set()
+
+    def _new_executor(self):
+        if self.processes > 0:
+            # fork so workers share the parent's loaded catalog pages
+            context = multiprocessing.get_context("fork") if hasattr(os, "fork") else None
+            return ProcessPoolExecutor(self.processes, mp_context=context, initializer=_init_worker)
+        return ThreadPoolExecutor(1)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = self._new_executor()
+
+    def shutdown(self):
+        if self._executor is not None:
+            # Cancel queued tasks here: a process pool's manager thread only sees
+            # cancel_futures while the executor is still referenced
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                future.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def restart(self):
+        """
+        Replaces the workers, e.g. after the parent's catalog was patched in place.
+        New tasks go to the new workers at once; tasks already queued on the
+        old ones still run there, and the old workers exit once drained.
+        """
+        old, self._executor = self._executor, self._new_executor()
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=False)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._futures.discard(future)
+
+    async def run(self, fn, *args, timeout: float = None):
+        """
+        Runs fn(*args) in the pool and returns its result.
+        Raises PoolOverloaded or TaskTimeout; tasks dropped by a pool shutdown
+        raise PoolOverloaded too, so callers can retry.
+        """
+        if self._executor is None:
+            self.start()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolOverloaded()
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            # Only drops the task if it has not started yet
+            future.cancel()
+            self.timed_out += 1
+            raise TaskTimeout()
+        except asyncio.CancelledError:
+            # The pool dropped the task, as opposed to the caller being cancelled
+            if future.cancelled() and not asyncio.current_task().cancelling():
+                raise PoolOverloaded()
+            raise
+
+
+work_pool = WorkPool()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Grid from './components/Grid';
 import Search from './components/Search';
 import AISearchResults from './components/AISearchResults';
@@ -15,12 +15,41 @@ function App() {
   const [activeTab, setActiveTab] = useState('local'); // 'local' or 'api'
 
   const API_URL = "http://localhost:8000/api";
+  const SESSION_URL = "ws://localhost:8000/api/search/session";
+  const sessionRef = useRef(null);
+  const seqRef = useRef(0);
 
   useEffect(() => {
     handleSearch("");
   }, []);
 
+  // As-you-type search session: the server narrows, cancels superseded
+  // queries and sends the best hits first. Replies to older queries are ignored.
+  useEffect(() => {
+    const socket = new WebSocket(SESSION_URL);
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.seq !== seqRef.current || message.error) return;
+      setRowData(message.results);
+    };
+    sessionRef.current = socket;
+    return () => socket.close();
+  }, []);
+
+  const handleType = (query) => {
+    const socket = sessionRef.current;
+    if (activeTab !== 'local' || !socket || socket.readyState !== WebSocket.OPEN) {
+      if (query === '') handleSearch('');
+      return;
+    }
+    seqRef.current += 1;
+    setCurrentQuery(query);
+    socket.send(JSON.stringify({ q: query, seq: seqRef.current }));
+  };
+
   const handleSearch = async (query) => {
+    // Drop session replies still in flight
+    seqRef.current += 1;
     setLoading(true);
     setCurrentQuery(query);
 
@@ -66,7 +95,8 @@ function App() {
       });
       const data = await response.json();
       console.log("Sync result:", data);
-      alert(`Sync Complete! Processed ${data.rows} rows.`);
+      const summary = data.summary || {};
+      alert(`Sync Complete! Processed ${data.rows} rows. Added: ${summary.added ?? 0}, changed: ${summary.changed ?? 0}, removed: ${summary.removed ?? 0}, duplicates: ${summary.duplicate ?? 0}.`);
     } catch (error) {
       console.error("Error uploading:", error);
       alert("Error uploading file");
@@ -107,7 +137,7 @@ function App() {
         </div>
 
         <div className="search-section">
-          <Search onSearch={handleSearch} />
+          <Search onSearch={handleSearch} onType={handleType} />
           <div className="similar-queries">
             {['graphic tablet', 'tablet folder', 'Apple iPad', 'Samsung Galaxy'].map(q => (
               <span key={q} className="query-chip" onClick={() => handleSearch(q)}>{q}</span>
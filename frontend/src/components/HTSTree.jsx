@@ -1,23 +1,39 @@
 import React, { useState, useEffect } from 'react';
 import './HTSTree.css';
 
+const API_URL = 'http://localhost:8000/api';
+// Only what the tree renders; children and child_count are always included
+const TREE_FIELDS = 'hts_code,name';
+
 const TreeNode = ({ node }) => {
     const [expanded, setExpanded] = useState(false);
-    const hasChildren = node.children && node.children.length > 0;
+    const [children, setChildren] = useState(node.children || []);
+    const hasChildren = (node.child_count ?? children.length) > 0;
+
+    // Children are fetched on first expand instead of shipping the whole tree
+    const toggle = () => {
+        if (!expanded && hasChildren && children.length === 0) {
+            fetch(`${API_URL}/tree/${encodeURIComponent(node.hts_code)}/children?fields=${TREE_FIELDS}`)
+                .then(res => res.json())
+                .then(data => setChildren(data))
+                .catch(err => console.error("Failed to load children", err));
+        }
+        setExpanded(!expanded);
+    };
 
     return (
         <div className="tree-node">
             <div
                 className={`node-header ${expanded ? 'expanded' : ''}`}
-                onClick={() => setExpanded(!expanded)}
+                onClick={toggle}
             >
                 <span className="node-icon">{hasChildren ? (expanded ? '−' : '+') : '•'}</span>
                 <span className="node-label">{node.name || node.full_name} {node.hts_code ? `(${node.hts_code})` : ''}</span>
             </div>
             {expanded && hasChildren && (
                 <div className="node-children">
-                    {node.children.map((child, idx) => (
-                        <TreeNode key={idx} node={child} />
+                    {children.map((child) => (
+                        <TreeNode key={child.hts_code} node={child} />
                     ))}
                 </div>
             )}
@@ -30,7 +46,7 @@ const HTSTree = () => {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        fetch('http://localhost:8000/api/tree')
+        fetch(`${API_URL}/tree?depth=0&fields=${TREE_FIELDS}`)
             .then(res => res.json())
             .then(data => {
                 setTreeData(data);
@@ -48,8 +64,8 @@ const HTSTree = () => {
         <div className="hts-tree-container">
             <h3>Navigating the TN VED tree</h3>
             <div className="tree-root">
-                {treeData.map((node, idx) => (
-                    <TreeNode key={idx} node={node} />
+                {treeData.map((node) => (
+                    <TreeNode key={node.hts_code} node={node} />
                 ))}
             </div>
         </div>
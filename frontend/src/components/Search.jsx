@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 
-const Search = ({ onSearch }) => {
+const Search = ({ onSearch, onType }) => {
     const [query, setQuery] = useState('');
 
     const handleSearch = (e) => {
@@ -8,11 +8,13 @@ const Search = ({ onSearch }) => {
         onSearch(query);
     };
 
-    // Optional: Search on clear
+    // Search as you type when the parent supports it, otherwise on clear
     const handleChange = (e) => {
         const val = e.target.value;
         setQuery(val);
-        if (val === '') {
+        if (onType) {
+            onType(val);
+        } else if (val === '') {
             onSearch('');
         }
     }